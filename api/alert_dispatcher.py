@@ -0,0 +1,326 @@
+"""
+Background alert dispatcher.
+
+Alerts are queued and sent by one worker thread over a persistent SMTP session
+(STARTTLS and login once, reconnecting when the server drops the connection),
+so a burst of phishing mail costs one handshake instead of one per alert and
+never blocks classification. Optionally, alerts raised for a recipient within
+ALERT_DIGEST_SECONDS are merged into one digest email. Each recipient gets at
+most ALERT_RATE_LIMIT emails per ALERT_RATE_WINDOW_SECONDS; alerts over the
+limit are held and merged into the next email allowed. A failed email is
+retried with exponential back-off, up to ALERT_SEND_ATTEMPTS tries.
+"""
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from config import (
+    EMAIL_USER,
+    EMAIL_PASSWORD,
+    EMAIL_SMTP_HOST,
+    EMAIL_SMTP_PORT,
+    ALERT_QUEUE_MAX,
+    ALERT_DIGEST_SECONDS,
+    ALERT_RATE_LIMIT,
+    ALERT_RATE_WINDOW_SECONDS,
+    ALERT_SMTP_IDLE_SECONDS,
+    ALERT_SMTP_TIMEOUT,
+    ALERT_SEND_ATTEMPTS,
+    ALERT_RETRY_BASE_SECONDS,
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Errors after which the connection is reopened and the send retried once
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SmtpSession:
+    """One SMTP connection, opened on first use and reopened after a disconnect."""
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        timeout: Optional[float] = None,
+    ):
+        self.host = host or EMAIL_SMTP_HOST
+        self.port = port or EMAIL_SMTP_PORT
+        self.user = EMAIL_USER if user is None else user
+        self.password = EMAIL_PASSWORD if password is None else password
+        self.starttls = starttls
+        self.timeout = timeout or ALERT_SMTP_TIMEOUT
+        self.connects = 0
+        self.last_used = 0.0
+        self._server: Optional[smtplib.SMTP] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._server is not None
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self.connects += 1
+        return server
+
+    def send(self, from_addr: str, to_addrs: Sequence[str], message: str) -> None:
+        """Send one message, reconnecting once if the server closed the connection."""
+        for attempt in (1, 2):
+            try:
+                server = self._server or self._connect()
+                server.sendmail(from_addr, list(to_addrs), message)
+                self.last_used = time.monotonic()
+                return
+            except _RECONNECT_ERRORS:
+                self._server = None
+                if attempt == 2:
+                    raise
+                logger.info("SMTP connection lost; reconnecting")
+
+    def close(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+
+class _Flush:
+    """Queue marker: the worker sets done once everything queued before it is handled."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+# (subject, body, on_failure): on_failure is called if the alert is finally dropped
+Alert = Tuple[str, str, Optional[Callable[[], None]]]
+
+
+class AlertDispatcher:
+    """Queues alerts and sends them from a background thread."""
+
+    def __init__(
+        self,
+        build_message: Callable[[str, str, str], str],
+        sender: str,
+        session: Optional[SmtpSession] = None,
+        digest_seconds: Optional[float] = None,
+        rate_limit: Optional[int] = None,
+        rate_window_seconds: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        idle_seconds: Optional[float] = None,
+        send_attempts: Optional[int] = None,
+        retry_base_seconds: Optional[float] = None,
+        name: str = "alert-dispatcher",
+    ):
+        self.build_message = build_message
+        self.sender = sender
+        self.session = session or SmtpSession()
+        self.digest_seconds = ALERT_DIGEST_SECONDS if digest_seconds is None else digest_seconds
+        self.rate_limit = ALERT_RATE_LIMIT if rate_limit is None else rate_limit
+        self.rate_window = ALERT_RATE_WINDOW_SECONDS if rate_window_seconds is None else rate_window_seconds
+        self.idle_seconds = ALERT_SMTP_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.send_attempts = max(1, ALERT_SEND_ATTEMPTS if send_attempts is None else send_attempts)
+        self.retry_base = ALERT_RETRY_BASE_SECONDS if retry_base_seconds is None else retry_base_seconds
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue or ALERT_QUEUE_MAX))
+        self._pending: Dict[str, List[Alert]] = defaultdict(list)
+        self._due: Dict[str, float] = {}
+        self._sent_at: Dict[str, Deque[float]] = defaultdict(deque)
+        self._failures: Dict[str, int] = defaultdict(int)  # consecutive failed sends per recipient
+        self._stats = defaultdict(int)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        subject: str,
+        body: str,
+        to_address: str,
+        on_failure: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """
+        Queue one alert; False if the dispatcher is closed or its queue is full.
+        on_failure is called from the worker thread if the alert is dropped after
+        its last send attempt.
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait((to_address, subject, body, on_failure))
+        except queue.Full:
+            self._stats["dropped"] += 1
+            logger.warning("Alert queue full; dropping alert for %s", to_address)
+            return False
+        self._stats["submitted"] += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Send everything queued so far, ending open digest windows (rate limits still apply)."""
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Send all pending alerts, ignoring digest windows and rate limits, then stop."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, object]:
+        return dict(
+            self._stats,
+            queued=self._queue.qsize(),
+            pending=sum(len(v) for v in self._pending.values()),
+            smtp_connects=self.session.connects,
+            smtp_connected=self.session.connected,
+        )
+
+    def _next_timeout(self) -> Optional[float]:
+        if self._due:
+            return max(0.0, min(self._due.values()) - time.monotonic())
+        if self.session.connected:
+            return max(0.0, self.session.last_used + self.idle_seconds - time.monotonic())
+        return None
+
+    def _allowed_at(self, to_address: str, now: float) -> float:
+        """Earliest time the rate limit lets another email go to this recipient."""
+        if self.rate_limit <= 0:
+            return now
+        sent = self._sent_at[to_address]
+        while sent and sent[0] <= now - self.rate_window:
+            sent.popleft()
+        return now if len(sent) < self.rate_limit else sent[0] + self.rate_window
+
+    def _send_due(self, force: bool = False, ignore_limits: bool = False) -> None:
+        now = time.monotonic()
+        for to_address in list(self._due):
+            if self._due[to_address] > now and (not force or (to_address in self._failures and not ignore_limits)):
+                continue  # flush() ends digest windows, not retry back-offs
+            allowed_at = now if ignore_limits else self._allowed_at(to_address, now)
+            if allowed_at > now:
+                if self._due[to_address] < allowed_at:
+                    self._stats["rate_limited"] += 1
+                self._due[to_address] = allowed_at
+                continue
+            alerts = self._pending.pop(to_address)
+            del self._due[to_address]
+            if self._send(to_address, alerts):
+                self._sent_at[to_address].append(now)
+                self._failures.pop(to_address, None)
+            else:
+                self._retry_or_drop(to_address, alerts, now)
+
+    def _retry_or_drop(self, to_address: str, alerts: List[Alert], now: float) -> None:
+        """Hold failed alerts for another try after a back-off, or drop them after the last attempt."""
+        self._failures[to_address] += 1
+        failures = self._failures[to_address]
+        if failures >= self.send_attempts:
+            self._drop(to_address, alerts)
+            return
+        self._stats["retried"] += len(alerts)
+        self._pending[to_address][:0] = alerts
+        self._due[to_address] = now + self.retry_base * 2 ** (failures - 1)
+        logger.warning("Alert email to %s failed (attempt %d of %d); retrying later",
+                       to_address, failures, self.send_attempts)
+
+    def _drop(self, to_address: str, alerts: List[Alert]) -> None:
+        self._failures.pop(to_address, None)
+        self._stats["failed"] += len(alerts)
+        logger.error("Giving up on %d alert(s) for %s", len(alerts), to_address)
+        for _, _, on_failure in alerts:
+            if on_failure is None:
+                continue
+            try:
+                on_failure()
+            except Exception as e:
+                logger.exception("Alert failure callback raised: %s", e)
+
+    def _send(self, to_address: str, alerts: List[Alert]) -> bool:
+        if len(alerts) == 1:
+            subject, body, _ = alerts[0]
+        else:
+            subject = f"Phishing Alert: {len(alerts)} unsafe emails detected"
+            body = "\n\n----------------------------------------\n\n".join(b for _, b, _ in alerts)
+            self._stats["digests"] += 1
+        try:
+            self.session.send(self.sender, [to_address], self.build_message(subject, body, to_address))
+            self._stats["emails_sent"] += 1
+            self._stats["alerts_sent"] += len(alerts)
+            logger.info("Alert email sent to %s (%d alert(s))", to_address, len(alerts))
+            return True
+        except Exception as e:
+            self._stats["send_errors"] += 1
+            logger.exception("Failed to send alert email to %s: %s", to_address, e)
+            return False
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self._next_timeout())
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                for _ in range(self.send_attempts):
+                    if not self._due:
+                        break
+                    self._send_due(force=True, ignore_limits=True)
+                for to_address in list(self._due):
+                    del self._due[to_address]
+                    self._drop(to_address, self._pending.pop(to_address))
+                self.session.close()
+                return
+            if isinstance(item, _Flush):
+                self._send_due(force=True)
+                item.done.set()
+                continue
+            if item is not None:
+                to_address, subject, body, on_failure = item
+                self._pending[to_address].append((subject, body, on_failure))
+                self._due.setdefault(to_address, time.monotonic() + self.digest_seconds)
+            self._send_due()
+            if self.session.connected and time.monotonic() - self.session.last_used >= self.idle_seconds:
+                self.session.close()  # servers drop idle connections anyway; reopen on the next alert
+
+
+_dispatcher: Optional[AlertDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher(build_message: Callable[[str, str, str], str], sender: str) -> AlertDispatcher:
+    """Process-wide dispatcher, started on first use and flushed at exit."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = AlertDispatcher(build_message, sender)
+                atexit.register(_dispatcher.close)
+    return _dispatcher
+
+
+def get_dispatcher_stats() -> Dict[str, object]:
+    """Counters of the process-wide dispatcher ({} if no alert was dispatched yet)."""
+    return _dispatcher.stats() if _dispatcher is not None else {}
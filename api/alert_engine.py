@@ -2,7 +2,8 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any, Optional
+from functools import partial
+from typing import Any, Callable, Dict, Optional
 
 from config import (
     ALERT_PROBABILITY_THRESHOLD,
@@ -13,6 +14,8 @@ from config import (
     EMAIL_SMTP_PORT,
     EMAIL_ALERT_TO,
     EMAIL_ALERTS_ENABLED,
+    ALERT_DISPATCH_ASYNC,
+    ALERT_SUPPRESS_ENABLED,
 )
 from utils.helpers import safe_str
 from utils.logger import get_logger
@@ -37,32 +40,45 @@ def create_alert(email_text: str, probability: float) -> Dict[str, Any]:
     }
 
 
+def _alert_recipient(to_address: Optional[str] = None) -> Optional[str]:
+    """Recipient for an alert, or None if alerts are disabled or cannot be sent."""
+    if not EMAIL_ALERTS_ENABLED or not EMAIL_USER or not EMAIL_PASSWORD:
+        logger.info("Email alerts disabled or credentials missing; skip send.")
+        return None
+    to_address = (to_address or EMAIL_ALERT_TO or EMAIL_USER).strip()
+    if not to_address:
+        logger.warning("No EMAIL_ALERT_TO or EMAIL_USER; cannot send alert.")
+        return None
+    return to_address
+
+
+def build_alert_message(subject: str, body: str, to_address: str) -> str:
+    """RFC 5322 text of one alert email."""
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = EMAIL_USER
+    msg["To"] = to_address
+    msg.attach(MIMEText(body, "plain", "utf-8"))
+    return msg.as_string()
+
+
 def send_alert_email(
     subject: str,
     body: str,
     to_address: Optional[str] = None,
 ) -> bool:
     """
-    Send an email alert (e.g. "Unsafe email detected"). Uses SMTP from config.
+    Send an email alert (e.g. "Unsafe email detected") now, over its own SMTP connection.
     Returns True if sent, False otherwise.
     """
-    if not EMAIL_ALERTS_ENABLED or not EMAIL_USER or not EMAIL_PASSWORD:
-        logger.info("Email alerts disabled or credentials missing; skip send.")
-        return False
-    to_address = (to_address or EMAIL_ALERT_TO or EMAIL_USER).strip()
+    to_address = _alert_recipient(to_address)
     if not to_address:
-        logger.warning("No EMAIL_ALERT_TO or EMAIL_USER; cannot send alert.")
         return False
     try:
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = EMAIL_USER
-        msg["To"] = to_address
-        msg.attach(MIMEText(body, "plain", "utf-8"))
         with smtplib.SMTP(EMAIL_SMTP_HOST, EMAIL_SMTP_PORT) as server:
             server.starttls()
             server.login(EMAIL_USER, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_USER, [to_address], msg.as_string())
+            server.sendmail(EMAIL_USER, [to_address], build_alert_message(subject, body, to_address))
         logger.info("Alert email sent to %s", to_address)
         return True
     except Exception as e:
@@ -76,7 +92,22 @@ def notify_unsafe_email_detected(
     email_preview: str,
     probability: float,
 ) -> bool:
-    """Send a single 'random unsafe mail entered' style alert to the user."""
+    """
+    Send a single 'random unsafe mail entered' style alert to the user. With
+    ALERT_DISPATCH_ASYNC it is queued for the background dispatcher (True means queued).
+    Repeats of an already alerted campaign are suppressed (False) while
+    ALERT_SUPPRESS_ENABLED; see api.alert_suppression. A failed send, a full
+    queue or an alert the dispatcher finally drops releases the campaign again,
+    so its next copy still alerts.
+    """
+    fingerprint = None
+    if ALERT_SUPPRESS_ENABLED and _alert_recipient():
+        from api.alert_suppression import alert_fingerprint, get_suppressor
+
+        fingerprint = alert_fingerprint(email_subject, email_from, email_preview)
+        if not get_suppressor().should_send(fingerprint):
+            logger.info("Alert suppressed: campaign already alerted (%s)", safe_str(email_subject)[:80])
+            return False
     subject = "Phishing Alert: Unsafe email detected in your inbox"
     body = (
         "The Email Phishing Checker has detected a potentially unsafe (phishing) email.\n\n"
@@ -86,4 +117,25 @@ def notify_unsafe_email_detected(
         f"Preview:\n{safe_str(email_preview)[:500]}\n\n"
         "Do not click links or share personal information. Delete or report if suspicious."
     )
-    return send_alert_email(subject, body)
+    release = None
+    if fingerprint is not None:
+        release = partial(get_suppressor().release, fingerprint)
+    sent = _deliver_alert(subject, body, on_failure=release)
+    if not sent and release is not None:
+        release()
+    return sent
+
+
+def _deliver_alert(subject: str, body: str, on_failure: Optional[Callable[[], None]] = None) -> bool:
+    """
+    Send now, or queue for the background dispatcher with ALERT_DISPATCH_ASYNC.
+    on_failure runs if a queued alert is dropped later (not when this returns False).
+    """
+    if not ALERT_DISPATCH_ASYNC:
+        return send_alert_email(subject, body)
+    to_address = _alert_recipient()
+    if not to_address:
+        return False
+    from api.alert_dispatcher import get_dispatcher
+
+    return get_dispatcher(build_alert_message, EMAIL_USER).submit(subject, body, to_address, on_failure=on_failure)
@@ -0,0 +1,162 @@
+"""
+Alert suppression by campaign fingerprint.
+
+One campaign reaching many mailboxes yields the same fingerprint: normalized
+subject (case, "Re:/Fwd:" prefixes and numbers ignored), sender domain and a
+hash of the normalized body (markup, whitespace and link tracking parameters
+removed, as for verdict cache keys). The first alert per fingerprint goes out;
+repeats within ALERT_SUPPRESS_TTL_SECONDS are suppressed and counted. The index is an
+in-process LRU/TTL cache, optionally shared between processes through Redis
+(SET NX EX), so alert volume follows distinct campaigns, not recipients.
+"""
+import hashlib
+import re
+import threading
+from collections import defaultdict
+from email.utils import parseaddr
+from typing import Dict, Optional
+
+from config import (
+    ALERT_SUPPRESS_TTL_SECONDS,
+    ALERT_SUPPRESS_MAX_ITEMS,
+    ALERT_SUPPRESS_SHARED,
+)
+from ml.preprocessing import cache_key_input
+from storage.local_cache import LocalCache
+from utils.helpers import safe_str
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|wg)\s*(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+_SPACE = re.compile(r"\s+")
+
+_REDIS_PREFIX = "alert-suppress"
+
+
+def _normalize(text: str) -> str:
+    return _SPACE.sub(" ", _DIGITS.sub("#", text.lower())).strip()
+
+
+def sender_domain(sender: str) -> str:
+    """Lower-cased domain of a From header value ("" if there is none)."""
+    address = parseaddr(safe_str(sender))[1] or safe_str(sender)
+    return address.rpartition("@")[2].strip().strip(">").lower()
+
+
+def alert_fingerprint(subject: str, sender: str, body: str) -> str:
+    """Campaign fingerprint of one email: normalized subject, sender domain and body hash."""
+    normalized_subject = _normalize(_REPLY_PREFIX.sub("", safe_str(subject)))
+    body = _normalize(cache_key_input(safe_str(body)))
+    body_hash = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    key = f"{normalized_subject}\n{sender_domain(sender)}\n{body_hash}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class AlertSuppressor:
+    """Decides whether an alert is the first for its fingerprint within the TTL."""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_items: Optional[int] = None,
+        shared: Optional[bool] = None,
+    ):
+        self.ttl_seconds = ALERT_SUPPRESS_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.shared = ALERT_SUPPRESS_SHARED if shared is None else shared
+        self._seen = LocalCache(
+            max_items=ALERT_SUPPRESS_MAX_ITEMS if max_items is None else max_items,
+            ttl_seconds=self.ttl_seconds,
+        )
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = defaultdict(int)
+
+    def _shared_key(self, fingerprint: str) -> str:
+        return f"{_REDIS_PREFIX}:{fingerprint}"
+
+    def _claim_shared(self, fingerprint: str) -> bool:
+        """True unless another process already alerted for this fingerprint (Redis SET NX EX)."""
+        from storage.redis_cache import get_cache, record_redis_result
+
+        r = get_cache()
+        if r is None:
+            with self._lock:
+                self._stats["shared_unavailable"] += 1
+            return True
+        try:
+            claimed = r.set(self._shared_key(fingerprint), 1, nx=True, ex=max(1, int(self.ttl_seconds)))
+        except Exception as e:
+            record_redis_result(False)
+            with self._lock:
+                self._stats["shared_errors"] += 1
+            logger.debug("Alert suppression Redis error: %s", e)
+            return True  # fail open: a duplicate alert beats a missed one
+        record_redis_result(True)
+        return bool(claimed)
+
+    def should_send(self, fingerprint: str) -> bool:
+        """
+        True for the first alert of a fingerprint within the TTL; later ones are
+        counted as suppressed. The caller must release() the fingerprint if the
+        alert it was allowed to send could not be sent.
+        """
+        with self._lock:
+            self._stats["checked"] += 1
+            if self._seen.get(fingerprint) is not None:
+                self._stats["suppressed"] += 1
+                return False
+            self._seen.set(fingerprint, True)
+        if self.shared and not self._claim_shared(fingerprint):
+            with self._lock:
+                self._stats["suppressed"] += 1
+                self._stats["suppressed_shared"] += 1
+            return False
+        with self._lock:
+            self._stats["sent"] += 1
+        return True
+
+    def release(self, fingerprint: str) -> None:
+        """Forget a fingerprint whose alert failed, so the next copy of the campaign alerts again."""
+        with self._lock:
+            self._seen.delete(fingerprint)
+            self._stats["sent"] -= 1
+            self._stats["released"] += 1
+        if not self.shared:
+            return
+        from storage.redis_cache import get_cache, record_redis_result
+
+        r = get_cache()
+        if r is None:
+            return
+        try:
+            r.delete(self._shared_key(fingerprint))
+        except Exception as e:
+            record_redis_result(False)
+            with self._lock:
+                self._stats["shared_errors"] += 1
+            logger.debug("Alert suppression Redis error: %s", e)
+            return
+        record_redis_result(True)
+
+    def stats(self) -> Dict[str, object]:
+        return dict(self._stats, tracked=len(self._seen), ttl_seconds=self.ttl_seconds, shared=self.shared)
+
+
+_suppressor: Optional[AlertSuppressor] = None
+_suppressor_lock = threading.Lock()
+
+
+def get_suppressor() -> AlertSuppressor:
+    """Process-wide suppressor."""
+    global _suppressor
+    if _suppressor is None:
+        with _suppressor_lock:
+            if _suppressor is None:
+                _suppressor = AlertSuppressor()
+    return _suppressor
+
+
+def get_suppression_stats() -> Dict[str, object]:
+    """Counters of the process-wide suppressor ({} if no alert was checked yet)."""
+    return _suppressor.stats() if _suppressor is not None else {}
@@ -0,0 +1,140 @@
+"""
+Micro-batching request coalescer.
+
+Concurrent callers submit single items; a background thread collects items that
+arrive within a short window (or until the batch is full), runs one batch call
+and resolves each caller's future. Used behind /classify so the vectorizer and
+model score many documents per call under load.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Recent samples kept for percentile metrics
+_METRIC_WINDOW = 1024
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class RequestCoalescer:
+    """Coalesce concurrent single-item calls into batch calls of batch_fn."""
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 3.0,
+        name: str = "coalescer",
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[Tuple[Any, Future, float]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._batch_sizes: deque = deque(maxlen=_METRIC_WINDOW)
+        self._queue_times_ms: deque = deque(maxlen=_METRIC_WINDOW)
+        self._batch_times_ms: deque = deque(maxlen=_METRIC_WINDOW)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item; the returned future resolves to batch_fn's result for it."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit one item and wait for its result."""
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self) -> List[Tuple[Any, Future, float]]:
+        """Block for the first item, then gather more until full or the wait window ends."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                logger.exception("%s: batch of %d failed", self.name, len(items))
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                with self._stats_lock:
+                    self._errors += 1
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            finished = time.perf_counter()
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes.append(len(batch))
+                self._batch_times_ms.append((finished - started) * 1000.0)
+                self._queue_times_ms.extend((started - queued) * 1000.0 for _, _, queued in batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch-size and queue-time metrics (percentiles over recent batches/items)."""
+        with self._stats_lock:
+            sizes = list(self._batch_sizes)
+            queue_times = list(self._queue_times_ms)
+            batch_times = list(self._batch_times_ms)
+            batches, items, errors = self._batches, self._items, self._errors
+        return {
+            "batches": batches,
+            "items": items,
+            "errors": errors,
+            "pending": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "batch_size_p50": _percentile(sizes, 50),
+            "batch_size_max": max(sizes) if sizes else 0,
+            "queue_ms_p50": round(_percentile(queue_times, 50), 3),
+            "queue_ms_p99": round(_percentile(queue_times, 99), 3),
+            "batch_ms_p50": round(_percentile(batch_times, 50), 3),
+            "batch_ms_p99": round(_percentile(batch_times, 99), 3),
+        }
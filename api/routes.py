@@ -1,29 +1,150 @@
 """Flask routes for submitting emails for classification."""
-import os
+import threading
 
 from flask import Flask, request, jsonify
 
-from config import SPAM_PROBABILITY_THRESHOLD, MODEL_PATH
-from ml.classifier import PhishingClassifier
-from storage.database import store_result, init_db
-from storage.redis_cache import cache_get, cache_set
+from typing import Any, Dict, List, Tuple
+
+from config import (
+    SPAM_PROBABILITY_THRESHOLD,
+    MODEL_PATH,
+    API_BATCH_MAX_ITEMS,
+    CLASSIFY_COALESCE_ENABLED,
+    CLASSIFY_BATCH_MAX_SIZE,
+    CLASSIFY_BATCH_MAX_WAIT_MS,
+)
+from api.coalescer import RequestCoalescer
+from ml.preprocessing import cache_key_input, prepare_input
+from ml.registry import current_model, get_model
+from storage.database import get_stats, store_result, store_results
+from storage.write_behind import get_writer_stats
+from storage.redis_cache import cache_get, cache_get_many, cache_set, cache_set_many, get_cache_stats
 from api.alert_engine import should_alert, create_alert
+from api.alert_dispatcher import get_dispatcher_stats
+from api.alert_suppression import get_suppression_stats
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-_classifier: PhishingClassifier | None = None
 
-
-def get_classifier() -> PhishingClassifier:
-    global _classifier
-    if _classifier is None:
-        _classifier = PhishingClassifier()
-        if os.path.isfile(MODEL_PATH):
-            _classifier.load()
-        else:
-            logger.warning("No model at %s; train first. Predictions may fail.", MODEL_PATH)
-    return _classifier
+def get_classifier():
+    """Current model from the process-wide registry (hot-reloaded after retraining)."""
+    return get_model()
+
+
+def _current_model():
+    """(model, version) pair used to score and tag one request."""
+    try:
+        return current_model()
+    except FileNotFoundError:
+        logger.warning("No model at %s; train first. Predictions may fail.", MODEL_PATH)
+        raise
+
+
+def _preview(text: str) -> str:
+    return text[:200].replace("\n", " ")
+
+
+def _cache_prefix(model_version: str) -> str:
+    """
+    Verdict cache namespace. Keys hash the prepared model input without tracking
+    params (see cache_key_input), and include the model version so a retrained
+    model never reads old verdicts.
+    """
+    return f"classify:{model_version}"
+
+
+def _score_and_store(items: List[Tuple[str, str]]) -> List[Tuple[int, float, str]]:
+    """
+    Score (raw text, prepared input) pairs in one pass and persist them in one insert;
+    returns (label, prob, version) each.
+    """
+    clf, version = _current_model()
+    labels, probs = clf.score_prepared([prepared for _, prepared in items])
+    store_results(
+        [(_preview(text), label, prob) for (text, _), label, prob in zip(items, labels, probs)],
+        model_version=version,
+    )
+    return [(label, prob, version) for label, prob in zip(labels, probs)]
+
+
+_coalescer: RequestCoalescer | None = None
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer() -> RequestCoalescer:
+    """Shared micro-batcher for concurrent /classify requests."""
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = RequestCoalescer(
+                    _score_and_store,
+                    max_batch_size=CLASSIFY_BATCH_MAX_SIZE,
+                    max_wait_ms=CLASSIFY_BATCH_MAX_WAIT_MS,
+                    name="classify-coalescer",
+                )
+    return _coalescer
+
+
+def _build_result(label: int, prob: float, model_version: str) -> Dict[str, Any]:
+    """Cacheable verdict for one email."""
+    return {
+        "label": int(label),
+        "label_name": "phishing" if label == 1 else "legitimate",
+        "phishing_probability": round(prob, 4),
+        "threshold": SPAM_PROBABILITY_THRESHOLD,
+        "model_version": model_version,
+    }
+
+
+def _with_alert(result: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """Attach an alert payload when the verdict is above the alert threshold."""
+    prob = result["phishing_probability"]
+    if should_alert(prob):
+        result = dict(result, alert=create_alert(text, prob))
+    return result
+
+
+def _batch_item_text(item: Any) -> str:
+    """Batch items may be plain strings or objects like { "text": "..." }."""
+    if isinstance(item, dict):
+        item = item.get("text", "")
+    return item.strip() if isinstance(item, str) else ""
+
+
+def classify_batch_texts(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Classify many emails: one bulk cache lookup, one vectorized model pass over the
+    cache misses, one pipelined cache write, one bulk insert. Results are returned in input order.
+    """
+    clf, version = _current_model()
+    prefix = _cache_prefix(version)
+    prepared = [prepare_input(text) for text in texts]
+    keys = [cache_key_input(text, p) for text, p in zip(texts, prepared)]
+    results: List[Dict[str, Any] | None] = list(cache_get_many(prefix, keys))
+
+    # Score each distinct uncached input once, even if it repeats within the batch
+    pending: Dict[str, List[int]] = {}
+    for i, (key_input, cached) in enumerate(zip(keys, results)):
+        if cached is None:
+            pending.setdefault(key_input, []).append(i)
+
+    if pending:
+        unique_inputs = list(pending)
+        labels, probs = clf.score_prepared([prepared[pending[key][0]] for key in unique_inputs])
+        rows = []
+        new_entries = []
+        for key_input, label, prob in zip(unique_inputs, labels, probs):
+            result = _build_result(label, prob, version)
+            new_entries.append((key_input, result))
+            for i in pending[key_input]:
+                results[i] = result
+                rows.append((_preview(texts[i]), label, prob))
+        cache_set_many(prefix, new_entries)
+        store_results(rows, model_version=version)
+
+    return [_with_alert(result, text) for text, result in zip(texts, results)]
 
 
 def create_app() -> Flask:
@@ -46,28 +167,24 @@ def create_app() -> Flask:
             if not text:
                 return jsonify({"error": "No email text provided"}), 400
 
-            cached = cache_get("classify", text)
+            clf, version = _current_model()
+            prepared = prepare_input(text)
+            key_input = cache_key_input(text, prepared)
+            cached = cache_get(_cache_prefix(version), key_input)
             if cached is not None:
-                return jsonify(cached)
-
-            clf = get_classifier()
-            label, prob = clf.predict_single(text)
-            preview = text[:200].replace("\n", " ")
-            store_result(preview, label, prob)
-
-            result = {
-                "label": int(label),
-                "label_name": "phishing" if label == 1 else "legitimate",
-                "phishing_probability": round(prob, 4),
-                "threshold": SPAM_PROBABILITY_THRESHOLD,
-            }
-            cache_set("classify", text, result)
-
-            if should_alert(prob):
-                alert = create_alert(text, prob)
-                result["alert"] = alert
-
-            return jsonify(result)
+                return jsonify(_with_alert(cached, text))
+
+            if CLASSIFY_COALESCE_ENABLED:
+                label, prob, version = get_coalescer()((text, prepared))
+            else:
+                labels, probs = clf.score_prepared([prepared])
+                label, prob = labels[0], probs[0]
+                store_result(_preview(text), label, prob, model_version=version)
+
+            result = _build_result(label, prob, version)
+            cache_set(_cache_prefix(version), key_input, result)
+
+            return jsonify(_with_alert(result, text))
         except FileNotFoundError as e:
             return jsonify({"error": "Model not trained yet", "detail": str(e)}), 503
         except Exception as e:
@@ -79,4 +196,52 @@ def create_app() -> Flask:
         """Alias for /classify."""
         return classify()
 
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Runtime metrics for tuning (coalescer batch sizes and queue times, cache tiers, write queue, alerts)."""
+        return jsonify({
+            "coalescer": get_coalescer().stats() if CLASSIFY_COALESCE_ENABLED else None,
+            "cache": get_cache_stats(),
+            "store": get_writer_stats(),
+            "alerts": dict(get_dispatcher_stats(), suppression=get_suppression_stats()),
+        })
+
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        """Prediction counts, phishing rate, probability histogram and trend. Query: ?window=24h (or 15m, 7d, seconds)."""
+        try:
+            return jsonify(get_stats(request.args.get("window", "24h")))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.exception("Stats error")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/classify/batch", methods=["POST"])
+    def classify_batch():
+        """
+        POST JSON { "emails": ["...", {"text": "..."}, ...] } or a bare JSON list.
+        Returns { "results": [...], "count": n } with one verdict per email, in input order.
+        """
+        try:
+            data = request.get_json(silent=True)
+            items = data.get("emails") if isinstance(data, dict) else data
+            if not isinstance(items, list) or not items:
+                return jsonify({"error": "Expected a non-empty JSON list of emails"}), 400
+            if len(items) > API_BATCH_MAX_ITEMS:
+                return jsonify({"error": f"Batch too large; max {API_BATCH_MAX_ITEMS} emails"}), 413
+
+            texts = [_batch_item_text(item) for item in items]
+            valid = [i for i, text in enumerate(texts) if text]
+            results: List[Dict[str, Any]] = [{"error": "No email text provided"}] * len(texts)
+            for i, result in zip(valid, classify_batch_texts([texts[i] for i in valid])):
+                results[i] = result
+
+            return jsonify({"results": results, "count": len(results)})
+        except FileNotFoundError as e:
+            return jsonify({"error": "Model not trained yet", "detail": str(e)}), 503
+        except Exception as e:
+            logger.exception("Batch classification error")
+            return jsonify({"error": str(e)}), 500
+
     return app
@@ -0,0 +1,67 @@
+"""
+Benchmark: keyword counting cost as the keyword list grows.
+
+Compares the previous per-keyword str.count loop with the Aho-Corasick automaton.
+KeywordMatcher.count uses the automaton from AUTOMATON_MIN_KEYWORDS keywords up.
+Run from the project root: python benchmarks/bench_keywords.py
+"""
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import SUSPICIOUS_KEYWORDS  # noqa: E402
+from detection.keyword_matcher import KeywordMatcher  # noqa: E402
+from detection.text_analysis import clean_text  # noqa: E402
+
+KEYWORD_COUNTS = [16, 100, 1000, 10000, 30000]
+REPEAT = 5
+
+
+def count_loop(text, keywords):
+    """The previous implementation: one full scan of the text per keyword."""
+    return {kw: text.count(kw) for kw in keywords}
+
+
+def make_keywords(n, rng):
+    words = list(SUSPICIOUS_KEYWORDS)
+    while len(words) < n:
+        size = rng.randint(1, 3)
+        words.append(" ".join(
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+            for _ in range(size)
+        ))
+    return words[:n]
+
+
+def best_of(fn, *args):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    rng = random.Random(0)
+    body = " ".join(rng.choice(SUSPICIOUS_KEYWORDS + ["hello", "meeting", "invoice", "team"]) for _ in range(4000))
+    text = clean_text(body).lower()
+    print(f"text: {len(text)} chars")
+    print(f"{'keywords':>9} {'build ms':>9} {'str.count ms':>13} {'automaton ms':>13} {'speedup':>8}")
+    for n in KEYWORD_COUNTS:
+        keywords = make_keywords(n, rng)
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build_ms = (time.perf_counter() - start) * 1000
+        assert matcher.count_automaton(text) == count_loop(text, matcher.keywords)
+        loop_ms = best_of(count_loop, text, keywords)
+        ac_ms = best_of(matcher.count_automaton, text)
+        print(f"{n:>9} {build_ms:>9.1f} {loop_ms:>13.2f} {ac_ms:>13.2f} {loop_ms / ac_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
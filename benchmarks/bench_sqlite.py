@@ -0,0 +1,163 @@
+"""
+Benchmark: concurrent insert + read throughput on the predictions table.
+
+One writer thread inserts small batches (as the write-behind queue does) while
+reader threads run dashboard-style queries (label counts over the last hour, most
+recent rows). "before" is the previous setup: ISO text timestamps, no indexes,
+SQLite default journaling. "after" is the tuned profile: WAL, synchronous=NORMAL,
+mmap, epoch timestamps and indexes on (created_at, label) and (label, created_at).
+Run from the project root: python benchmarks/bench_sqlite.py
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import SQLITE_MMAP_SIZE  # noqa: E402
+
+SEED_ROWS = 200_000
+BATCH = 50
+READERS = 2
+SECONDS = 3.0
+
+PROFILES = {
+    "before": {
+        "pragmas": [],
+        "created_at": "TEXT",
+        "indexes": [],
+    },
+    "after": {
+        "pragmas": ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}"],
+        "created_at": "INTEGER",
+        "indexes": [
+            "CREATE INDEX idx_predictions_created_at ON predictions (created_at, label)",
+            "CREATE INDEX idx_predictions_label ON predictions (label, created_at)",
+            "ANALYZE predictions",
+        ],
+    },
+}
+
+
+def connect(path, profile):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    conn.execute("PRAGMA busy_timeout=5000")
+    for pragma in profile["pragmas"]:
+        conn.execute(pragma)
+    return conn
+
+
+def timestamp(profile, when):
+    return int(when.timestamp()) if profile["created_at"] == "INTEGER" else when.isoformat()
+
+
+def setup(path, profile):
+    conn = connect(path, profile)
+    conn.execute(f"""
+        CREATE TABLE predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email_text_preview TEXT,
+            label INTEGER,
+            probability REAL,
+            created_at {profile['created_at']},
+            model_version TEXT
+        )
+    """)
+    rng = random.Random(0)
+    start = datetime.utcnow() - timedelta(days=30)
+    step = timedelta(days=30) / SEED_ROWS
+    conn.executemany(
+        "INSERT INTO predictions (email_text_preview, label, probability, created_at, model_version) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            ("preview " * 20, rng.randint(0, 1), rng.random(), timestamp(profile, start + step * i), "bench")
+            for i in range(SEED_ROWS)
+        ),
+    )
+    for statement in profile["indexes"]:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+
+def run(profile):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.remove(path)
+    try:
+        setup(path, profile)
+        stop = threading.Event()
+        counts = {"rows": 0, "reads": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def writer():
+            conn = connect(path, profile)
+            rng = random.Random(1)
+            while not stop.is_set():
+                now = datetime.utcnow()
+                rows = [("preview " * 20, rng.randint(0, 1), rng.random(), timestamp(profile, now), "bench")
+                        for _ in range(BATCH)]
+                try:
+                    conn.executemany(
+                        "INSERT INTO predictions (email_text_preview, label, probability, created_at, model_version) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    conn.commit()
+                    with lock:
+                        counts["rows"] += BATCH
+                except sqlite3.OperationalError:
+                    conn.rollback()
+                    with lock:
+                        counts["errors"] += 1
+            conn.close()
+
+        def reader():
+            conn = connect(path, profile)
+            while not stop.is_set():
+                since = timestamp(profile, datetime.utcnow() - timedelta(hours=1))
+                try:
+                    conn.execute(
+                        "SELECT label, COUNT(*) FROM predictions WHERE created_at >= ? GROUP BY label", (since,)
+                    ).fetchall()
+                    conn.execute(
+                        "SELECT COUNT(*) FROM predictions WHERE label = 1 AND created_at >= ?", (since,)
+                    ).fetchone()
+                    conn.execute("SELECT * FROM predictions ORDER BY id DESC LIMIT 50").fetchall()
+                    with lock:
+                        counts["reads"] += 1
+                except sqlite3.OperationalError:
+                    with lock:
+                        counts["errors"] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(READERS)]
+        for t in threads:
+            t.start()
+        time.sleep(SECONDS)
+        stop.set()
+        for t in threads:
+            t.join()
+        return counts
+    finally:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    print(f"{SEED_ROWS} seed rows, 1 writer ({BATCH} rows/commit), {READERS} readers, {SECONDS:.0f}s each")
+    print(f"{'profile':>8} {'rows/s':>10} {'reads/s':>9} {'errors':>7}")
+    for name, profile in PROFILES.items():
+        counts = run(profile)
+        print(f"{name:>8} {counts['rows'] / SECONDS:>10.0f} {counts['reads'] / SECONDS:>9.1f} {counts['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
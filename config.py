@@ -11,6 +11,10 @@ except ImportError:
 SPAM_PROBABILITY_THRESHOLD = float(os.getenv("SPAM_PROBABILITY_THRESHOLD", "0.5"))
 MAX_EMAIL_LENGTH = int(os.getenv("MAX_EMAIL_LENGTH", "100000"))
 
+# Streaming (out-of-core) training: rows per CSV chunk and hashed feature space size
+TRAIN_CHUNK_SIZE = int(os.getenv("TRAIN_CHUNK_SIZE", "10000"))
+HASHING_N_FEATURES = int(os.getenv("HASHING_N_FEATURES", str(2 ** 20)))
+
 # Suspicious keywords (comma-separated in env or default list)
 _SUSPICIOUS_RAW = os.getenv(
     "SUSPICIOUS_KEYWORDS",
@@ -19,9 +23,17 @@ _SUSPICIOUS_RAW = os.getenv(
 )
 SUSPICIOUS_KEYWORDS = [k.strip().lower() for k in _SUSPICIOUS_RAW.split(",") if k.strip()]
 
+# Optional threat-intel keyword list: one phrase per line, appended to the list above
+SUSPICIOUS_KEYWORDS_FILE = os.getenv("SUSPICIOUS_KEYWORDS_FILE", "")
+if SUSPICIOUS_KEYWORDS_FILE and os.path.isfile(SUSPICIOUS_KEYWORDS_FILE):
+    with open(SUSPICIOUS_KEYWORDS_FILE, encoding="utf-8") as _f:
+        SUSPICIOUS_KEYWORDS += [line.strip().lower() for line in _f if line.strip()]
+
 # Data paths
 DATA_DIR = os.getenv("DATA_DIR", "data")
 MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(DATA_DIR, "phishing_model.joblib"))
+COMPILED_MODEL_PATH = os.getenv("COMPILED_MODEL_PATH", os.path.join(DATA_DIR, "phishing_model.npz"))
+MODEL_RELOAD_CHECK_SECONDS = float(os.getenv("MODEL_RELOAD_CHECK_SECONDS", "2"))  # How often to stat model files
 TRAINING_DATA_PATH = os.getenv("TRAINING_DATA_PATH", os.path.join(DATA_DIR, "training_emails.csv"))
 
 # Ensure data directory exists for SQLite and model storage
@@ -30,14 +42,64 @@ if DATA_DIR and not os.path.exists(DATA_DIR):
 
 # Storage
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/emails.db")
+# SQLite connection profile: "tuned" (WAL, synchronous=NORMAL, memory-mapped I/O) or "default" (SQLite defaults)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned").lower()
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Retention (python main.py --retention): rows older than the age limit, or beyond the newest
+# RETENTION_MAX_ROWS, are archived to Parquet (one directory per day) and deleted in chunks. 0 disables a limit.
+RETENTION_MAX_AGE_DAYS = float(os.getenv("RETENTION_MAX_AGE_DAYS", "90"))
+RETENTION_MAX_ROWS = int(os.getenv("RETENTION_MAX_ROWS", "0"))
+RETENTION_ARCHIVE_ENABLED = os.getenv("RETENTION_ARCHIVE_ENABLED", "true").lower() in ("true", "1", "yes")
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", os.path.join(DATA_DIR, "archive"))
+RETENTION_CHUNK_ROWS = int(os.getenv("RETENTION_CHUNK_ROWS", "5000"))  # Rows archived and deleted per transaction
+RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "2000"))  # Free pages released after each chunk
+RETENTION_PAUSE_MS = float(os.getenv("RETENTION_PAUSE_MS", "50"))  # Pause between chunks so writers get in
+RETENTION_MINUTE_ROLLUP_DAYS = float(os.getenv("RETENTION_MINUTE_ROLLUP_DAYS", "7"))  # Hourly rollups are kept
+# Predictions are queued and written by a background thread in batches (every N rows or T ms)
+STORE_WRITE_BEHIND = os.getenv("STORE_WRITE_BEHIND", "true").lower() in ("true", "1", "yes")
+STORE_QUEUE_MAX_ROWS = int(os.getenv("STORE_QUEUE_MAX_ROWS", "10000"))
+STORE_FLUSH_ROWS = int(os.getenv("STORE_FLUSH_ROWS", "500"))
+STORE_FLUSH_MS = float(os.getenv("STORE_FLUSH_MS", "200"))
+# When the queue is full: "sync" (caller writes its rows itself), "block" (wait for room) or "drop"
+STORE_BACKPRESSURE = os.getenv("STORE_BACKPRESSURE", "sync").lower()
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))  # Seconds; bounds connect and command time
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))  # Pool shared by all threads in the process
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "json").lower()  # json or msgpack (falls back to json if not installed)
+# After a Redis failure, skip Redis for a back-off that doubles per failure up to the max
+REDIS_BREAKER_BASE_DELAY = float(os.getenv("REDIS_BREAKER_BASE_DELAY", "1"))
+REDIS_BREAKER_MAX_DELAY = float(os.getenv("REDIS_BREAKER_MAX_DELAY", "60"))
+# In-process cache tier checked before Redis
+LOCAL_CACHE_MAX_ITEMS = int(os.getenv("LOCAL_CACHE_MAX_ITEMS", "10000"))
+LOCAL_CACHE_TTL_SECONDS = float(os.getenv("LOCAL_CACHE_TTL_SECONDS", "300"))
 
 # API
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "5000"))
+API_BATCH_MAX_ITEMS = int(os.getenv("API_BATCH_MAX_ITEMS", "1000"))  # Max emails per /classify/batch request
+# Coalesce concurrent /classify requests into one model call (batch closes when full or after max wait)
+CLASSIFY_COALESCE_ENABLED = os.getenv("CLASSIFY_COALESCE_ENABLED", "false").lower() in ("true", "1", "yes")
+CLASSIFY_BATCH_MAX_SIZE = int(os.getenv("CLASSIFY_BATCH_MAX_SIZE", "64"))
+CLASSIFY_BATCH_MAX_WAIT_MS = float(os.getenv("CLASSIFY_BATCH_MAX_WAIT_MS", "3"))
 
 # Alerting
 ALERT_PROBABILITY_THRESHOLD = float(os.getenv("ALERT_PROBABILITY_THRESHOLD", "0.9"))
+# Alert emails go through a background dispatcher that keeps one SMTP connection open
+ALERT_DISPATCH_ASYNC = os.getenv("ALERT_DISPATCH_ASYNC", "true").lower() in ("true", "1", "yes")
+ALERT_QUEUE_MAX = int(os.getenv("ALERT_QUEUE_MAX", "1000"))  # Alerts beyond this are dropped (logged)
+ALERT_DIGEST_SECONDS = float(os.getenv("ALERT_DIGEST_SECONDS", "0"))  # Merge alerts raised within this window; 0 = off
+ALERT_RATE_LIMIT = int(os.getenv("ALERT_RATE_LIMIT", "20"))  # Max alert emails per recipient per window; 0 = no limit
+ALERT_RATE_WINDOW_SECONDS = float(os.getenv("ALERT_RATE_WINDOW_SECONDS", "3600"))
+ALERT_SMTP_IDLE_SECONDS = float(os.getenv("ALERT_SMTP_IDLE_SECONDS", "60"))  # Close the SMTP connection after this idle time
+ALERT_SMTP_TIMEOUT = float(os.getenv("ALERT_SMTP_TIMEOUT", "30"))
+ALERT_SEND_ATTEMPTS = int(os.getenv("ALERT_SEND_ATTEMPTS", "3"))  # Tries per alert email before it is dropped
+ALERT_RETRY_BASE_SECONDS = float(os.getenv("ALERT_RETRY_BASE_SECONDS", "5"))  # Doubles after each failed try
+# Suppress repeat alerts for one campaign (same normalized subject, sender domain and body) within a TTL
+ALERT_SUPPRESS_ENABLED = os.getenv("ALERT_SUPPRESS_ENABLED", "true").lower() in ("true", "1", "yes")
+ALERT_SUPPRESS_TTL_SECONDS = float(os.getenv("ALERT_SUPPRESS_TTL_SECONDS", "3600"))
+ALERT_SUPPRESS_MAX_ITEMS = int(os.getenv("ALERT_SUPPRESS_MAX_ITEMS", "10000"))
+ALERT_SUPPRESS_SHARED = os.getenv("ALERT_SUPPRESS_SHARED", "false").lower() in ("true", "1", "yes")  # via Redis
 
 # Personal mail connection (IMAP read, SMTP send alerts)
 EMAIL_IMAP_HOST = os.getenv("EMAIL_IMAP_HOST", "imap.gmail.com")
@@ -49,3 +111,20 @@ EMAIL_SMTP_PORT = int(os.getenv("EMAIL_SMTP_PORT", "587"))
 EMAIL_ALERT_TO = os.getenv("EMAIL_ALERT_TO", "")  # Where to send "unsafe email detected" alerts
 EMAIL_ALERTS_ENABLED = os.getenv("EMAIL_ALERTS_ENABLED", "false").lower() in ("true", "1", "yes")
 EMAIL_CHECK_MAX = int(os.getenv("EMAIL_CHECK_MAX", "10"))  # Max recent emails to scan per run
+EMAIL_FETCH_BODY_BYTES = int(os.getenv("EMAIL_FETCH_BODY_BYTES", "16384"))  # Body prefix fetched per message
+EMAIL_FETCH_BATCH = int(os.getenv("EMAIL_FETCH_BATCH", "50"))  # UIDs per FETCH command
+EMAIL_IMAP_TIMEOUT = float(os.getenv("EMAIL_IMAP_TIMEOUT", "30"))  # Socket timeout for IMAP commands
+# Auto-monitor: wait with IMAP IDLE where the server supports it, else poll every EMAIL_POLL_INTERVAL seconds
+EMAIL_IDLE_ENABLED = os.getenv("EMAIL_IDLE_ENABLED", "true").lower() in ("true", "1", "yes")
+EMAIL_IDLE_RENEW_SECONDS = float(os.getenv("EMAIL_IDLE_RENEW_SECONDS", "540"))  # Re-issue IDLE before servers drop it
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "60"))
+EMAIL_MONITOR_FOLDERS = [f.strip() for f in os.getenv("EMAIL_MONITOR_FOLDERS", "INBOX,[Gmail]/Spam").split(",") if f.strip()]
+# Back-off between reconnect attempts of a monitor session: doubles from base to max seconds
+EMAIL_RECONNECT_BASE_DELAY = float(os.getenv("EMAIL_RECONNECT_BASE_DELAY", "1"))
+EMAIL_RECONNECT_MAX_DELAY = float(os.getenv("EMAIL_RECONNECT_MAX_DELAY", "300"))
+# Multi-account monitor: JSON file of mailboxes (see PERSONAL_MAIL.md), IMAP operations in flight at once,
+# and the shared scoring stage's batch size / collection window
+EMAIL_ACCOUNTS_FILE = os.getenv("EMAIL_ACCOUNTS_FILE", "")
+EMAIL_MAX_CONCURRENT_SESSIONS = int(os.getenv("EMAIL_MAX_CONCURRENT_SESSIONS", "16"))
+EMAIL_SCORE_BATCH_MAX = int(os.getenv("EMAIL_SCORE_BATCH_MAX", "256"))
+EMAIL_SCORE_BATCH_WAIT_MS = float(os.getenv("EMAIL_SCORE_BATCH_WAIT_MS", "50"))
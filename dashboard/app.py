@@ -3,7 +3,7 @@ import os
 import streamlit as st
 
 from config import MODEL_PATH, SPAM_PROBABILITY_THRESHOLD
-from storage.database import get_recent_results, init_db, store_result
+from storage.database import flush_results, get_recent_results, get_stats, init_db, store_result
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -84,8 +84,11 @@ with st.sidebar:
     st.markdown("---")
     st.metric("Model status", "Loaded" if model_exists else "Not trained")
     if model_exists:
-        recent = get_recent_results(limit=1000)
-        st.metric("Phishing detected (last 1k)", sum(1 for r in recent if r["label"] == 1))
+        day = get_stats("24h")
+        st.metric("Phishing detected (24h)", day["phishing"], help=f"{day['total']} emails checked in the last 24 hours")
+        if day["total"]:
+            st.bar_chart({"phishing": [b["phishing"] for b in day["buckets"]],
+                          "legitimate": [b["total"] - b["phishing"] for b in day["buckets"]]})
 
 # ----- Hero -----
 st.markdown('<p class="main-header"> Email Phishing Checker</p>', unsafe_allow_html=True)
@@ -119,12 +122,12 @@ if model_exists:
         if st.button("Check this email", type="primary"):
             if (email_input or "").strip():
                 try:
-                    from ml.classifier import PhishingClassifier
-                    clf = PhishingClassifier()
-                    clf.load()
-                    label, prob = clf.predict_single(email_input.strip())
+                    from ml.registry import current_model
+                    clf, model_version = current_model()
+                    labels, probs = clf.score([email_input.strip()])
+                    label, prob = labels[0], probs[0]
                     preview = (email_input.strip()[:500] or "").replace("\n", " ")
-                    store_result(preview, label, prob)
+                    store_result(preview, label, prob, model_version=model_version)
                     if label == 1:
                         st.error(f" **Phishing** — {prob:.1%} confidence. Be careful with this message.")
                     else:
@@ -174,13 +177,12 @@ st.caption("Classification results for all built-in sample emails (legitimate an
 if model_exists:
     try:
         from capture.data_generator import get_sample_emails_for_demo
-        from ml.classifier import PhishingClassifier
+        from ml.registry import get_model
         samples = get_sample_emails_for_demo()
-        clf = PhishingClassifier()
-        clf.load()
+        clf = get_model()
         rows = []
-        for s in samples:
-            label, prob = clf.predict_single(s["text"])
+        labels, probs = clf.score([s["text"] for s in samples])
+        for s, label, prob in zip(samples, labels, probs):
             expected = "Legitimate" if s["expected_label"] == 0 else "Phishing"
             predicted = "Legitimate" if label == 0 else "Phishing"
             match = " " if label == s["expected_label"] else "❌"
@@ -206,23 +208,23 @@ st.divider()
 results = get_recent_results(limit=50)
 if not results and model_exists:
     try:
-        from ml.classifier import PhishingClassifier
-        clf = PhishingClassifier()
-        clf.load()
-        for text in [
+        from ml.registry import current_model
+        clf, model_version = current_model()
+        seed_texts = [
             "Urgent: Verify your account. Click here to confirm.",
             "Hi, meeting tomorrow at 10am in room B. Best regards",
             "You have won a prize! Confirm your details now to claim.",
-        ]:
-            label, prob = clf.predict_single(text)
-            store_result(text[:500], label, prob)
+        ]
+        labels, probs = clf.score(seed_texts)
+        for text, label, prob in zip(seed_texts, labels, probs):
+            store_result(text[:500], label, prob, model_version=model_version)
+        flush_results()
         results = get_recent_results(limit=50)
     except Exception as e:
         logger.exception("Seed: %s", e)
 
 # ----- Recent checks -----
 st.subheader(" Recent checks")
-results = get_recent_results(limit=50)
 if not results:
     st.info("No checks yet. Use **Check your email** above or the API to submit emails.")
 else:
@@ -1,14 +1,20 @@
 """Feature extraction and detection logic."""
-from detection.text_analysis import clean_text, get_keyword_frequencies
+from detection.text_analysis import clean_text, normalize_text, get_keyword_frequencies
 from detection.header_analysis import analyze_headers
+from detection.header_index import HeaderIndex, parse_headers
 from detection.link_analysis import extract_urls, analyze_links
-from detection.entropy import shannon_entropy
+from detection.entropy import shannon_entropy, byte_entropy_batch, high_entropy_segments
 
 __all__ = [
     "clean_text",
+    "normalize_text",
     "get_keyword_frequencies",
     "analyze_headers",
+    "HeaderIndex",
+    "parse_headers",
     "extract_urls",
     "analyze_links",
     "shannon_entropy",
+    "byte_entropy_batch",
+    "high_entropy_segments",
 ]
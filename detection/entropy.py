@@ -1,9 +1,33 @@
 """Calculates Shannon entropy on text segments to find obfuscated content."""
 import math
 from collections import Counter
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 from utils.helpers import safe_str
 
+# (start, end, max_entropy) of a high-entropy region, as byte offsets into the UTF-8 text
+Segment = Tuple[int, int, float]
+
+
+def _entropy_from_counts(counts: np.ndarray) -> float:
+    """Shannon entropy (bits) of a histogram."""
+    counts = counts[counts > 0]
+    n = counts.sum()
+    if n == 0:
+        return 0.0
+    p = counts / n
+    return float(-(p * np.log2(p)).sum()) + 0.0  # no -0.0 for a single symbol
+
+
+def _to_bytes(data: Union[str, bytes]) -> bytes:
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return bytes(data)
+    # Not safe_str: stripping would shift the offsets reported by the scanner.
+    # surrogatepass: lone surrogates (JSON "\ud800", surrogateescape decoding) must not raise
+    return data.encode("utf-8", "surrogatepass") if isinstance(data, str) else b""
+
 
 def shannon_entropy(text: str) -> float:
     """
@@ -13,12 +37,38 @@ def shannon_entropy(text: str) -> float:
     text = safe_str(text)
     if not text:
         return 0.0
-    counter = Counter(text)
-    n = len(text)
-    return -sum(
-        (count / n) * math.log2(count / n)
-        for count in counter.values()
-    )
+    if text.isascii():
+        counts = np.bincount(np.frombuffer(text.encode("ascii"), dtype=np.uint8))
+    else:
+        codepoints = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        _, counts = np.unique(codepoints, return_counts=True)
+    return _entropy_from_counts(counts)
+
+
+def byte_entropy(data: Union[str, bytes]) -> float:
+    """Shannon entropy over the UTF-8 bytes of data (256-bin histogram)."""
+    raw = _to_bytes(data)
+    if not raw:
+        return 0.0
+    return _entropy_from_counts(np.bincount(np.frombuffer(raw, dtype=np.uint8), minlength=256))
+
+
+def byte_entropy_batch(documents: Sequence[Union[str, bytes]]) -> List[float]:
+    """
+    byte_entropy for many documents with one histogram pass over all of them.
+    Equals shannon_entropy for ASCII text.
+    """
+    if not documents:
+        return []
+    encoded = [_to_bytes(d) for d in documents]
+    lengths = np.array([len(b) for b in encoded], dtype=np.int64)
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int64)
+    doc_ids = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+    counts = np.bincount(doc_ids * 256 + data, minlength=len(encoded) * 256).reshape(len(encoded), 256)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = counts / lengths[:, None]
+        terms = np.where(counts > 0, p * np.log2(p), 0.0)
+    return (0.0 - terms.sum(axis=1)).tolist()
 
 
 def word_entropy(text: str) -> float:
@@ -26,9 +76,96 @@ def word_entropy(text: str) -> float:
     words = safe_str(text).split()
     if not words:
         return 0.0
-    counter = Counter(words)
-    n = len(words)
-    return -sum(
-        (count / n) * math.log2(count / n)
-        for count in counter.values()
-    )
+    return _entropy_from_counts(np.fromiter(Counter(words).values(), dtype=np.int64))
+
+
+class SlidingWindowEntropy:
+    """
+    Streaming byte-entropy scanner over a fixed-size sliding window.
+
+    Byte counts and the running sum of c*log2(c) are updated incrementally as each
+    byte enters and leaves the window, so scanning is O(n) whatever the window
+    size. Windows whose entropy is at or above threshold are merged into segments
+    (start, end, max_entropy) with byte offsets from the start of the stream.
+    """
+
+    def __init__(self, window: int = 64, threshold: float = 4.8):
+        if window < 2:
+            raise ValueError("window must be >= 2")
+        self.window = window
+        self.threshold = threshold
+        # Change in sum(c*log2(c)) when a count goes from c to c+1
+        f = [c * math.log2(c) if c else 0.0 for c in range(window + 2)]
+        self._delta = [f[c + 1] - f[c] for c in range(window + 1)]
+        self._log_window = math.log2(window)
+        self._counts = [0] * 256
+        self._sum = 0.0
+        self._tail = b""  # last `window` bytes seen
+        self._offset = 0  # bytes consumed so far
+        self._open: Optional[List[float]] = None  # [start, end, max_entropy] of the current segment
+        self.max_entropy = 0.0
+
+    def feed(self, data: Union[str, bytes]) -> List[Segment]:
+        """Consume more of the stream; returns segments that ended within this chunk."""
+        chunk = _to_bytes(data)
+        if not chunk:
+            return []
+        window, delta, counts = self.window, self._delta, self._counts
+        log_window, threshold = self._log_window, self.threshold
+        buf = self._tail + chunk
+        base = len(self._tail)  # index in buf of chunk[0]
+        offset = self._offset - base  # stream offset of buf[0]
+        total = self._sum
+        closed: List[Segment] = []
+        seg = self._open
+        best = self.max_entropy
+        for i in range(base, len(buf)):
+            b = buf[i]
+            c = counts[b]
+            total += delta[c]
+            counts[b] = c + 1
+            pos = offset + i  # stream offset of the byte just added
+            if pos >= window:
+                out = buf[i - window]
+                c = counts[out]
+                total -= delta[c - 1]
+                counts[out] = c - 1
+            elif pos < window - 1:
+                continue
+            h = log_window - total / window
+            if h > best:
+                best = h
+            if h >= threshold:
+                if seg is None:
+                    seg = [pos + 1 - window, pos + 1, h]
+                else:
+                    seg[1] = pos + 1
+                    if h > seg[2]:
+                        seg[2] = h
+            elif seg is not None:
+                closed.append((int(seg[0]), int(seg[1]), float(seg[2])))
+                seg = None
+        self._sum = total
+        self._open = seg
+        self.max_entropy = best
+        self._offset += len(chunk)
+        self._tail = buf[-window:]
+        return closed
+
+    def close(self) -> List[Segment]:
+        """End of stream: returns the segment still open, if any."""
+        seg, self._open = self._open, None
+        return [(int(seg[0]), int(seg[1]), float(seg[2]))] if seg else []
+
+
+def high_entropy_segments(
+    text: Union[str, bytes],
+    window: int = 64,
+    threshold: float = 4.8,
+) -> List[Segment]:
+    """
+    Byte ranges of text whose sliding-window entropy is at or above threshold,
+    e.g. a short base64 blob inside an otherwise normal email.
+    """
+    scanner = SlidingWindowEntropy(window=window, threshold=threshold)
+    return scanner.feed(text) + scanner.close()
@@ -1,25 +1,20 @@
 """Analyzes email headers for spoofing indicators."""
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from utils.helpers import safe_str
+from detection.header_index import HeaderIndex, parse_headers
 
 
-def _extract_header(raw: str, name: str) -> str:
-    """Extract first value for a header (e.g. From, Reply-To)."""
-    pattern = re.compile(rf"^{name}:\s*(.+?)(?:\r?\n(?!\s)|$)", re.MULTILINE | re.IGNORECASE)
-    m = pattern.search(raw)
-    return m.group(1).strip() if m else ""
-
-
-def analyze_headers(raw_email: str) -> Dict[str, Any]:
+def analyze_headers(raw_email: str, headers: Optional[HeaderIndex] = None) -> Dict[str, Any]:
     """
     Analyze headers for spoofing indicators.
     Returns dict with from_addr, reply_to, mismatch (From vs Reply-To), etc.
+    Pass headers (e.g. ParsedEmail.headers) to reuse an existing header index.
     """
-    raw = safe_str(raw_email)
-    from_addr = _extract_header(raw, "From")
-    reply_to = _extract_header(raw, "Reply-To")
+    if headers is None:
+        headers = parse_headers(raw_email)
+    from_addr = headers.get("From")
+    reply_to = headers.get("Reply-To")
     # Normalize for comparison: take email part if present
     from_email = _extract_email(from_addr)
     reply_email = _extract_email(reply_to)
@@ -31,6 +26,10 @@ def analyze_headers(raw_email: str) -> Dict[str, Any]:
         "reply_to_email": reply_email,
         "from_reply_mismatch": mismatch,
         "has_reply_to": bool(reply_to),
+        "return_path": headers.return_path,
+        "message_id": headers.message_id,
+        "received_hops": len(headers.received),
+        "authentication_results": headers.authentication_results,
     }
 
 
@@ -0,0 +1,114 @@
+"""One-pass index over an email's header block (case-insensitive multi-map)."""
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Field name: printable ASCII except colon and space (RFC 5322)
+_FIELD_NAME = re.compile(r"[!-9;-~]+")
+_BLANK_LINE = re.compile(r"\r?\n\r?\n")
+_LEADING_SPACE = re.compile(r"\s*")
+
+
+class HeaderIndex:
+    """
+    All header fields of one message, parsed once. Folded (continuation) lines are
+    unfolded; names are case-insensitive; repeated fields (e.g. Received) keep
+    every value in order.
+    """
+
+    def __init__(self, fields: List[Tuple[str, str]], header_end: int, body_offset: Optional[int]):
+        self.fields = fields  # (name as written, unfolded value) in message order
+        self.header_end = header_end  # offset where header parsing stopped
+        self.body_offset = body_offset  # offset just after the blank line, if the block ended with one
+        self._by_name: Dict[str, List[str]] = {}
+        for name, value in fields:
+            self._by_name.setdefault(name.lower(), []).append(value)
+
+    def get(self, name: str, default: str = "") -> str:
+        """First value of a header, or default."""
+        values = self._by_name.get(name.lower())
+        return values[0] if values else default
+
+    def get_all(self, name: str) -> List[str]:
+        """Every value of a header, in message order."""
+        return list(self._by_name.get(name.lower(), ()))
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._by_name
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    @property
+    def received(self) -> List[str]:
+        """Received hops, most recent first (as they appear in the message)."""
+        return self.get_all("Received")
+
+    @property
+    def return_path(self) -> str:
+        return self.get("Return-Path")
+
+    @property
+    def authentication_results(self) -> List[str]:
+        return self.get_all("Authentication-Results")
+
+    @property
+    def message_id(self) -> str:
+        return self.get("Message-ID")
+
+
+def parse_headers(raw: str) -> HeaderIndex:
+    """
+    Index the header block at the top of raw. Scanning stops at the first blank
+    line (or the first line that is neither a field nor a continuation), so the
+    body is never read. Leading whitespace is skipped; offsets in the result refer
+    to raw as passed.
+    """
+    raw = raw if isinstance(raw, str) else ""
+    n = len(raw)
+    fields: List[Tuple[str, str]] = []
+    name: Optional[str] = None
+    parts: List[str] = []
+    body_offset: Optional[int] = None
+    pos = start = _LEADING_SPACE.match(raw).end()
+
+    def flush() -> None:
+        if name is not None:
+            fields.append((name, " ".join(p for p in (s.strip() for s in parts) if p)))
+
+    while pos < n:
+        nl = raw.find("\n", pos)
+        line_end = n if nl == -1 else nl
+        line = raw[pos:line_end]
+        if line.endswith("\r"):
+            line = line[:-1]
+        next_pos = line_end + 1
+        if not line:
+            body_offset = min(next_pos, n)
+            break
+        if line[0] in " \t":
+            if name is None:
+                break
+            parts.append(line)
+        else:
+            colon = line.find(":")
+            if colon > 0 and _FIELD_NAME.fullmatch(line, 0, colon):
+                flush()
+                name, parts = line[:colon], [line[colon + 1:]]
+            elif pos == start and line.startswith("From "):
+                pass  # mbox separator line
+            else:
+                break
+        pos = next_pos
+    flush()
+    return HeaderIndex(fields, header_end=min(pos, n), body_offset=body_offset)
+
+
+def find_body_offset(raw: str, headers: HeaderIndex) -> Optional[int]:
+    """Offset just after the first blank line in raw, reusing the header scan where possible."""
+    if headers.body_offset is not None:
+        return headers.body_offset
+    m = _BLANK_LINE.search(raw, headers.header_end)
+    return m.end() if m else None
@@ -0,0 +1,110 @@
+"""Aho-Corasick multi-pattern matcher for counting suspicious keywords in one pass."""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+
+# Below this many keywords, per-keyword str.count (C-speed scans) beats the Python-level
+# automaton walk; see benchmarks/bench_keywords.py
+AUTOMATON_MIN_KEYWORDS = 256
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Automaton over a fixed keyword list. For large lists (and for word-boundary
+    matching) count() scans the text once, whatever the number of keywords.
+    Counts follow str.count semantics (non-overlapping occurrences of each
+    keyword, scanning left to right).
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(dict.fromkeys(k.lower() for k in keywords if k))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]  # (keyword index, keyword length)
+        for idx, kw in enumerate(self.keywords):
+            self._add(idx, kw)
+        self._build_links()
+        self._alphabet = frozenset(ch for edges in self._goto for ch in edges)
+
+    def _add(self, idx: int, kw: str) -> None:
+        state = 0
+        for ch in kw:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((idx, len(kw)))
+
+    def _build_links(self) -> None:
+        """Breadth-first failure links; each state's output includes its suffix states' output."""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def count(self, text: str, word_boundary: bool = False) -> Dict[str, int]:
+        """
+        Count occurrences of every keyword in text (case-sensitive; lowercase the text
+        first for case-insensitive matching). With word_boundary=True a match only
+        counts when it is not preceded or followed by a letter, digit or underscore.
+        """
+        if not word_boundary and len(self.keywords) < AUTOMATON_MIN_KEYWORDS:
+            return {kw: text.count(kw) for kw in self.keywords}
+        return self.count_automaton(text, word_boundary)
+
+    def count_automaton(self, text: str, word_boundary: bool = False) -> Dict[str, int]:
+        """Single pass over text with the automaton (see count)."""
+        counts = [0] * len(self.keywords)
+        next_free = [0] * len(self.keywords)  # end of the last counted match, per keyword
+        goto, fail, out, alphabet = self._goto, self._fail, self._out, self._alphabet
+        n = len(text)
+        state = 0
+        for i, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            for idx, length in out[state]:
+                start = end - length
+                if start < next_free[idx]:
+                    continue
+                if word_boundary and (
+                    (start > 0 and _is_word_char(text[start - 1])) or (end < n and _is_word_char(text[end]))
+                ):
+                    continue
+                counts[idx] += 1
+                next_free[idx] = end
+        return dict(zip(self.keywords, counts))
+
+
+@lru_cache(maxsize=8)
+def _cached_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def get_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """Matcher for this keyword list; the automaton is rebuilt only when the list changes."""
+    return _cached_matcher(tuple(keywords))
@@ -3,6 +3,7 @@ import re
 from typing import Dict, List
 
 from config import SUSPICIOUS_KEYWORDS
+from detection.keyword_matcher import get_matcher
 from utils.helpers import safe_str
 
 
@@ -18,27 +19,96 @@ def remove_special_chars(text: str) -> str:
     return re.sub(r"[^a-zA-Z0-9\s]", " ", text)
 
 
+# One pass: an HTML tag (dropped) or a run of ASCII letters/digits (kept). Everything
+# else is a separator, so joining the runs with single spaces gives exactly what
+# strip_html -> remove_special_chars -> whitespace collapse produces.
+_TAG_OR_WORD = re.compile(r"<[^>]+>|([a-zA-Z0-9]+)")
+_NON_WORD = re.compile(r"[^a-zA-Z0-9]")
+# A drop pattern match can only start at these characters, never span one (see normalize_text)
+_DROP_BOUNDARY = re.compile(r"[\s&#\"'<>]")
+# How far past a chunk boundary to look for one, so a dropped match is not split
+_DROP_CUT_LOOKAHEAD = 8192
+
+# Input characters scanned per step when normalizing with a length limit
+_NORMALIZE_CHUNK = 65536
+
+
+def _safe_cut(text: str, pos: int, target: int) -> int:
+    """
+    First position at or after target where text can be split without changing how
+    _TAG_OR_WORD matches: outside any word and outside any possible tag.
+    """
+    n = len(text)
+    if target >= n:
+        return n
+    m = _NON_WORD.search(text, target)
+    cut = m.start() if m else n
+    lt = text.rfind("<", pos, cut)
+    if lt != -1 and text.find(">", lt, cut) == -1:
+        # An unclosed "<" before the cut: it becomes a tag if a ">" follows, so cut after it
+        gt = text.find(">", cut)
+        if gt != -1:
+            cut = gt + 1
+    return cut
+
+
+def normalize_text(text: str, max_length: int | None = None, drop: re.Pattern | None = None) -> str:
+    """
+    Fused clean_text: strip HTML, drop special chars and collapse whitespace in a
+    single scan. With max_length, returns clean_text(text)[:max_length] but stops
+    scanning once that many output characters exist. With drop, matches of that
+    pattern are removed first, also only as far as the scan goes; a match may
+    contain whitespace, "&", "#", quotes, "<" or ">" only as its first character.
+    """
+    text = safe_str(text)
+    n = len(text)
+    # Output is never longer than input, so short inputs need no early stop
+    if max_length is None or n <= max_length:
+        if drop is not None:
+            text = drop.sub("", text)
+        return " ".join(filter(None, _TAG_OR_WORD.findall(text)))
+    words: List[str] = []
+    size = -1  # no separator before the first word
+    pos = 0
+    while pos < n:
+        target = pos + max(max_length, _NORMALIZE_CHUNK)
+        if drop is not None and target < n:
+            boundary = _DROP_BOUNDARY.search(text, target, target + _DROP_CUT_LOOKAHEAD)
+            target = boundary.start() if boundary else target + _DROP_CUT_LOOKAHEAD
+        cut = _safe_cut(text, pos, target)
+        if drop is not None:
+            chunk_words = list(filter(None, _TAG_OR_WORD.findall(drop.sub("", text[pos:cut]))))
+        else:
+            chunk_words = list(filter(None, _TAG_OR_WORD.findall(text, pos, cut)))
+        words += chunk_words
+        size += sum(map(len, chunk_words)) + len(chunk_words)
+        if size >= max_length:
+            break
+        pos = cut
+    return " ".join(words)[:max_length]
+
+
 def clean_text(text: str) -> str:
     """Strip HTML, remove special chars, normalize whitespace."""
-    text = strip_html(text)
-    text = remove_special_chars(text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return normalize_text(text)
 
 
-def get_keyword_frequencies(text: str, keywords: List[str] | None = None) -> Dict[str, int]:
-    """Count how often each keyword appears in text (case-insensitive)."""
+def get_keyword_frequencies(
+    text: str,
+    keywords: List[str] | None = None,
+    word_boundary: bool = False,
+) -> Dict[str, int]:
+    """
+    Count how often each keyword appears in text (case-insensitive), in one pass
+    over the cleaned text. With word_boundary=True, "account" no longer matches
+    inside "accounts".
+    """
     keywords = keywords or SUSPICIOUS_KEYWORDS
     text = clean_text(text).lower()
-    words = set(text.split())
-    freq = {}
-    for kw in keywords:
-        kw_lower = kw.lower()
-        freq[kw_lower] = text.count(kw_lower)
-    return freq
+    return get_matcher(keywords).count(text, word_boundary=word_boundary)
 
 
-def keyword_score(text: str, keywords: List[str] | None = None) -> float:
+def keyword_score(text: str, keywords: List[str] | None = None, word_boundary: bool = False) -> float:
     """Sum of keyword frequencies; used as a simple phishing signal."""
-    freqs = get_keyword_frequencies(text, keywords)
+    freqs = get_keyword_frequencies(text, keywords, word_boundary)
     return sum(freqs.values())
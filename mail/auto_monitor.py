@@ -1,48 +1,226 @@
+"""
+Automatic mail monitoring.
+
+Each monitored folder gets a long-lived MonitorWorker: one IMAP session, kept
+alive by IDLE renewals or NOOPs and reconnected with back-off if it drops, and
+one loaded classifier passed to every check, so steady-state cycles do no TLS
+handshakes, logins or model loads.
+
+Where the server supports IDLE, the session waits for the server to push
+EXISTS/RECENT and checks the folder within seconds of new mail, re-issuing IDLE
+every EMAIL_IDLE_RENEW_SECONDS. Otherwise it polls the folder every
+EMAIL_POLL_INTERVAL seconds on the same session, without logging in again.
+
+Only mail past the folder's stored UID watermark (storage.watermarks) is fetched
+and classified, so a restart neither re-classifies nor re-alerts.
+"""
 import time
 import logging
-from typing import Set
+import threading
+from typing import Callable, List, Optional, Tuple
 
-from mail.imap_client import fetch_recent_emails
+from mail.imap_client import fetch_uids, search_uids
 from mail.checker import check_inbox_and_alert
-from config import EMAIL_ALERTS_ENABLED
+from mail.session import ImapSession, has_new_mail
+from ml.registry import get_registry
+from storage.database import flush_results, get_watermark, set_watermark
+from config import (
+    EMAIL_ALERTS_ENABLED,
+    EMAIL_USER,
+    EMAIL_PASSWORD,
+    EMAIL_IDLE_ENABLED,
+    EMAIL_IDLE_RENEW_SECONDS,
+    EMAIL_POLL_INTERVAL,
+    EMAIL_MONITOR_FOLDERS,
+    EMAIL_RECONNECT_BASE_DELAY,
+    EMAIL_RECONNECT_MAX_DELAY,
+)
 
-CHECK_INTERVAL = 60
+CHECK_INTERVAL = EMAIL_POLL_INTERVAL  # polling fallback when the server has no IDLE
+MAX_EMAILS_PER_CHECK = 20
 
 logging.basicConfig(level=logging.INFO)
 
-processed_subjects: Set[str] = set()
 
-def run_auto_monitor():
-    logging.info("📡 Automatic email monitoring started...")
+def uids_to_check(session: ImapSession, folder: str, mark: Optional[Tuple[int, int]]) -> Tuple[List[int], int]:
+    """UIDs to classify and the watermark to record after classifying them."""
+    uidvalidity = session.uidvalidity or 0
+    if mark is not None and mark[0] == uidvalidity:
+        last_uid = mark[1]
+        # "n:*" also matches the highest UID when nothing is newer, so filter
+        uids = [u for u in search_uids(session.conn, f"UID {last_uid + 1}:*") if u > last_uid]
+        return uids, max([last_uid] + uids)
+    if mark is not None:
+        logging.warning("UIDVALIDITY of %s changed; starting again from recent unseen mail.", folder)
+    # First check of this folder: recent unseen mail only, then everything from UIDNEXT on
+    uids = search_uids(session.conn, "UNSEEN")[-MAX_EMAILS_PER_CHECK:]
+    return uids, max([(session.uidnext or 1) - 1] + uids)
+
+
+def check_folder(session: ImapSession, folder: str, classifier=None, model_version: Optional[str] = None) -> int:
+    """Classify mail that arrived in the selected folder since its watermark; returns how many emails were new."""
+    account = session.user
+    mark = get_watermark(account, folder)
+    uids, last_uid = uids_to_check(session, folder, mark)
+    new_emails = fetch_uids(session.conn, uids[::-1], folder=folder) if uids else []
+
+    if not new_emails:
+        logging.info("No new emails in %s.", folder)
+    else:
+        logging.info(f"{len(new_emails)} new email(s) detected in {folder}.")
+
+        total, phishing, results = check_inbox_and_alert(
+            emails=new_emails,
+            send_alert=EMAIL_ALERTS_ENABLED,
+            dry_run=False,
+            classifier=classifier,
+            model_version=model_version,
+        )
+
+        logging.info(f"Phishing detected: {phishing}")
+        if not flush_results():  # results are on disk before the watermark moves past them
+            logging.warning("Results for %s not flushed; watermark kept, mail will be checked again.", folder)
+            return len(new_emails)
 
-    while True:
-        try:
-            logging.info("Checking for new emails...")
+    if mark != (session.uidvalidity or 0, last_uid):
+        set_watermark(account, folder, session.uidvalidity or 0, last_uid)
+    return len(new_emails)
 
-            all_emails = fetch_recent_emails(max_emails=20)
 
-            new_emails = [
-                em for em in all_emails
-                if em.subject not in processed_subjects
-            ]
+def watch_folder(
+    session: ImapSession,
+    folder: str,
+    on_change: Callable[[ImapSession, str], object] = check_folder,
+    stop: Optional[threading.Event] = None,
+    idle: Optional[bool] = None,
+    renew_seconds: Optional[float] = None,
+    poll_interval: Optional[float] = None,
+) -> None:
+    """
+    Check the folder now and again after every change until stop is set: on an
+    EXISTS/RECENT push while idling, or every poll_interval seconds if IDLE is off
+    or unsupported. Errors propagate so the caller can reconnect.
+    """
+    stop = stop or threading.Event()
+    use_idle = (EMAIL_IDLE_ENABLED if idle is None else idle) and session.supports_idle
+    renew_seconds = renew_seconds or EMAIL_IDLE_RENEW_SECONDS
+    poll_interval = poll_interval or EMAIL_POLL_INTERVAL
+    if not use_idle:
+        logging.info("IDLE not available for %s; polling every %ss.", folder, poll_interval)
 
-            if not new_emails:
-                logging.info("No new emails.")
-            else:
-                logging.info(f"{len(new_emails)} new email(s) detected.")
+    session.select(folder)
+    on_change(session, folder)
+    while not stop.is_set():
+        if use_idle:
+            # Returns on new mail, on stop, or after renew_seconds so IDLE is re-issued in time
+            if not has_new_mail(session.idle(renew_seconds, stop)):
+                continue
+        else:
+            if stop.wait(poll_interval):
+                break
+            session.noop()  # keepalive; lets the server report messages that arrived since the last check
+        if not stop.is_set():
+            on_change(session, folder)
 
-                total, phishing, results = check_inbox_and_alert(
-                    emails=new_emails,
-                    send_alert=EMAIL_ALERTS_ENABLED,
-                    dry_run=False
-                )
 
-                for em in new_emails:
-                    processed_subjects.add(em.subject)
+class MonitorWorker:
+    """
+    Watches one folder for the lifetime of the process with one IMAP session,
+    reconnected with exponential back-off when it drops, and one classifier.
+    Without an injected classifier the process-wide registry's model is used,
+    which only reloads when the model file changes.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        classifier=None,
+        model_version: Optional[str] = None,
+        session_factory: Callable[[], ImapSession] = ImapSession,
+        stop: Optional[threading.Event] = None,
+        reconnect_base_delay: Optional[float] = None,
+        reconnect_max_delay: Optional[float] = None,
+        **watch_kwargs,
+    ):
+        self.folder = folder
+        self.classifier = classifier
+        self.model_version = model_version
+        self.session_factory = session_factory
+        self.stop = stop or threading.Event()
+        self.reconnect_base_delay = EMAIL_RECONNECT_BASE_DELAY if reconnect_base_delay is None else reconnect_base_delay
+        self.reconnect_max_delay = EMAIL_RECONNECT_MAX_DELAY if reconnect_max_delay is None else reconnect_max_delay
+        self.watch_kwargs = watch_kwargs
+        self.session: Optional[ImapSession] = None
+        self._failures = 0
+        self._stats = {"connects": 0, "checks": 0, "new_emails": 0, "errors": 0}
+
+    def _model(self):
+        if self.classifier is not None:
+            return self.classifier, self.model_version
+        return get_registry().current()
+
+    def check(self, session: ImapSession, folder: str) -> int:
+        classifier, model_version = self._model()
+        new = check_folder(session, folder, classifier=classifier, model_version=model_version)
+        self._stats["checks"] += 1
+        self._stats["new_emails"] += new
+        self._failures = 0  # the session works end to end
+        return new
+
+    def _connect(self) -> ImapSession:
+        session = self.session_factory()
+        session.connect()
+        self.session = session
+        self._stats["connects"] += 1
+        return session
+
+    def run(self) -> None:
+        """Watch until stop is set, reconnecting after errors."""
+        while not self.stop.is_set():
+            try:
+                session = self.session if self.session is not None and self.session.connected else self._connect()
+                watch_folder(session, self.folder, self.check, self.stop, **self.watch_kwargs)
+            except Exception as e:
+                self._failures += 1
+                self._stats["errors"] += 1
+                delay = min(self.reconnect_max_delay, self.reconnect_base_delay * 2 ** (self._failures - 1))
+                logging.error(f"Error while watching {self.folder} (reconnecting in {delay:.0f}s): {e}")
+                if self.session is not None:
+                    self.session.close()
+                self.stop.wait(delay)
+        if self.session is not None:
+            self.session.close()
+
+    def stats(self) -> dict:
+        return dict(self._stats, folder=self.folder, connected=bool(self.session and self.session.connected))
+
+
+def run_auto_monitor(folders: Optional[List[str]] = None, stop: Optional[threading.Event] = None):
+    logging.info("📡 Automatic email monitoring started...")
 
-                logging.info(f"Phishing detected: {phishing}")
+    if not EMAIL_USER or not EMAIL_PASSWORD:
+        logging.error("EMAIL_USER or EMAIL_PASSWORD not set; cannot monitor mail.")
+        return
 
-        except Exception as e:
-            logging.error(f"Error while checking mail: {e}")
+    try:
+        get_registry().current()  # load the model once, up front
+    except Exception as e:
+        logging.error(f"Cannot load model ({e}). Run: python main.py --train")
+        return
 
-        time.sleep(CHECK_INTERVAL)
\ No newline at end of file
+    stop = stop or threading.Event()
+    workers = [MonitorWorker(folder, stop=stop) for folder in (folders or EMAIL_MONITOR_FOLDERS)]
+    threads = [
+        threading.Thread(target=w.run, name=f"monitor-{w.folder}", daemon=True)
+        for w in workers
+    ]
+    for t in threads:
+        t.start()
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logging.info("Stopping mail monitoring...")
+        stop.set()
+        for t in threads:
+            t.join(timeout=5)
@@ -1,56 +1,99 @@
-"""Check inbox with classifier and send alert when unsafe email detected."""
+"""
+Check inbox with classifier and send alert when unsafe email detected.
+
+A fetched batch is scored with one vectorized classifier call and stored with
+one multi-row insert; alerts go out afterwards, so a slow SMTP server never
+holds up scoring or storage. The returned CheckSummary unpacks like the old
+(total, phishing, results) tuple and also carries per-stage timings. With the
+write-behind writer on, storing only queues the rows, so that stage is reported
+as "enqueue"; the writer's own counters and backlog are under "store" in /metrics.
+"""
 import os
-from typing import List, Tuple
+import time
+from typing import Dict, List, Optional
 
-from config import MODEL_PATH, SPAM_PROBABILITY_THRESHOLD, EMAIL_CHECK_MAX
+from config import MODEL_PATH, SPAM_PROBABILITY_THRESHOLD, EMAIL_CHECK_MAX, STORE_WRITE_BEHIND
 from mail.imap_client import fetch_recent_emails
 from api.alert_engine import should_alert, notify_unsafe_email_detected
-from storage.database import store_result
+from storage.database import store_results
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+class CheckSummary(tuple):
+    """(total, phishing_count, results), plus seconds spent in each stage in .timings."""
+
+    def __new__(cls, total: int, phishing: int, results: List[dict], timings: Optional[Dict[str, float]] = None):
+        summary = super().__new__(cls, (total, phishing, results))
+        summary.timings = dict(timings or {})
+        return summary
+
+    @property
+    def total(self) -> int:
+        return self[0]
+
+    @property
+    def phishing(self) -> int:
+        return self[1]
+
+    @property
+    def results(self) -> List[dict]:
+        return self[2]
+
+
 def check_inbox_and_alert(
     emails: list | None = None,
     max_emails: int | None = None,
     send_alert: bool = True,
     dry_run: bool = False,
-) -> Tuple[int, int, List[dict]]:
+    classifier=None,
+    model_version: str | None = None,
+) -> CheckSummary:
     """
     Fetch recent emails (or use provided emails), run classifier,
     and send alert when unsafe email detected.
+    Long-running callers pass an already loaded classifier (and its version),
+    which skips the model file check and the registry lookup.
+    Timings (seconds): fetch, score, store (enqueue under write-behind), alert and total.
     """
+    started = time.perf_counter()
+    store_stage = "enqueue" if STORE_WRITE_BEHIND else "store"
+    timings = {"fetch": 0.0, "score": 0.0, store_stage: 0.0, "alert": 0.0}
 
     max_emails = max_emails or EMAIL_CHECK_MAX
 
-    if not os.path.isfile(MODEL_PATH):
-        logger.error("Model not found at %s. Run: python main.py --train", MODEL_PATH)
-        return 0, 0, []
+    if classifier is not None:
+        clf = classifier
+    else:
+        if not os.path.isfile(MODEL_PATH):
+            logger.error("Model not found at %s. Run: python main.py --train", MODEL_PATH)
+            return CheckSummary(0, 0, [], timings)
 
-    from ml.classifier import PhishingClassifier
+        from ml.registry import current_model
 
-    clf = PhishingClassifier()
-    clf.load()
+        clf, model_version = current_model()
 
     # 🔥 Use provided emails OR fetch
     if emails is None:
+        t = time.perf_counter()
         emails = fetch_recent_emails(max_emails=max_emails)
+        timings["fetch"] = time.perf_counter() - t
 
     if not emails:
         logger.info("No emails fetched.")
-        return 0, 0, []
+        timings["total"] = time.perf_counter() - started
+        return CheckSummary(0, 0, [], timings)
 
-    results: List[dict] = []
-    phishing_count = 0
+    t = time.perf_counter()
+    labels, probs = clf.score([em.raw_text for em in emails])
+    timings["score"] = time.perf_counter() - t
 
-    for em in emails:
-        label, prob = clf.predict_single(em.raw_text)
+    results: List[dict] = []
+    rows = []
+    for em, label, prob in zip(emails, labels, probs):
         is_phishing = label == 1 or prob >= SPAM_PROBABILITY_THRESHOLD
-
-        preview = (em.raw_text[:500] or "").replace("\n", " ")
-        store_result(preview, label, prob)
-
+        rows.append(((em.raw_text[:500] or "").replace("\n", " "), label, prob))
         results.append({
             "subject": em.subject,
             "from": em.sender,
@@ -58,23 +101,35 @@ def check_inbox_and_alert(
             "probability": prob,
             "is_phishing": is_phishing,
         })
-
         if is_phishing:
-            phishing_count += 1
-            if send_alert and should_alert(prob) and not dry_run:
-                sent = notify_unsafe_email_detected(
-                    em.subject,
-                    em.sender,
-                    em.raw_text[:500],
-                    prob,
-                )
-                results[-1]["alert_sent"] = sent
-            else:
-                results[-1]["alert_sent"] = False
+            results[-1]["alert_sent"] = False
+
+    t = time.perf_counter()
+    store_results(rows, model_version=model_version)
+    timings[store_stage] = time.perf_counter() - t
+
+    # Alerts last: scoring and storage never wait on SMTP
+    t = time.perf_counter()
+    phishing_count = 0
+    for em, result in zip(emails, results):
+        if not result["is_phishing"]:
+            continue
+        phishing_count += 1
+        if send_alert and should_alert(result["probability"]) and not dry_run:
+            result["alert_sent"] = notify_unsafe_email_detected(
+                em.subject,
+                em.sender,
+                em.raw_text[:500],
+                result["probability"],
+            )
+    timings["alert"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - started
 
     logger.info(
-        "Checked %d emails; %d phishing; alerts_enabled=%s dry_run=%s",
-        len(emails), phishing_count, send_alert, dry_run
+        "Checked %d emails; %d phishing; alerts_enabled=%s dry_run=%s; "
+        "fetch %.3fs score %.3fs %s %.3fs alert %.3fs",
+        len(emails), phishing_count, send_alert, dry_run,
+        timings["fetch"], timings["score"], store_stage, timings[store_stage], timings["alert"],
     )
 
-    return len(emails), phishing_count, results
\ No newline at end of file
+    return CheckSummary(len(emails), phishing_count, results, timings)
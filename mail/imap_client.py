@@ -1,8 +1,18 @@
-"""Fetch recent emails from personal mailbox via IMAP."""
+"""
+Fetch recent emails from personal mailbox via IMAP.
+
+Messages are fetched by UID in batches over compact message sets (1:5,8,10:12),
+and only the header plus the first EMAIL_FETCH_BODY_BYTES of the body are
+downloaded (BODY.PEEK, so nothing is marked as read). Checking 20 messages costs
+one SEARCH and one FETCH per folder instead of one FETCH per message, and
+attachments past the byte cap are never transferred.
+"""
 import email
 import imaplib
+import re
 from dataclasses import dataclass
-from typing import List, Optional
+from email.header import decode_header, make_header
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from config import (
     EMAIL_IMAP_HOST,
@@ -10,11 +20,19 @@ from config import (
     EMAIL_USER,
     EMAIL_PASSWORD,
     EMAIL_CHECK_MAX,
+    EMAIL_FETCH_BODY_BYTES,
+    EMAIL_FETCH_BATCH,
 )
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Start of one message's FETCH response: "<seq> ("
+_FETCH_START = re.compile(rb"^\s*\d+\s+\(")
+_UID = re.compile(rb"\bUID\s+(\d+)", re.IGNORECASE)
+# Data item announced right before a literal, e.g. "BODY[HEADER] {342}" or "BODY[TEXT]<0> {16384}"
+_LITERAL_ITEM = re.compile(rb"BODY\[(HEADER|TEXT)\](?:<\d+>)?\s*\{\d+\}\s*$", re.IGNORECASE)
+
 
 @dataclass
 class FetchedEmail:
@@ -23,6 +41,8 @@ class FetchedEmail:
     body: str
     sender: str
     raw_text: str  # subject + body for classification
+    uid: Optional[int] = None
+    folder: str = ""
 
 
 def _decode_payload(part) -> str:
@@ -53,6 +73,127 @@ def _get_text_from_msg(msg) -> str:
     return (body or "").strip()
 
 
+def _decode_header_value(value) -> str:
+    """Decode an RFC 2047 header ("=?utf-8?b?...?=") to text; falls back to the raw value."""
+    if value is None:
+        return ""
+    try:
+        return str(make_header(decode_header(str(value))))
+    except Exception:
+        return str(value)
+
+
+def uid_ranges(uids: Iterable[int]) -> str:
+    """Compact IMAP message set for UIDs: [1, 2, 3, 5, 7, 8] -> "1:3,5,7:8"."""
+    ordered = sorted(set(int(u) for u in uids))
+    parts = []
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1] == ordered[j] + 1:
+            j += 1
+        parts.append(str(ordered[i]) if i == j else f"{ordered[i]}:{ordered[j]}")
+        i = j + 1
+    return ",".join(parts)
+
+
+def parse_fetch_response(data: Sequence) -> Iterator[Tuple[int, bytes, bytes]]:
+    """
+    Walk an imaplib UID FETCH response and yield (uid, header, text prefix) per message.
+
+    imaplib returns a flat list: a (prefix, literal) tuple per literal and bytes for
+    the text between and after literals, e.g.
+    [(b'1 (UID 7 BODY[HEADER] {120}', b'...'), (b' BODY[TEXT]<0> {64}', b'...'), b')'].
+    The UID may come before or after the literals, and servers may interleave
+    unsolicited FETCH responses (flag updates), which have no header and are skipped.
+    """
+    uid: Optional[int] = None
+    parts = {}
+    started = False
+    for item in data or ():
+        if isinstance(item, tuple):
+            meta = item[0] or b""
+            literal = item[1] if len(item) > 1 else b""
+        elif isinstance(item, bytes):
+            meta, literal = item, None
+        else:
+            continue
+        if _FETCH_START.match(meta):
+            if started and uid is not None and "HEADER" in parts:
+                yield uid, parts["HEADER"], parts.get("TEXT", b"")
+            uid, parts, started = None, {}, True
+        m = _UID.search(meta)
+        if m:
+            uid = int(m.group(1))
+        if literal is not None:
+            item_name = _LITERAL_ITEM.search(meta)
+            if item_name:
+                parts[item_name.group(1).upper().decode()] = literal
+    if started and uid is not None and "HEADER" in parts:
+        yield uid, parts["HEADER"], parts.get("TEXT", b"")
+
+
+def build_email(header: bytes, text: bytes, uid: Optional[int] = None, folder: str = "") -> FetchedEmail:
+    """
+    FetchedEmail from a header block and a (possibly truncated) body prefix. Parsing
+    both together keeps multipart boundaries and transfer encodings working; a part
+    cut off at the byte cap decodes as far as it goes.
+    """
+    if not header.endswith(b"\r\n\r\n") and not header.endswith(b"\n\n"):
+        header = header.rstrip(b"\r\n") + b"\r\n\r\n"
+    msg = email.message_from_bytes(header + (text or b""))
+    subject = _decode_header_value(msg.get("Subject", ""))
+    sender = _decode_header_value(msg.get("From", ""))
+    body = _get_text_from_msg(msg)
+    return FetchedEmail(
+        subject=subject,
+        body=body,
+        sender=sender,
+        raw_text=f"{subject}\n\n{body}".strip(),
+        uid=uid,
+        folder=folder,
+    )
+
+
+def fetch_uids(
+    conn,
+    uids: Sequence[int],
+    folder: str = "",
+    body_bytes: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> List[FetchedEmail]:
+    """
+    Fetch headers and body prefixes for UIDs in the selected folder, one UID FETCH
+    per batch_size UIDs. Returned in the order of uids; UIDs the server no longer
+    has are left out.
+    """
+    body_bytes = EMAIL_FETCH_BODY_BYTES if body_bytes is None else body_bytes
+    batch_size = max(1, batch_size or EMAIL_FETCH_BATCH)
+    query = f"(UID BODY.PEEK[HEADER] BODY.PEEK[TEXT]<0.{max(0, int(body_bytes))}>)"
+    wanted = [int(u) for u in uids]
+    fetched = {}
+    for i in range(0, len(wanted), batch_size):
+        chunk = wanted[i:i + batch_size]
+        status, data = conn.uid("FETCH", uid_ranges(chunk), query)
+        if status != "OK":
+            logger.debug("UID FETCH failed in %s: %s", folder, data)
+            continue
+        for uid, header, text in parse_fetch_response(data):
+            try:
+                fetched[uid] = build_email(header, text, uid=uid, folder=folder)
+            except Exception as e:
+                logger.debug("Skip email UID %s in %s: %s", uid, folder, e)
+    return [fetched[u] for u in wanted if u in fetched]
+
+
+def search_uids(conn, criteria: str = "UNSEEN") -> List[int]:
+    """UIDs matching a SEARCH criteria in the selected folder, ascending."""
+    status, data = conn.uid("SEARCH", None, criteria)
+    if status != "OK" or not data or not data[0]:
+        return []
+    return sorted(int(u) for u in data[0].split())
+
+
 def fetch_recent_emails(
     max_emails: Optional[int] = None,
     folder: Optional[str] = None,
@@ -83,46 +224,10 @@ def fetch_recent_emails(
                     logger.debug("Cannot select folder %s", folder_name)
                     continue
 
-                status, ids = conn.search(None, "UNSEEN")
-                if status != "OK":
-                    continue
-
-                id_list = ids[0].split()
-                if not id_list:
-                    continue
-
-                # Most recent first
-                id_list = id_list[-max_emails:][::-1]
-
-                for eid in id_list:
-                    try:
-                        status, data = conn.fetch(eid, "(RFC822)")
-                        if status != "OK" or not data or not data[0]:
-                            continue
-
-                        raw = data[0][1]
-                        msg = email.message_from_bytes(raw)
-
-                        subject = msg.get("Subject", "")
-                        if isinstance(subject, bytes):
-                            subject = subject.decode("utf-8", errors="replace")
-
-                        sender = msg.get("From", "")
-
-                        body = _get_text_from_msg(msg)
-                        raw_text = f"{subject}\n\n{body}".strip()
-
-                        result.append(
-                            FetchedEmail(
-                                subject=subject,
-                                body=body,
-                                sender=sender,
-                                raw_text=raw_text,
-                            )
-                        )
-
-                    except Exception as e:
-                        logger.debug("Skip email %s in %s: %s", eid, folder_name, e)
+                # Most recent first (UIDs grow with arrival order)
+                uids = search_uids(conn, "UNSEEN")[-max_emails:][::-1]
+                if uids:
+                    result.extend(fetch_uids(conn, uids, folder=folder_name))
 
             except Exception as e:
                 logger.debug("Error accessing folder %s: %s", folder_name, e)
@@ -137,4 +242,4 @@ def fetch_recent_emails(
     except Exception as e:
         logger.exception("IMAP fetch failed: %s", e)
 
-    return result
\ No newline at end of file
+    return result
@@ -0,0 +1,248 @@
+"""
+Concurrent monitoring of many mailboxes.
+
+Accounts come from a JSON file (EMAIL_ACCOUNTS_FILE). Every (account, folder)
+pair is an asyncio task with its own check interval. The blocking imaplib
+calls run on a bounded thread pool, and at most EMAIL_MAX_CONCURRENT_SESSIONS
+IMAP operations are in flight at once. Each account keeps one session, shared
+by its folders one operation at a time. New mail from all mailboxes goes
+through one RequestCoalescer, so the classifier scores batches gathered across
+accounts instead of one small batch per folder.
+"""
+import asyncio
+import json
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from api.coalescer import RequestCoalescer
+from config import (
+    EMAIL_IMAP_HOST,
+    EMAIL_IMAP_PORT,
+    EMAIL_ALERTS_ENABLED,
+    EMAIL_MONITOR_FOLDERS,
+    EMAIL_POLL_INTERVAL,
+    EMAIL_RECONNECT_BASE_DELAY,
+    EMAIL_RECONNECT_MAX_DELAY,
+    EMAIL_ACCOUNTS_FILE,
+    EMAIL_MAX_CONCURRENT_SESSIONS,
+    EMAIL_SCORE_BATCH_MAX,
+    EMAIL_SCORE_BATCH_WAIT_MS,
+)
+from mail.auto_monitor import uids_to_check
+from mail.checker import check_inbox_and_alert
+from mail.imap_client import FetchedEmail, fetch_uids
+from mail.session import ImapSession
+from ml.registry import get_registry
+from storage.database import flush_results, get_watermark, set_watermark
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class MailAccount:
+    """One monitored mailbox and the check interval (seconds) of each of its folders."""
+    name: str
+    user: str
+    password: str
+    host: str = EMAIL_IMAP_HOST
+    port: int = EMAIL_IMAP_PORT
+    use_ssl: bool = True
+    folders: Dict[str, float] = field(default_factory=dict)
+
+
+def load_accounts(path: Optional[str] = None) -> List[MailAccount]:
+    """
+    Read accounts from JSON: {"defaults": {...}, "accounts": [{...}, ...]}. Each
+    account has "user" and "password" (or "password_env", the name of an
+    environment variable holding it), and optionally "name", "host", "port",
+    "ssl", "interval" and "folders" (a list of names, or {name: interval}).
+    Keys missing from an account are taken from "defaults".
+    """
+    path = path or EMAIL_ACCOUNTS_FILE
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    defaults = data.get("defaults", {})
+    accounts = []
+    for i, entry in enumerate(data.get("accounts", [])):
+        merged = dict(defaults, **entry)
+        if not merged.get("user"):
+            raise ValueError(f"Account {i} in {path}: 'user' is required")
+        password = merged.get("password") or os.getenv(merged.get("password_env", ""), "")
+        interval = float(merged.get("interval", EMAIL_POLL_INTERVAL))
+        folders = merged.get("folders") or EMAIL_MONITOR_FOLDERS
+        if isinstance(folders, dict):
+            folders = {name: float(v or interval) for name, v in folders.items()}
+        else:
+            folders = {name: interval for name in folders}
+        accounts.append(MailAccount(
+            name=merged.get("name") or merged["user"],
+            user=merged["user"],
+            password=password,
+            host=merged.get("host", EMAIL_IMAP_HOST),
+            port=int(merged.get("port", EMAIL_IMAP_PORT)),
+            use_ssl=bool(merged.get("ssl", True)),
+            folders=folders,
+        ))
+    return accounts
+
+
+class MultiAccountMonitor:
+    """Schedules folder checks for many accounts on one event loop."""
+
+    def __init__(
+        self,
+        accounts: List[MailAccount],
+        max_concurrency: Optional[int] = None,
+        classifier=None,
+        model_version: Optional[str] = None,
+        send_alert: Optional[bool] = None,
+        batch_max: Optional[int] = None,
+        batch_wait_ms: Optional[float] = None,
+        jitter: bool = True,
+    ):
+        self.accounts = accounts
+        self.max_concurrency = max(1, max_concurrency or EMAIL_MAX_CONCURRENT_SESSIONS)
+        self.classifier = classifier
+        self.model_version = model_version
+        self.send_alert = EMAIL_ALERTS_ENABLED if send_alert is None else send_alert
+        self.jitter = jitter
+        self.scorer = RequestCoalescer(
+            self._score_batch,
+            max_batch_size=batch_max or EMAIL_SCORE_BATCH_MAX,
+            max_wait_ms=EMAIL_SCORE_BATCH_WAIT_MS if batch_wait_ms is None else batch_wait_ms,
+            name="mail-scorer",
+        )
+        self._sessions: Dict[str, ImapSession] = {}
+        self._stats: Dict[str, int] = defaultdict(int)
+        self._active = 0
+
+    def _score_batch(self, emails: List[FetchedEmail]) -> List[dict]:
+        """One classifier call (and one bulk store) for emails from any number of mailboxes."""
+        if self.classifier is not None:
+            clf, version = self.classifier, self.model_version
+        else:
+            clf, version = get_registry().current()
+        _, _, results = check_inbox_and_alert(
+            emails=emails, send_alert=self.send_alert, dry_run=False, classifier=clf, model_version=version
+        )
+        return results
+
+    def _session(self, account: MailAccount) -> ImapSession:
+        session = self._sessions.get(account.name)
+        if session is None or not session.connected:
+            session = ImapSession(account.host, account.port, account.user, account.password, use_ssl=account.use_ssl)
+            session.connect()
+            self._sessions[account.name] = session
+            self._stats["connects"] += 1
+        return session
+
+    def _fetch(self, account: MailAccount, folder: str) -> Tuple[List[FetchedEmail], Optional[Tuple[int, int]]]:
+        """New mail past the folder's watermark, and the watermark to record once it is classified."""
+        session = self._session(account)
+        session.select(folder)
+        mark = get_watermark(account.user, folder)
+        uids, last_uid = uids_to_check(session, folder, mark)
+        emails = fetch_uids(session.conn, uids, folder=folder) if uids else []
+        new_mark = (session.uidvalidity or 0, last_uid)
+        return emails, (new_mark if new_mark != mark else None)
+
+    def _commit(self, account: MailAccount, folder: str, mark: Tuple[int, int]) -> bool:
+        """Move the folder's watermark once its results are on disk; False (watermark kept) if the flush timed out."""
+        if not flush_results():
+            logger.warning("Results for %s/%s not flushed; watermark kept, mail will be checked again",
+                           account.name, folder)
+            return False
+        set_watermark(account.user, folder, *mark)
+        return True
+
+    def _close(self, account: MailAccount) -> None:
+        session = self._sessions.pop(account.name, None)
+        if session is not None:
+            session.close()
+
+    async def _imap(self, account: MailAccount, fn, *args):
+        """Run a blocking call on the account's session: one at a time per account, max_concurrency overall."""
+        async with self._account_locks[account.name]:
+            async with self._limit:
+                self._active += 1
+                self._stats["max_active"] = max(self._stats["max_active"], self._active)
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+                finally:
+                    self._active -= 1
+
+    async def check(self, account: MailAccount, folder: str) -> int:
+        """Fetch, score and record one folder's new mail; returns how many emails were new."""
+        emails, mark = await self._imap(account, self._fetch, account, folder)
+        if emails:
+            await asyncio.gather(*(asyncio.wrap_future(self.scorer.submit(em)) for em in emails))
+        if mark is not None:
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(self._executor, self._commit, account, folder, mark):
+                self._stats["watermarks_kept"] += 1
+        self._stats["checks"] += 1
+        self._stats["new_emails"] += len(emails)
+        return len(emails)
+
+    async def _watch(self, account: MailAccount, folder: str, interval: float, stop: asyncio.Event) -> None:
+        # Spread the first checks so hundreds of mailboxes do not connect at once
+        delay = random.uniform(0, interval) if self.jitter else 0.0
+        failures = 0
+        while not await _wait(stop, delay):
+            try:
+                await self.check(account, folder)
+                failures, delay = 0, interval
+            except Exception as e:
+                failures += 1
+                self._stats["errors"] += 1
+                delay = min(EMAIL_RECONNECT_MAX_DELAY, EMAIL_RECONNECT_BASE_DELAY * 2 ** (failures - 1))
+                logger.error("Check of %s/%s failed (retry in %.0fs): %s", account.name, folder, delay, e)
+                await self._imap(account, self._close, account)
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Watch every account's folders until stop is set."""
+        stop = stop or asyncio.Event()
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        self._account_locks = {a.name: asyncio.Lock() for a in self.accounts}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="imap")
+        tasks = [
+            asyncio.create_task(self._watch(account, folder, interval, stop))
+            for account in self.accounts
+            for folder, interval in account.folders.items()
+        ]
+        logger.info("Monitoring %d folders in %d accounts", len(tasks), len(self.accounts))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            for account in self.accounts:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._close, account)
+            self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, object]:
+        return dict(self._stats, scorer=self.scorer.stats())
+
+
+async def _wait(stop: asyncio.Event, seconds: float) -> bool:
+    """Sleep up to seconds; True if stop was set meanwhile."""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=max(0.0, seconds))
+    except asyncio.TimeoutError:
+        pass
+    return stop.is_set()
+
+
+def run_multi_monitor(path: Optional[str] = None) -> None:
+    """Monitor every account in the accounts file until interrupted."""
+    accounts = load_accounts(path)
+    get_registry().current()  # load the model once, up front
+    try:
+        asyncio.run(MultiAccountMonitor(accounts).run())
+    except KeyboardInterrupt:
+        logger.info("Stopping mail monitoring...")
@@ -0,0 +1,203 @@
+"""
+Long-lived IMAP session with IDLE (RFC 2177) support.
+
+imaplib (before Python 3.14) has no IDLE command, so ImapSession sends it as a
+raw tagged command and reads the untagged responses the server pushes until new
+mail arrives (EXISTS/RECENT), the timeout passes or the caller asks to stop, then
+ends it with DONE. Servers drop connections that idle too long, so callers should
+re-issue IDLE every EMAIL_IDLE_RENEW_SECONDS.
+"""
+import imaplib
+import re
+import select
+import ssl
+import threading
+import time
+from typing import List, Optional
+
+from config import (
+    EMAIL_IMAP_HOST,
+    EMAIL_IMAP_PORT,
+    EMAIL_USER,
+    EMAIL_PASSWORD,
+    EMAIL_IMAP_TIMEOUT,
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Untagged responses that mean the selected folder has new messages
+_NEW_MAIL = re.compile(rb"^\d+\s+(EXISTS|RECENT)\b", re.IGNORECASE)
+# How often a waiting IDLE checks the stop event
+_IDLE_SLICE_SECONDS = 0.5
+
+
+def has_new_mail(events: List[bytes]) -> bool:
+    """True if untagged responses from idle() include an EXISTS or RECENT."""
+    return any(_NEW_MAIL.match(e) for e in events)
+
+
+class ImapSession:
+    """One authenticated IMAP connection, kept open across checks."""
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        use_ssl: bool = True,
+        timeout: Optional[float] = None,
+    ):
+        self.host = host or EMAIL_IMAP_HOST
+        self.port = port or EMAIL_IMAP_PORT
+        self.user = user if user is not None else EMAIL_USER
+        self.password = password if password is not None else EMAIL_PASSWORD
+        self.use_ssl = use_ssl
+        self.timeout = timeout or EMAIL_IMAP_TIMEOUT
+        self.conn: Optional[imaplib.IMAP4] = None
+        self.capabilities: frozenset = frozenset()
+        self.folder: Optional[str] = None
+        self.uidvalidity: Optional[int] = None
+        self.uidnext: Optional[int] = None
+        self._idle_seq = 0
+
+    def connect(self) -> "ImapSession":
+        """Open the connection, log in and read the capabilities."""
+        self.close()
+        cls = imaplib.IMAP4_SSL if self.use_ssl else imaplib.IMAP4
+        conn = cls(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.login(self.user, self.password)
+            # Servers often advertise more capabilities (IDLE among them) after login
+            status, data = conn.capability()
+            words = data[0].split() if status == "OK" and data and data[0] else []
+            self.capabilities = frozenset(w.decode("ascii", "replace").upper() for w in words)
+        except Exception:
+            try:
+                conn.shutdown()
+            except Exception:
+                pass
+            raise
+        self.conn = conn
+        self.folder = None
+        logger.info("IMAP session opened to %s as %s", self.host, self.user)
+        return self
+
+    @property
+    def connected(self) -> bool:
+        return self.conn is not None
+
+    @property
+    def supports_idle(self) -> bool:
+        return "IDLE" in self.capabilities
+
+    def select(self, folder: str, readonly: bool = True) -> int:
+        """Select a folder (read-only by default); returns its message count and records its UIDVALIDITY/UIDNEXT."""
+        status, data = self.conn.select(folder, readonly=readonly)
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"Cannot select {folder}: {data}")
+        self.folder = folder
+        self.uidvalidity = self._response_int("UIDVALIDITY")
+        self.uidnext = self._response_int("UIDNEXT")
+        return int(data[0] or 0) if data and data[0] else 0
+
+    def noop(self) -> None:
+        """Keepalive round trip; also lets the server report changes to the selected folder."""
+        status, data = self.conn.noop()
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"NOOP failed: {data}")
+
+    def idle(self, timeout: float, stop: Optional[threading.Event] = None) -> List[bytes]:
+        """
+        IDLE on the selected folder for up to timeout seconds. Returns the untagged
+        responses received (e.g. b"12 EXISTS") as soon as one reports new mail,
+        or whatever arrived when the timeout passed or stop was set.
+        """
+        self._idle_seq += 1
+        tag = f"IDLE{self._idle_seq}".encode("ascii")
+        self.conn.send(tag + b" IDLE\r\n")
+        line = self._read_line()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+
+        events: List[bytes] = []
+        deadline = time.monotonic() + timeout
+        while not has_new_mail(events):
+            if stop is not None and stop.is_set():
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if self._readable(min(remaining, _IDLE_SLICE_SECONDS)):
+                events.extend(self._untagged(self._read_line()))
+
+        self.conn.send(b"DONE\r\n")
+        while True:
+            line = self._read_line()
+            if line.startswith(tag + b" "):
+                if not line[len(tag) + 1:].upper().startswith(b"OK"):
+                    raise imaplib.IMAP4.error(f"IDLE failed: {line!r}")
+                return events
+            events.extend(self._untagged(line))
+
+    def close(self) -> None:
+        """Log out (best effort) and drop the connection."""
+        conn, self.conn = self.conn, None
+        self.folder = None
+        if conn is None:
+            return
+        try:
+            conn.logout()
+        except Exception:
+            try:
+                conn.shutdown()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "ImapSession":
+        if self.conn is None:
+            self.connect()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _response_int(self, code: str) -> Optional[int]:
+        _, data = self.conn.response(code)
+        try:
+            return int(data[-1]) if data and data[-1] is not None else None
+        except ValueError:
+            return None
+
+    def _read_line(self) -> bytes:
+        line = self.conn.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("socket error: EOF")
+        return line.rstrip(b"\r\n")
+
+    @staticmethod
+    def _untagged(line: bytes) -> List[bytes]:
+        if not line.startswith(b"* "):
+            return []
+        response = line[2:].strip()
+        if response.upper().startswith(b"BYE"):
+            raise imaplib.IMAP4.abort(f"Server closed the session: {response!r}")
+        return [response]
+
+    def _readable(self, timeout: float) -> bool:
+        """Wait up to timeout for server data, counting bytes already buffered by imaplib or TLS."""
+        sock = self.conn.sock
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            return True
+        # Peek at imaplib's read buffer without blocking: data may have arrived with the last line
+        sock.setblocking(False)
+        try:
+            if self.conn.file.peek(1):
+                return True
+        except (BlockingIOError, ssl.SSLWantReadError):
+            pass
+        finally:
+            sock.settimeout(self.timeout)
+        readable, _, _ = select.select([sock], [], [], timeout)
+        return bool(readable)
@@ -2,25 +2,50 @@
 Main entrypoint: train, predict, run API, check personal mail, or auto-monitor.
 Usage:
   python main.py --train
+  python main.py --train --streaming --chunk-size 10000
+  python main.py --export-compiled
   python main.py --predict "text"
   python main.py --check-mail
   python main.py --check-mail-dry-run
   python main.py --api
   python main.py --dashboard
-  python main.py --auto-monitor
+  python main.py --auto-monitor [--accounts accounts.json]
+  python main.py --retention [--dry-run] [--compact]
 """
 
 import argparse
 import sys
 
-from config import TRAINING_DATA_PATH, MODEL_PATH, DATA_DIR, API_HOST, API_PORT
+from config import (
+    TRAINING_DATA_PATH,
+    MODEL_PATH,
+    COMPILED_MODEL_PATH,
+    DATA_DIR,
+    API_HOST,
+    API_PORT,
+    TRAIN_CHUNK_SIZE,
+)
 from utils.logger import get_logger
 from mail.auto_monitor import run_auto_monitor  # ✅ NEW IMPORT
 
 logger = get_logger(__name__)
 
 
-def cmd_train() -> int:
+def _iter_training_chunks(path: str, chunk_size: int):
+    """Yield (texts, labels) chunks from the training CSV without loading it whole."""
+    import pandas as pd
+
+    try:
+        reader = pd.read_csv(path, usecols=["text", "label"], chunksize=chunk_size)
+    except ValueError as e:
+        raise ValueError("Training CSV must have 'text' and 'label' columns") from e
+    with reader:
+        for chunk in reader:
+            chunk = chunk.dropna(subset=["label"])
+            yield chunk["text"].astype(str).tolist(), chunk["label"].astype(int).tolist()
+
+
+def cmd_train(streaming: bool = False, chunk_size: int = TRAIN_CHUNK_SIZE) -> int:
     """Generate data if needed, train classifier, save model."""
     import os
     import pandas as pd
@@ -35,6 +60,14 @@ def cmd_train() -> int:
     else:
         logger.info("Using existing training data at %s", TRAINING_DATA_PATH)
 
+    if streaming:
+        logger.info("Streaming training in chunks of %d rows", chunk_size)
+        clf = PhishingClassifier(model_path=MODEL_PATH, streaming=True)
+        clf.fit_streaming(_iter_training_chunks(TRAINING_DATA_PATH, chunk_size))
+        clf.save()
+        logger.info("Training complete. Model saved to %s", MODEL_PATH)
+        return 0
+
     df = pd.read_csv(TRAINING_DATA_PATH)
 
     if "text" not in df or "label" not in df:
@@ -48,21 +81,40 @@ def cmd_train() -> int:
     clf.save()
 
     logger.info("Training complete. Model saved to %s", MODEL_PATH)
+    cmd_export_compiled(clf)
+    return 0
+
+
+def cmd_export_compiled(clf=None) -> int:
+    """Export the trained model to the sklearn-free compiled artifact used for serving."""
+    from ml.compiled import export_compiled
+
+    if clf is None:
+        from ml.classifier import PhishingClassifier
+
+        clf = PhishingClassifier(model_path=MODEL_PATH)
+        clf.load()
+
+    try:
+        export_compiled(clf, COMPILED_MODEL_PATH)
+    except ValueError as e:
+        logger.warning("Compiled export skipped: %s", e)
+        return 1
     return 0
 
 
 def cmd_predict(text: str) -> int:
     """Load model and print classification for given text."""
-    from ml.classifier import PhishingClassifier
+    from ml.compiled import load_scorer
 
     if not text.strip():
         logger.error("No text provided for prediction.")
         return 1
 
-    clf = PhishingClassifier(model_path=MODEL_PATH)
-    clf.load()
+    clf = load_scorer(model_path=MODEL_PATH)
 
-    label, prob = clf.predict_single(text)
+    labels, probs = clf.score([text])
+    label, prob = labels[0], probs[0]
     label_name = "phishing" if label == 1 else "legitimate"
 
     print(f"Label: {label_name}")
@@ -93,6 +145,25 @@ def cmd_dashboard() -> int:
     return result
 
 
+def cmd_retention(dry_run: bool = False, compact: bool = False) -> int:
+    """Archive and delete predictions past the retention limits."""
+    from storage.retention import enable_incremental_vacuum, run_retention
+
+    if compact and not dry_run:
+        enable_incremental_vacuum()
+    summary = run_retention(dry_run=dry_run)
+
+    print("--- Retention ---")
+    print(f"Expired rows: {summary['expired']}")
+    if dry_run:
+        print("Dry run: nothing archived or deleted.")
+        return 0
+    print(f"Archived: {summary['archived']} rows to {len(summary['files'])} files")
+    print(f"Deleted: {summary['deleted']} rows in {summary['chunks']} chunks")
+    print(f"Pages released: {summary['vacuumed_pages']}")
+    return 0
+
+
 def cmd_check_mail(dry_run: bool = False) -> int:
     """Connect to personal mail, scan recent emails, send alert when unsafe email detected."""
     from config import EMAIL_USER, EMAIL_PASSWORD, EMAIL_ALERTS_ENABLED
@@ -102,10 +173,11 @@ def cmd_check_mail(dry_run: bool = False) -> int:
         print("Personal mail not configured. Set EMAIL_USER and EMAIL_PASSWORD in .env.")
         return 1
 
-    total, phishing, results = check_inbox_and_alert(
+    summary = check_inbox_and_alert(
         send_alert=EMAIL_ALERTS_ENABLED and not dry_run,
         dry_run=dry_run
     )
+    total, phishing, results = summary
 
     print("--- Check mail result ---")
     print(f"Emails checked: {total}")
@@ -123,6 +195,9 @@ def cmd_check_mail(dry_run: bool = False) -> int:
             status = "UNSAFE" if r["is_phishing"] else "OK"
             print(f"  [{status}] {r['subject'][:50]}... (prob: {r['probability']:.2f})")
 
+    if summary.timings:
+        print("Timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in summary.timings.items()))
+
     print("--- End ---")
     return 0
 
@@ -131,17 +206,28 @@ def main() -> int:
     parser = argparse.ArgumentParser(description="Email Phishing Classifier")
 
     parser.add_argument("--train", action="store_true", help="Train the model")
+    parser.add_argument("--streaming", action="store_true", help="With --train: out-of-core training over CSV chunks")
+    parser.add_argument("--chunk-size", type=int, default=TRAIN_CHUNK_SIZE, metavar="N", help="Rows per chunk for --streaming")
+    parser.add_argument("--export-compiled", action="store_true", help="Export the trained model for sklearn-free serving")
     parser.add_argument("--predict", type=str, metavar="TEXT", help="Classify email text")
     parser.add_argument("--check-mail", action="store_true", help="Check personal inbox and send alert if unsafe email")
     parser.add_argument("--check-mail-dry-run", action="store_true", help="Check inbox only; do not send alert emails")
     parser.add_argument("--api", action="store_true", help="Run Flask API")
     parser.add_argument("--dashboard", action="store_true", help="Run Streamlit dashboard")
     parser.add_argument("--auto-monitor", action="store_true", help="Run automatic mail monitoring")  # ✅ NEW
+    parser.add_argument("--accounts", type=str, metavar="FILE",
+                        help="With --auto-monitor: monitor every mailbox in this JSON file (default EMAIL_ACCOUNTS_FILE)")
+    parser.add_argument("--retention", action="store_true", help="Archive and delete predictions past retention limits")
+    parser.add_argument("--dry-run", action="store_true", help="With --retention: only report expired rows")
+    parser.add_argument("--compact", action="store_true", help="With --retention: enable incremental vacuum (one full VACUUM)")
 
     args = parser.parse_args()
 
     if args.train:
-        return cmd_train()
+        return cmd_train(streaming=args.streaming, chunk_size=args.chunk_size)
+
+    if args.export_compiled:
+        return cmd_export_compiled()
 
     if args.predict is not None:
         return cmd_predict(args.predict)
@@ -158,8 +244,18 @@ def main() -> int:
     if args.dashboard:
         return cmd_dashboard()
 
+    if args.retention:
+        return cmd_retention(dry_run=args.dry_run, compact=args.compact)
+
     if args.auto_monitor:
-        run_auto_monitor()   # ✅ AUTOMATIC MODE
+        from config import EMAIL_ACCOUNTS_FILE
+
+        if args.accounts or EMAIL_ACCOUNTS_FILE:
+            from mail.multi_monitor import run_multi_monitor
+
+            run_multi_monitor(args.accounts)
+        else:
+            run_auto_monitor()   # ✅ AUTOMATIC MODE
         return 0
 
     parser.print_help()
@@ -1,4 +1,17 @@
 """Machine learning model for phishing classification."""
-from ml.classifier import PhishingClassifier
 
-__all__ = ["PhishingClassifier"]
+__all__ = ["PhishingClassifier", "CompiledScorer", "load_scorer", "get_registry", "get_model"]
+
+
+def __getattr__(name):
+    # Imported lazily so that ml.compiled can be used without importing scikit-learn
+    if name == "PhishingClassifier":
+        from ml.classifier import PhishingClassifier
+        return PhishingClassifier
+    if name in ("CompiledScorer", "load_scorer"):
+        from ml import compiled
+        return getattr(compiled, name)
+    if name in ("get_registry", "get_model"):
+        from ml import registry
+        return getattr(registry, name)
+    raise AttributeError(f"module 'ml' has no attribute {name!r}")
@@ -1,37 +1,55 @@
-"""Handles training and inference using scikit-learn (TF-IDF + Logistic Regression)."""
+"""Handles training and inference using scikit-learn (TF-IDF + Logistic Regression).
+
+A streaming variant (hashing features + SGD logistic regression, trained with
+partial_fit) is available for corpora that do not fit in memory.
+"""
 import os
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
 
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from scipy.special import expit
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.pipeline import Pipeline
 
-from config import MODEL_PATH, SPAM_PROBABILITY_THRESHOLD, MAX_EMAIL_LENGTH
-from detection.text_analysis import clean_text
+from config import MODEL_PATH, SPAM_PROBABILITY_THRESHOLD, HASHING_N_FEATURES
+from ml.preprocessing import prepare_input
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-def _truncate_input(text: str) -> str:
-    """Truncate to max length for model input."""
-    if not text or len(text) <= MAX_EMAIL_LENGTH:
-        return text or ""
-    return text[:MAX_EMAIL_LENGTH]
-
-
 class PhishingClassifier:
-    """Train and predict phishing vs legitimate using TF-IDF + Logistic Regression."""
+    """
+    Train and predict phishing vs legitimate using TF-IDF + Logistic Regression.
+    With streaming=True, uses a stateless hashing vectorizer and an incrementally
+    trained logistic-loss SGD model instead (see partial_fit / fit_streaming).
+    """
 
-    def __init__(self, model_path: Optional[str] = None):
+    CLASSES = (0, 1)
+
+    def __init__(self, model_path: Optional[str] = None, streaming: bool = False):
         self.model_path = model_path or MODEL_PATH
+        self.streaming = streaming
         self.pipeline: Optional[Pipeline] = None
         self._build_pipeline()
 
     def _build_pipeline(self) -> None:
-        """Build TF-IDF + Logistic Regression pipeline."""
+        """Build TF-IDF + Logistic Regression pipeline (or hashing + SGD when streaming)."""
+        if self.streaming:
+            self.pipeline = Pipeline([
+                ("hashing", HashingVectorizer(
+                    n_features=HASHING_N_FEATURES,
+                    ngram_range=(1, 2),
+                    strip_accents="unicode",
+                    lowercase=True,
+                    alternate_sign=False,
+                    norm="l2",
+                )),
+                ("clf", SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)),
+            ])
+            return
         self.pipeline = Pipeline([
             ("tfidf", TfidfVectorizer(
                 max_features=10000,
@@ -46,35 +64,76 @@ class PhishingClassifier:
 
     def fit(self, X: List[str], y: List[int]) -> "PhishingClassifier":
         """Train on list of email texts and binary labels (0=legit, 1=phishing)."""
-        X_clean = [_truncate_input(clean_text(t)) for t in X]
-        self.pipeline.fit(X_clean, y)
+        self.pipeline.fit(self._prepare(X), y)
         logger.info("Model fitted on %d samples", len(X))
         return self
 
-    def predict(self, X: List[str]) -> List[int]:
-        """Predict class (0 or 1) for each input text."""
+    def partial_fit(self, X: List[str], y: List[int]) -> "PhishingClassifier":
+        """Update a streaming model with one chunk of texts and labels."""
+        if not self.streaming:
+            raise RuntimeError("partial_fit requires a streaming classifier (streaming=True).")
+        features = self.pipeline[:-1].transform(self._prepare(X))
+        self.pipeline[-1].partial_fit(features, y, classes=list(self.CLASSES))
+        return self
+
+    def fit_streaming(self, chunks: Iterable[Tuple[List[str], List[int]]]) -> "PhishingClassifier":
+        """Train a streaming model chunk by chunk; memory is bounded by the chunk size."""
+        n_samples = 0
+        n_chunks = 0
+        for X, y in chunks:
+            if not X:
+                continue
+            self.partial_fit(X, y)
+            n_samples += len(X)
+            n_chunks += 1
+            logger.info("Streaming fit: chunk %d (%d samples so far)", n_chunks, n_samples)
+        if n_samples == 0:
+            raise ValueError("No training samples in stream")
+        logger.info("Model fitted on %d samples in %d chunks", n_samples, n_chunks)
+        return self
+
+    def _prepare(self, X: List[str]) -> List[str]:
+        """Clean and truncate raw texts into model input."""
+        return [prepare_input(t) for t in X]
+
+    def score(self, X: List[str]) -> Tuple[List[int], List[float]]:
+        """
+        Predict labels and phishing probabilities in one pass.
+        Texts are cleaned and vectorized once; both outputs come from a single
+        decision_function call (probability = sigmoid of the decision value).
+        """
+        return self.score_prepared(self._prepare(X))
+
+    def score_prepared(self, prepared: List[str]) -> Tuple[List[int], List[float]]:
+        """score() for texts already passed through prepare_input."""
         if self.pipeline is None:
             raise RuntimeError("Model not fitted or loaded. Train or load a model first.")
-        X_clean = [_truncate_input(clean_text(t)) for t in X]
-        return self.pipeline.predict(X_clean).tolist()
+        if not prepared:
+            return [], []
+        features = self.pipeline[:-1].transform(prepared)
+        model = self.pipeline[-1]
+        decision = model.decision_function(features)
+        labels = model.classes_[(decision > 0).astype(int)]
+        probs = expit(decision)
+        return [int(label) for label in labels], probs.tolist()
+
+    def predict(self, X: List[str]) -> List[int]:
+        """Predict class (0 or 1) for each input text."""
+        labels, _ = self.score(X)
+        return labels
 
     def predict_proba(self, X: List[str]) -> List[Tuple[float, float]]:
         """Predict probability [P(legit), P(phishing)] for each input."""
-        if self.pipeline is None:
-            raise RuntimeError("Model not fitted or loaded. Train or load a model first.")
-        X_clean = [_truncate_input(clean_text(t)) for t in X]
-        proba = self.pipeline.predict_proba(X_clean)
-        return [tuple(p) for p in proba]
+        _, probs = self.score(X)
+        return [(1.0 - p, p) for p in probs]
 
     def predict_single(self, text: str) -> Tuple[int, float]:
         """
         Predict single email. Returns (label, phishing_probability).
         label: 0 = legitimate, 1 = phishing.
         """
-        labels = self.predict([text])
-        probas = self.predict_proba([text])
-        phishing_prob = float(probas[0][1])
-        return labels[0], phishing_prob
+        labels, probs = self.score([text])
+        return labels[0], probs[0]
 
     def is_phishing(self, text: str, threshold: Optional[float] = None) -> bool:
         """Return True if classified as phishing above threshold."""
@@ -85,8 +144,11 @@ class PhishingClassifier:
     def save(self, path: Optional[str] = None) -> str:
         """Persist pipeline to disk."""
         path = path or self.model_path
-        Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
-        joblib.dump(self.pipeline, path)
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        # Write then rename so processes hot-reloading MODEL_PATH never see a partial file
+        tmp_path = f"{path}.tmp"
+        joblib.dump(self.pipeline, tmp_path)
+        os.replace(tmp_path, path)
         logger.info("Model saved to %s", path)
         return path
 
@@ -96,6 +158,7 @@ class PhishingClassifier:
         if not os.path.isfile(path):
             raise FileNotFoundError(f"Model file not found: {path}")
         self.pipeline = joblib.load(path)
+        self.streaming = isinstance(self.pipeline[0], HashingVectorizer)
         self.model_path = path
         logger.info("Model loaded from %s", path)
         return self
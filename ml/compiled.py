@@ -0,0 +1,297 @@
+"""
+Compiled (scikit-learn free) inference for TF-IDF + linear models.
+
+export_compiled() writes the fitted vocabulary, IDF vector and model coefficients
+into one uncompressed .npz file. CompiledScorer loads it with numpy only and
+reproduces PhishingClassifier.score, so serving processes start without importing
+scikit-learn or unpickling the joblib pipeline.
+
+The arrays, including the vocabulary (a sorted fixed-width term array searched with
+np.searchsorted instead of a dict), are memory-mapped read-only straight from the
+.npz. Worker processes therefore share one copy of the model in the page cache.
+"""
+import os
+import re
+import struct
+import unicodedata
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import MODEL_PATH, COMPILED_MODEL_PATH, SPAM_PROBABILITY_THRESHOLD
+from ml.preprocessing import prepare_input
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 2
+
+# TfidfVectorizer's default token_pattern
+_TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def _strip_accents_unicode(s: str) -> str:
+    """Same as sklearn.feature_extraction.text.strip_accents_unicode."""
+    try:
+        s.encode("ASCII", errors="strict")
+        return s
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize("NFKD", s)
+        return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+def _strip_accents_ascii(s: str) -> str:
+    """Same as sklearn.feature_extraction.text.strip_accents_ascii."""
+    nkfd_form = unicodedata.normalize("NFKD", s)
+    return nkfd_form.encode("ASCII", "ignore").decode("ASCII")
+
+
+_ACCENT_FUNCTIONS = {"unicode": _strip_accents_unicode, "ascii": _strip_accents_ascii}
+
+
+def export_compiled(pipeline, path: Optional[str] = None) -> str:
+    """
+    Export a fitted TF-IDF + linear model pipeline (or a PhishingClassifier) to a
+    compact .npz artifact. Raises ValueError for unsupported pipelines (e.g. the
+    hashing-based streaming model).
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    pipeline = getattr(pipeline, "pipeline", pipeline)
+    path = path or COMPILED_MODEL_PATH
+    vectorizer, model = pipeline[0], pipeline[-1]
+    if len(pipeline) != 2 or not isinstance(vectorizer, TfidfVectorizer):
+        raise ValueError("Compiled export supports TF-IDF + linear model pipelines only")
+    if (
+        vectorizer.analyzer != "word"
+        or vectorizer.token_pattern != _TOKEN_PATTERN.pattern
+        or vectorizer.tokenizer is not None
+        or vectorizer.preprocessor is not None
+        or vectorizer.stop_words is not None
+        or vectorizer.binary
+        or vectorizer.strip_accents not in (None, "unicode", "ascii")
+    ):
+        raise ValueError("Compiled export does not support this TfidfVectorizer configuration")
+    if model.coef_.shape[0] != 1:
+        raise ValueError("Compiled export supports binary classifiers only")
+
+    encoded = sorted((term.encode("utf-8"), idx) for term, idx in vectorizer.vocabulary_.items())
+    width = max((len(term) for term, _ in encoded), default=1)
+    idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(encoded))
+
+    Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        format_version=np.array(FORMAT_VERSION),
+        terms=np.array([term for term, _ in encoded], dtype=f"S{width}"),
+        term_index=np.array([idx for _, idx in encoded], dtype=np.int64),
+        idf=np.asarray(idf, dtype=np.float64),
+        coef=np.asarray(model.coef_[0], dtype=np.float64),
+        intercept=np.array(float(model.intercept_[0])),
+        classes=np.asarray(model.classes_, dtype=np.int64),
+        ngram_range=np.array(vectorizer.ngram_range, dtype=np.int64),
+        lowercase=np.array(bool(vectorizer.lowercase)),
+        strip_accents=np.array(vectorizer.strip_accents or ""),
+        sublinear_tf=np.array(bool(vectorizer.sublinear_tf)),
+        norm=np.array(vectorizer.norm or ""),
+    )
+    os.replace(tmp_path, path)
+    logger.info("Compiled model exported to %s (%d terms)", path, len(encoded))
+    return path
+
+
+def _read_npz_mapped(path: str) -> Dict[str, np.ndarray]:
+    """Arrays of an uncompressed .npz, memory-mapped read-only in place (scalars are read)."""
+    arrays: Dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Compiled model {path} is compressed and cannot be memory-mapped")
+            # The member data follows its local file header (30 bytes + name + extra field)
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if dtype.hasobject:
+                raise ValueError(f"Compiled model {path} holds object arrays")
+            if not shape or 0 in shape:
+                f.seek(info.header_offset + 30 + name_len + extra_len)
+                arrays[name] = np.lib.format.read_array(f)
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                     order="F" if fortran_order else "C")
+    return arrays
+
+
+class CompiledScorer:
+    """Numpy-only scorer with the same prediction API as PhishingClassifier."""
+
+    def __init__(self, model_path: Optional[str] = None):
+        self.model_path = model_path or COMPILED_MODEL_PATH
+        self.terms: Optional[np.ndarray] = None  # sorted UTF-8 terms (fixed width)
+        self.term_index: Optional[np.ndarray] = None  # column of each sorted term
+        self.idf: Optional[np.ndarray] = None
+        self.coef: Optional[np.ndarray] = None
+        self.intercept = 0.0
+        self.classes = np.array([0, 1])
+        self.ngram_range = (1, 1)
+        self.lowercase = True
+        self.strip_accents = None
+        self.sublinear_tf = False
+        self.norm = "l2"
+
+    def load(self, path: Optional[str] = None) -> "CompiledScorer":
+        """Load a compiled artifact written by export_compiled (arrays stay memory-mapped)."""
+        path = path or self.model_path
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Compiled model file not found: {path}")
+        data = _read_npz_mapped(path)
+        version = int(data["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format {version} in {path}; run --export-compiled")
+        self.terms = data["terms"]
+        self.term_index = data["term_index"]
+        self.idf = data["idf"]
+        self.coef = data["coef"]
+        # Plain ndarray views of the same mapped pages: no np.memmap overhead per lookup
+        self._arrays = tuple(a.view(np.ndarray) for a in (self.terms, self.term_index, self.idf, self.coef))
+        self.intercept = float(data["intercept"])
+        self.classes = np.array(data["classes"])
+        self.ngram_range = tuple(int(n) for n in data["ngram_range"])
+        self.lowercase = bool(data["lowercase"])
+        self.strip_accents = _ACCENT_FUNCTIONS.get(str(data["strip_accents"]))
+        self.sublinear_tf = bool(data["sublinear_tf"])
+        self.norm = str(data["norm"]) or None
+        self.model_path = path
+        logger.info("Compiled model loaded from %s", path)
+        return self
+
+    def _analyze(self, doc: str) -> List[str]:
+        """Tokens and word n-grams, as TfidfVectorizer's word analyzer produces them."""
+        if self.lowercase:
+            doc = doc.lower()
+        if self.strip_accents is not None:
+            doc = self.strip_accents(doc)
+        tokens = _TOKEN_PATTERN.findall(doc)
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        original_tokens = tokens
+        if min_n == 1:
+            tokens = list(original_tokens)
+            min_n += 1
+        else:
+            tokens = []
+        n_original_tokens = len(original_tokens)
+        for n in range(min_n, min(max_n + 1, n_original_tokens + 1)):
+            for i in range(n_original_tokens - n + 1):
+                tokens.append(" ".join(original_tokens[i:i + n]))
+        return tokens
+
+    def _decisions(self, docs: List[str]) -> np.ndarray:
+        """Linear decision values for prepared documents, with one vocabulary search for all of them."""
+        terms, term_index, idf, coef = self._arrays
+        tokens: List[str] = []
+        lengths = np.zeros(len(docs), dtype=np.int64)
+        for i, doc in enumerate(docs):
+            doc_tokens = self._analyze(doc)
+            tokens += doc_tokens
+            lengths[i] = len(doc_tokens)
+        decision = np.full(len(docs), self.intercept, dtype=np.float64)
+        if not tokens or not len(terms):
+            return decision
+        # Search each distinct token once. Tokens never contain "\n", so they are encoded in
+        # one go; one byte wider than the longest term, so a longer token cannot match.
+        distinct = list(dict.fromkeys(tokens))
+        keys = np.array("\n".join(distinct).encode("utf-8").split(b"\n"), dtype=f"S{terms.dtype.itemsize + 1}")
+        pos = np.minimum(np.searchsorted(terms, keys), len(terms) - 1)
+        distinct_columns = np.where(terms[pos] == keys, term_index[pos], -1)
+        column_of = dict(zip(distinct, distinct_columns.tolist()))
+        columns = np.array(list(map(column_of.__getitem__, tokens)), dtype=np.int64)
+        found = columns >= 0
+        doc_ids = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)[found]
+        n_terms = len(terms)
+        # Term counts per (document, column), in column order within each document as in sklearn's CSR
+        pairs, counts = np.unique(doc_ids * n_terms + columns[found], return_counts=True)
+        rows, columns = pairs // n_terms, pairs % n_terms
+        values = counts.astype(np.float64)
+        if self.sublinear_tf:
+            values = np.log(values) + 1
+        values = values * idf[columns]
+        if self.norm == "l2":
+            values /= np.sqrt(np.bincount(rows, values * values, minlength=len(docs)))[rows]
+        elif self.norm == "l1":
+            values /= np.bincount(rows, np.abs(values), minlength=len(docs))[rows]
+        return decision + np.bincount(rows, values * coef[columns], minlength=len(docs))
+
+    def score(self, X: List[str]) -> Tuple[List[int], List[float]]:
+        """Predict labels and phishing probabilities (see PhishingClassifier.score)."""
+        return self.score_prepared([prepare_input(t) for t in X])
+
+    def score_prepared(self, prepared: List[str]) -> Tuple[List[int], List[float]]:
+        """score() for texts already passed through prepare_input."""
+        if self.coef is None:
+            raise RuntimeError("Compiled model not loaded. Call load() first.")
+        if not prepared:
+            return [], []
+        decision = self._decisions(prepared)
+        labels = self.classes[(decision > 0).astype(int)]
+        probs = 1.0 / (1.0 + np.exp(-decision))
+        return [int(label) for label in labels], probs.tolist()
+
+    def predict(self, X: List[str]) -> List[int]:
+        """Predict class (0 or 1) for each input text."""
+        labels, _ = self.score(X)
+        return labels
+
+    def predict_proba(self, X: List[str]) -> List[Tuple[float, float]]:
+        """Predict probability [P(legit), P(phishing)] for each input."""
+        _, probs = self.score(X)
+        return [(1.0 - p, p) for p in probs]
+
+    def predict_single(self, text: str) -> Tuple[int, float]:
+        """Predict single email. Returns (label, phishing_probability)."""
+        labels, probs = self.score([text])
+        return labels[0], probs[0]
+
+    def is_phishing(self, text: str, threshold: Optional[float] = None) -> bool:
+        """Return True if classified as phishing above threshold."""
+        _, prob = self.predict_single(text)
+        thresh = threshold if threshold is not None else SPAM_PROBABILITY_THRESHOLD
+        return prob >= thresh
+
+
+def compiled_is_current(model_path: Optional[str] = None, compiled_path: Optional[str] = None) -> bool:
+    """True if a compiled artifact exists and is not older than the joblib model."""
+    model_path = model_path or MODEL_PATH
+    compiled_path = compiled_path or COMPILED_MODEL_PATH
+    if not os.path.isfile(compiled_path):
+        return False
+    if not os.path.isfile(model_path):
+        return True
+    return os.path.getmtime(compiled_path) >= os.path.getmtime(model_path)
+
+
+def load_scorer(model_path: Optional[str] = None, compiled_path: Optional[str] = None):
+    """
+    Load the fastest available scorer: the compiled artifact when it is current,
+    otherwise the joblib PhishingClassifier (imports scikit-learn).
+    """
+    model_path = model_path or MODEL_PATH
+    compiled_path = compiled_path or COMPILED_MODEL_PATH
+    if compiled_is_current(model_path, compiled_path):
+        try:
+            return CompiledScorer(compiled_path).load()
+        except ValueError as e:
+            logger.warning("Ignoring compiled model: %s", e)
+    from ml.classifier import PhishingClassifier
+
+    return PhishingClassifier(model_path=model_path).load()
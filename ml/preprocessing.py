@@ -0,0 +1,40 @@
+"""Model input preparation shared by the scikit-learn classifier and the compiled scorer."""
+import re
+
+from config import MAX_EMAIL_LENGTH
+from detection.text_analysis import normalize_text
+
+# Per-recipient tracking query parameters in links (utm_*, click ids, mailing-list ids)
+_TRACKING_PARAM = re.compile(
+    r"[?&](?:utm_[a-z]+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|_hsenc|_hsmi|mkt_tok)=[^&#\s\"'<>]*",
+    re.IGNORECASE,
+)
+# Their names as they read after normalization ("utm_source" becomes "utm source")
+_TRACKING_NAME = re.compile(r"\b(?:utm [a-z]|fbclid|gclid|dclid|msclkid|mc cid|mc eid|hsenc|hsmi|mkt tok)", re.IGNORECASE)
+
+
+def truncate_input(text: str) -> str:
+    """Truncate to max length for model input."""
+    if not text or len(text) <= MAX_EMAIL_LENGTH:
+        return text or ""
+    return text[:MAX_EMAIL_LENGTH]
+
+
+def prepare_input(text: str) -> str:
+    """
+    Clean and truncate one raw email into the text the model vectorizes.
+    Same as truncate_input(clean_text(text)), but stops cleaning at MAX_EMAIL_LENGTH.
+    """
+    return normalize_text(text, MAX_EMAIL_LENGTH)
+
+
+def cache_key_input(text: str, prepared: str | None = None) -> str:
+    """
+    Verdict cache key input for one raw email: prepare_input with link tracking
+    parameters (name and whole value) removed, so copies of one campaign email
+    share a key. Bounded like prepare_input. Pass the prepare_input result if
+    already known: without tracking params in it, it is the key as is.
+    """
+    if prepared is not None and not _TRACKING_NAME.search(prepared):
+        return prepared
+    return normalize_text(text, MAX_EMAIL_LENGTH, drop=_TRACKING_PARAM)
@@ -0,0 +1,139 @@
+"""
+Process-wide model registry.
+
+Loads the model once per process and hot-swaps it when MODEL_PATH (or the compiled
+export) changes on disk, e.g. after `python main.py --train`. The file check is a
+cheap os.stat at most every MODEL_RELOAD_CHECK_SECONDS; the model is reloaded and
+swapped under a lock, and readers always see a consistent (model, version) pair.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+from config import MODEL_PATH, COMPILED_MODEL_PATH, MODEL_RELOAD_CHECK_SECONDS
+from ml.compiled import load_scorer
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def file_version(path: str) -> str:
+    """Short content hash identifying one model artifact."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """Holds the current model and its version; reloads when the model files change."""
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        compiled_path: Optional[str] = None,
+        check_interval: Optional[float] = None,
+    ):
+        self.model_path = model_path or MODEL_PATH
+        self.compiled_path = compiled_path or COMPILED_MODEL_PATH
+        self.check_interval = MODEL_RELOAD_CHECK_SECONDS if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        self._current: Optional[Tuple[Any, str]] = None
+        self._signature: Optional[tuple] = None
+        self._last_check = 0.0
+
+    def _file_signature(self) -> tuple:
+        """(path, mtime_ns, size) for each model file that exists."""
+        sig = []
+        for path in (self.model_path, self.compiled_path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            sig.append((path, st.st_mtime_ns, st.st_size))
+        return tuple(sig)
+
+    def _load(self, signature: tuple) -> None:
+        model = load_scorer(self.model_path, self.compiled_path)
+        version_path = self.model_path if os.path.isfile(self.model_path) else self.compiled_path
+        version = file_version(version_path)
+        previous = self._current[1] if self._current else None
+        self._current = (model, version)
+        self._signature = signature
+        if previous is None:
+            logger.info("Model version %s loaded (%s)", version, type(model).__name__)
+        elif previous != version:
+            logger.info("Model reloaded: version %s -> %s (%s)", previous, version, type(model).__name__)
+
+    def reload(self, force: bool = False) -> bool:
+        """Reload if the model files changed (or force). Returns True if a load happened."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            signature = self._file_signature()
+            if not force and self._current is not None and signature == self._signature:
+                return False
+            try:
+                self._load(signature)
+            except Exception:
+                if self._current is None:
+                    raise
+                # Keep serving the previous model; retry on the next check
+                logger.exception("Model reload failed; keeping version %s", self._current[1])
+                return False
+            return True
+
+    def current(self) -> Tuple[Any, str]:
+        """Return (model, version), loading or hot-reloading as needed."""
+        current = self._current
+        if current is None or time.monotonic() - self._last_check >= self.check_interval:
+            self.reload()
+            current = self._current
+        return current
+
+    def get(self) -> Any:
+        """Current model (PhishingClassifier or CompiledScorer)."""
+        return self.current()[0]
+
+    @property
+    def version(self) -> str:
+        """Version of the current model (short content hash)."""
+        return self.current()[1]
+
+    def install(self, model: Any, version: str) -> None:
+        """Swap in an already-loaded model (e.g. one trained in-process)."""
+        with self._lock:
+            self._current = (model, version)
+            self._signature = self._file_signature()
+            self._last_check = time.monotonic()
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Process-wide registry for MODEL_PATH."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+def current_model() -> Tuple[Any, str]:
+    """(model, version) from the process-wide registry."""
+    return get_registry().current()
+
+
+def get_model() -> Any:
+    """Current model from the process-wide registry."""
+    return get_registry().get()
+
+
+def get_model_version() -> str:
+    """Version of the current model in the process-wide registry."""
+    return get_registry().version
@@ -3,24 +3,24 @@ import os
 import sys
 
 from config import MODEL_PATH
-from storage.database import init_db, store_result, get_recent_results
+from storage.database import init_db, store_result, flush_results, get_recent_results
 
 def main():
     if not os.path.isfile(MODEL_PATH):
         print("Model not found. Run first: python main.py --train")
         sys.exit(1)
     init_db()
-    from ml.classifier import PhishingClassifier
-    clf = PhishingClassifier()
-    clf.load()
+    from ml.registry import current_model
+    clf, model_version = current_model()
     samples = [
         "Urgent: Verify your account. Click here to confirm your identity.",
         "Hi, meeting tomorrow at 10am in room B. Best regards",
         "You have won a prize! Confirm your details now to claim.",
     ]
-    for text in samples:
-        label, prob = clf.predict_single(text)
-        store_result(text[:500], label, prob)
+    labels, probs = clf.score(samples)
+    for text, label, prob in zip(samples, labels, probs):
+        store_result(text[:500], label, prob, model_version=model_version)
+    flush_results()
     print("Seeded", len(samples), "classifications.")
     print("Recent:", get_recent_results(limit=5))
 
@@ -1,13 +1,40 @@
 """Storage: database and cache."""
-from storage.database import get_engine, init_db, store_result, get_recent_results
-from storage.redis_cache import get_cache, cache_get, cache_set
+from storage.database import (
+    get_engine,
+    init_db,
+    store_result,
+    store_results,
+    flush_results,
+    get_recent_results,
+    get_stats,
+    get_watermark,
+    set_watermark,
+)
+from storage.redis_cache import (
+    get_cache,
+    record_redis_result,
+    cache_get,
+    cache_get_many,
+    cache_set,
+    cache_set_many,
+    get_cache_stats,
+)
 
 __all__ = [
     "get_engine",
     "init_db",
     "store_result",
+    "store_results",
+    "flush_results",
     "get_recent_results",
+    "get_stats",
+    "get_watermark",
+    "set_watermark",
     "get_cache",
+    "record_redis_result",
     "cache_get",
+    "cache_get_many",
     "cache_set",
+    "cache_set_many",
+    "get_cache_stats",
 ]
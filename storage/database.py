@@ -1,13 +1,28 @@
 """Database logic to store processed emails and prediction results."""
 import os
+import threading
+import time
 from contextlib import contextmanager
-from datetime import datetime
-from typing import Generator, List
+from datetime import datetime, timezone
+from typing import Any, Dict, Generator, List, Optional, Sequence, Tuple, Union
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL,
+    SQLITE_PROFILE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    STORE_WRITE_BEHIND,
+    STORE_QUEUE_MAX_ROWS,
+    STORE_FLUSH_ROWS,
+    STORE_FLUSH_MS,
+    STORE_BACKPRESSURE,
+)
+from storage.rollups import CREATE_ROLLUPS, add_to_rollups, backfill_rollups, query_stats
+from storage.watermarks import CREATE_WATERMARKS, read_watermark, write_watermark
+from storage.write_behind import flush_pending, get_writer
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -21,12 +36,42 @@ if DATABASE_URL.startswith("sqlite"):
 
 _engine = None
 _Session = None
+_db_ready = False
+_db_lock = threading.Lock()
+
+
+def _sqlite_pragmas() -> List[str]:
+    """Per-connection PRAGMAs for the configured SQLite profile."""
+    pragmas = [f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}"]
+    if SQLITE_PROFILE == "tuned":
+        pragmas += [
+            # Readers (dashboard) no longer block the writer, and commits skip most fsyncs
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+    return pragmas
 
 
 def get_engine():
     global _engine
     if _engine is None:
-        _engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+        is_sqlite = DATABASE_URL.startswith("sqlite")
+        _engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if is_sqlite else {})
+        if is_sqlite:
+            pragmas = _sqlite_pragmas()
+
+            @event.listens_for(_engine, "connect")
+            def _apply_pragmas(dbapi_conn, _record):
+                cursor = dbapi_conn.cursor()
+                if cursor.execute("PRAGMA page_count").fetchone()[0] == 0:
+                    # Only takes effect on an empty file, and before journal_mode=WAL;
+                    # lets retention shrink the file in steps
+                    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+                cursor.close()
     return _engine
 
 
@@ -37,23 +82,89 @@ def get_session():
     return _Session()
 
 
+# PRAGMA user_version of the predictions schema:
+# 0 = created_at as ISO text, no indexes; 1 = created_at as integer epoch seconds, indexed;
+# 2 = prediction_rollups table maintained on insert; 3 = mailbox_watermarks table for the mail monitor
+SCHEMA_VERSION = 3
+
+_CREATE_PREDICTIONS = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email_text_preview TEXT,
+        label INTEGER,
+        probability REAL,
+        created_at INTEGER,
+        model_version TEXT
+    )
+"""
+
+# Composite so that time-window counts per label are answered from the index alone
+_CREATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions (created_at, label)",
+    "CREATE INDEX IF NOT EXISTS idx_predictions_label ON predictions (label, created_at)",
+)
+
+
+def _migrate_v0(conn) -> None:
+    """Rebuild a version 0 table with epoch timestamps (ISO text is parsed as UTC)."""
+    columns = {c["name"] for c in inspect(conn).get_columns("predictions")}
+    version_col = "model_version" if "model_version" in columns else "NULL"
+    conn.execute(text("DROP TABLE IF EXISTS predictions_new"))
+    conn.execute(text(_CREATE_PREDICTIONS.format(name="predictions_new")))
+    conn.execute(text(f"""
+        INSERT INTO predictions_new (id, email_text_preview, label, probability, created_at, model_version)
+        SELECT id, email_text_preview, label, probability,
+               CASE WHEN typeof(created_at) = 'integer' THEN created_at
+                    ELSE CAST(strftime('%s', created_at) AS INTEGER) END,
+               {version_col}
+        FROM predictions
+    """))
+    conn.execute(text("DROP TABLE predictions"))
+    conn.execute(text("ALTER TABLE predictions_new RENAME TO predictions"))
+
+
+def _has_stats(conn) -> bool:
+    if not inspect(conn).has_table("sqlite_stat1"):
+        return False
+    return conn.execute(text("SELECT 1 FROM sqlite_stat1 WHERE tbl = 'predictions' LIMIT 1")).first() is not None
+
+
 def init_db() -> None:
-    """Create predictions table if not exists."""
+    """Create the predictions, rollup and watermark tables, migrating older databases to SCHEMA_VERSION."""
     engine = get_engine()
     with engine.connect() as conn:
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email_text_preview TEXT,
-                label INTEGER,
-                probability REAL,
-                created_at TEXT
-            )
-        """))
+        existed = inspect(conn).has_table("predictions")
+        version = conn.execute(text("PRAGMA user_version")).scalar() or 0
+        if existed and version < 1:
+            _migrate_v0(conn)
+        if existed and version < SCHEMA_VERSION:
+            logger.info("Migrating predictions schema from version %d to %d", version, SCHEMA_VERSION)
+        conn.execute(text(_CREATE_PREDICTIONS.format(name="predictions")))
+        for statement in _CREATE_INDEXES:
+            conn.execute(text(statement))
+        conn.execute(text(CREATE_ROLLUPS))
+        conn.execute(text(CREATE_WATERMARKS))
+        if existed and version < 2:
+            backfill_rollups(conn)
+        conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+        # Without statistics the planner may scan the label index for time-window queries
+        if engine.dialect.name == "sqlite" and not _has_stats(conn):
+            conn.execute(text("ANALYZE predictions"))
         conn.commit()
     logger.info("Database initialized")
 
 
+def ensure_db() -> None:
+    """Run init_db once per process."""
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if not _db_ready:
+            init_db()
+            _db_ready = True
+
+
 @contextmanager
 def session_scope() -> Generator:
     session = get_session()
@@ -67,30 +178,98 @@ def session_scope() -> Generator:
         session.close()
 
 
-def store_result(email_preview: str, label: int, probability: float) -> None:
-    """Store one classification result."""
-    init_db()
+_INSERT_PREDICTION = text(
+    "INSERT INTO predictions (email_text_preview, label, probability, created_at, model_version) "
+    "VALUES (:preview, :label, :prob, :at, :version)"
+)
+
+
+def _prediction_row(
+    email_preview: str,
+    label: int,
+    probability: float,
+    at: int,
+    model_version: Optional[str],
+) -> Dict[str, Any]:
+    return {
+        "preview": email_preview[:500] if email_preview else "",
+        "label": int(label),
+        "prob": float(probability),
+        "at": at,
+        "version": model_version,
+    }
+
+
+def _insert_predictions(rows: List[Dict[str, Any]]) -> None:
+    """Insert prediction rows and update their rollup buckets in one transaction."""
+    ensure_db()
     with session_scope() as session:
-        session.execute(
-            text(
-                "INSERT INTO predictions (email_text_preview, label, probability, created_at) VALUES (:preview, :label, :prob, :at)"
-            ),
-            {
-                "preview": email_preview[:500] if email_preview else "",
-                "label": label,
-                "prob": probability,
-                "at": datetime.utcnow().isoformat(),
-            },
-        )
+        session.execute(_INSERT_PREDICTION, rows)
+        add_to_rollups(session, rows)
+
+
+def _write(rows: List[Dict[str, Any]]) -> None:
+    """Hand rows to the write-behind queue, or insert them now if it is disabled."""
+    if not STORE_WRITE_BEHIND:
+        _insert_predictions(rows)
+        return
+    get_writer(
+        _insert_predictions,
+        max_queue_rows=STORE_QUEUE_MAX_ROWS,
+        flush_rows=STORE_FLUSH_ROWS,
+        flush_ms=STORE_FLUSH_MS,
+        backpressure=STORE_BACKPRESSURE,
+        name="predictions-writer",
+    ).submit(rows)
+
+
+def store_result(
+    email_preview: str,
+    label: int,
+    probability: float,
+    model_version: Optional[str] = None,
+) -> None:
+    """Store one classification result, tagged with the model version that produced it."""
+    _write([_prediction_row(email_preview, label, probability, int(time.time()), model_version)])
+
+
+def store_results(
+    rows: Sequence[Tuple[str, int, float]],
+    model_version: Optional[str] = None,
+) -> None:
+    """Store many (email_preview, label, probability) results in one transaction."""
+    if not rows:
+        return
+    at = int(time.time())
+    _write([_prediction_row(preview, label, probability, at, model_version) for preview, label, probability in rows])
+
+
+def flush_results(timeout: Optional[float] = 10.0) -> bool:
+    """Wait until queued results are written (e.g. before reading them back)."""
+    return flush_pending(timeout)
+
+
+def _epoch_to_iso(value: Optional[int]) -> Optional[str]:
+    """Stored epoch seconds as the naive UTC ISO string callers have always received."""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(int(value), timezone.utc).replace(tzinfo=None).isoformat()
 
 
 def get_recent_results(limit: int = 100) -> List[dict]:
-    """Return recent predictions as list of dicts."""
-    init_db()
+    """
+    Return recent predictions as list of dicts. Reads only committed rows: results
+    still queued by the write-behind writer show up within about STORE_FLUSH_MS;
+    call flush_results() first to read your own writes.
+    """
+    ensure_db()
     engine = get_engine()
     with engine.connect() as conn:
         result = conn.execute(
-            text("SELECT id, email_text_preview, label, probability, created_at FROM predictions ORDER BY id DESC LIMIT :n"),
+            text(
+                "SELECT id, email_text_preview, label, probability, created_at, model_version "
+                "FROM predictions ORDER BY id DESC LIMIT :n"
+            ),
             {"n": limit},
         )
         rows = result.fetchall()
@@ -100,7 +279,33 @@ def get_recent_results(limit: int = 100) -> List[dict]:
             "email_text_preview": r[1],
             "label": int(r[2]),
             "probability": float(r[3]),
-            "created_at": r[4],
+            "created_at": _epoch_to_iso(r[4]),
+            "model_version": r[5],
         }
         for r in rows
     ]
+
+
+def get_stats(window: Union[int, str] = "24h") -> Dict[str, Any]:
+    """
+    Prediction counts and trends over the last window (seconds, or e.g. "15m", "24h", "7d"),
+    read from the rollup buckets. See storage.rollups.query_stats for the fields.
+    Like get_recent_results, it does not wait for queued writes.
+    """
+    ensure_db()
+    with get_engine().connect() as conn:
+        return query_stats(conn, window)
+
+
+def get_watermark(account: str, folder: str) -> Optional[Tuple[int, int]]:
+    """(uidvalidity, last_uid) already classified for an account's folder, or None."""
+    ensure_db()
+    with get_engine().connect() as conn:
+        return read_watermark(conn, account, folder)
+
+
+def set_watermark(account: str, folder: str, uidvalidity: int, last_uid: int) -> None:
+    """Advance (or reset, after a UIDVALIDITY change) an account's folder watermark."""
+    ensure_db()
+    with get_engine().begin() as conn:
+        write_watermark(conn, account, folder, uidvalidity, last_uid)
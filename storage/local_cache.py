@@ -0,0 +1,153 @@
+"""In-process LRU/TTL cache and a circuit breaker for remote dependencies."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LocalCache:
+    """
+    Bounded, thread-safe LRU cache whose entries also expire after a TTL.
+    Values are stored as given; callers must not mutate what they get back.
+    """
+
+    def __init__(self, max_items: int = 10000, ttl_seconds: float = 300.0):
+        self.max_items = max(0, max_items)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store value; ttl_seconds (capped at the cache TTL) overrides the default."""
+        if self.max_items == 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CircuitBreaker:
+    """
+    Skip calls to a failing dependency. After a failure the circuit opens for
+    base_delay seconds, doubling on each consecutive failure up to max_delay.
+    Once the delay has passed one caller is let through as a trial (half-open);
+    success closes the circuit, failure re-opens it with the next delay.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        self._trial_in_flight = False
+        self.opened = 0  # times the circuit has opened
+
+    @property
+    def state(self) -> str:
+        if self._failures == 0:
+            return "closed"
+        return "half-open" if time.monotonic() >= self._open_until else "open"
+
+    def allow(self) -> bool:
+        """True if a call may be attempted now."""
+        with self._lock:
+            if self._failures == 0:
+                return True
+            if time.monotonic() < self._open_until or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            delay = min(self.max_delay, self.base_delay * (2 ** (self._failures - 1)))
+            self._open_until = time.monotonic() + delay
+            self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = max(0.0, self._open_until - time.monotonic()) if self._failures else 0.0
+            failures, opened = self._failures, self.opened
+        return {
+            "state": self.state,
+            "consecutive_failures": failures,
+            "opened": opened,
+            "retry_in_seconds": round(retry_in, 3),
+        }
+
+
+class TierStats:
+    """Hit/miss/error counts and cumulative latency for one cache tier."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.skipped = 0  # lookups not attempted (e.g. circuit open)
+        self._calls = 0
+        self._seconds = 0.0
+        self._max_seconds = 0.0
+
+    def record(self, hits: int, misses: int, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.errors += int(error)
+            self._calls += 1
+            self._seconds += seconds
+            self._max_seconds = max(self._max_seconds, seconds)
+
+    def record_skip(self, count: int = 1) -> None:
+        with self._lock:
+            self.skipped += count
+            self.misses += count
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "errors": self.errors,
+                "skipped": self.skipped,
+                "calls": self._calls,
+                "avg_ms": round(self._seconds / self._calls * 1000.0, 3) if self._calls else 0.0,
+                "max_ms": round(self._max_seconds * 1000.0, 3),
+            }
@@ -1,60 +1,231 @@
-"""Caching layer using Redis."""
+"""
+Two-tier cache: a bounded in-process LRU/TTL tier checked first, Redis as the
+shared second tier. Redis calls sit behind a circuit breaker, so while Redis is
+down lookups skip it immediately (cache misses) instead of waiting on a
+connection timeout per request. Bulk helpers use one MGET / one pipeline per
+batch over a bounded connection pool shared by all threads.
+"""
 import hashlib
 import json
-from typing import Any, Optional
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from config import REDIS_URL
+from config import (
+    REDIS_URL,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_MAX_CONNECTIONS,
+    CACHE_SERIALIZER,
+    REDIS_BREAKER_BASE_DELAY,
+    REDIS_BREAKER_MAX_DELAY,
+    LOCAL_CACHE_MAX_ITEMS,
+    LOCAL_CACHE_TTL_SECONDS,
+)
+from storage.local_cache import CircuitBreaker, LocalCache, TierStats
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+try:
+    import msgpack
+except ImportError:  # optional; values are stored as JSON without it
+    msgpack = None
+
+# msgpack values carry this prefix; JSON text never starts with it
+_MSGPACK_TAG = b"M"
+
 _redis_client = None
+_breaker = CircuitBreaker(base_delay=REDIS_BREAKER_BASE_DELAY, max_delay=REDIS_BREAKER_MAX_DELAY)
+_local = LocalCache(max_items=LOCAL_CACHE_MAX_ITEMS, ttl_seconds=LOCAL_CACHE_TTL_SECONDS)
+_local_stats = TierStats()
+_redis_stats = TierStats()
 
 
-def get_cache():
-    """Lazy Redis connection. Returns None if Redis unavailable."""
+def _redis():
+    """Redis client if the circuit allows a call (connecting lazily), else None."""
     global _redis_client
+    if not _breaker.allow():
+        return None
     if _redis_client is not None:
         return _redis_client
     try:
         import redis
-        _redis_client = redis.from_url(REDIS_URL)
-        _redis_client.ping()
-        return _redis_client
+        pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_SOCKET_TIMEOUT,  # wait for a free connection at most this long
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+        client = redis.Redis(connection_pool=pool)
+        client.ping()
+        _redis_client = client
+        return client
     except Exception as e:
-        logger.warning("Redis not available: %s", e)
-        _redis_client = None
+        _breaker.record_failure()
+        logger.warning("Redis not available (retry in %.1fs): %s", _breaker.stats()["retry_in_seconds"], e)
         return None
 
 
+def get_cache():
+    """
+    Lazy Redis connection. Returns None if Redis is unavailable or its circuit is open.
+    Callers report each command they run with record_redis_result, so the circuit opens
+    on their failures too.
+    """
+    return _redis()
+
+
+def record_redis_result(ok: bool) -> None:
+    """Feed the outcome of a Redis command run on the get_cache() client into the circuit breaker."""
+    if ok:
+        _breaker.record_success()
+    else:
+        _breaker.record_failure()
+
+
 def _key(prefix: str, raw: str) -> str:
     h = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
     return f"{prefix}:{h}"
 
 
+def _dumps(value: Any) -> bytes:
+    if CACHE_SERIALIZER == "msgpack" and msgpack is not None:
+        return _MSGPACK_TAG + msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    """Decode either format, so processes with different CACHE_SERIALIZER settings can share Redis."""
+    if raw[:1] == _MSGPACK_TAG:
+        if msgpack is None:
+            return None  # written by a process with msgpack; treat as a miss
+        return msgpack.unpackb(raw[1:], raw=False)
+    return json.loads(raw)
+
+
+def _decode(raw: Optional[bytes]) -> Optional[Any]:
+    """_loads for a value read from Redis; a corrupt or foreign value counts as a miss."""
+    if raw is None:
+        return None
+    try:
+        return _loads(raw)
+    except Exception as e:
+        logger.debug("Cache decode error: %s", e)
+        return None
+
+
+def _local_get(k: str) -> Optional[Any]:
+    start = time.perf_counter()
+    val = _local.get(k)
+    _local_stats.record(int(val is not None), int(val is None), time.perf_counter() - start)
+    return val
+
+
 def cache_get(key_prefix: str, raw_input: str) -> Optional[Any]:
-    """Get cached value for this input. Returns None if miss or Redis down."""
-    r = get_cache()
+    """Get cached value for this input. Returns None on a miss in both tiers."""
+    k = _key(key_prefix, raw_input)
+    val = _local_get(k)
+    if val is not None:
+        return val
+    r = _redis()
     if r is None:
+        _redis_stats.record_skip()
         return None
+    start = time.perf_counter()
     try:
-        k = _key(key_prefix, raw_input)
-        val = r.get(k)
-        if val is None:
-            return None
-        return json.loads(val)
+        raw = r.get(k)
     except Exception as e:
+        _breaker.record_failure()
+        _redis_stats.record(0, 1, time.perf_counter() - start, error=True)
         logger.debug("Cache get error: %s", e)
         return None
+    _breaker.record_success()
+    val = _decode(raw)
+    _redis_stats.record(int(val is not None), int(val is None), time.perf_counter() - start)
+    if val is not None:
+        _local.set(k, val)
+    return val
+
+
+def cache_get_many(key_prefix: str, raw_inputs: List[str]) -> List[Optional[Any]]:
+    """Get cached values for many inputs: local tier first, one MGET for the rest. Misses are None."""
+    if not raw_inputs:
+        return []
+    keys = [_key(key_prefix, raw) for raw in raw_inputs]
+    start = time.perf_counter()
+    results = [_local.get(k) for k in keys]
+    missing = [i for i, v in enumerate(results) if v is None]
+    _local_stats.record(len(keys) - len(missing), len(missing), time.perf_counter() - start)
+    if not missing:
+        return results
+    r = _redis()
+    if r is None:
+        _redis_stats.record_skip(len(missing))
+        return results
+    start = time.perf_counter()
+    try:
+        vals = r.mget([keys[i] for i in missing])
+    except Exception as e:
+        _breaker.record_failure()
+        _redis_stats.record(0, len(missing), time.perf_counter() - start, error=True)
+        logger.debug("Cache mget error: %s", e)
+        return results
+    _breaker.record_success()
+    hits = 0
+    for i, raw in zip(missing, vals):
+        val = _decode(raw)
+        if val is not None:
+            hits += 1
+            results[i] = val
+            _local.set(keys[i], val)
+    _redis_stats.record(hits, len(missing) - hits, time.perf_counter() - start)
+    return results
 
 
 def cache_set(key_prefix: str, raw_input: str, value: Any, ttl_seconds: int = 3600) -> None:
-    """Set cache for this input."""
-    r = get_cache()
+    """Set cache for this input in both tiers."""
+    k = _key(key_prefix, raw_input)
+    _local.set(k, value, ttl_seconds)
+    r = _redis()
     if r is None:
         return
     try:
-        k = _key(key_prefix, raw_input)
-        r.setex(k, ttl_seconds, json.dumps(value))
+        r.setex(k, ttl_seconds, _dumps(value))
+        _breaker.record_success()
     except Exception as e:
+        _breaker.record_failure()
         logger.debug("Cache set error: %s", e)
+
+
+def cache_set_many(key_prefix: str, items: Sequence[Tuple[str, Any]], ttl_seconds: int = 3600) -> None:
+    """Set cache for many (raw input, value) pairs in both tiers; Redis gets one pipelined SETEX batch."""
+    if not items:
+        return
+    keyed = [(_key(key_prefix, raw), value) for raw, value in items]
+    for k, value in keyed:
+        _local.set(k, value, ttl_seconds)
+    r = _redis()
+    if r is None:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        for k, value in keyed:
+            pipe.setex(k, ttl_seconds, _dumps(value))
+        pipe.execute()
+        _breaker.record_success()
+    except Exception as e:
+        _breaker.record_failure()
+        logger.debug("Cache pipeline set error: %s", e)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Per-tier hit/miss/latency counters and the Redis circuit state."""
+    return {
+        "local": dict(_local_stats.snapshot(), size=len(_local), max_items=_local.max_items),
+        "redis": dict(_redis_stats.snapshot(), breaker=_breaker.stats()),
+    }
+
+
+def clear_local_cache() -> None:
+    """Drop the in-process tier (e.g. in tests, or after a model change)."""
+    _local.clear()
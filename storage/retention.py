@@ -0,0 +1,199 @@
+"""
+Retention for the predictions table.
+
+Rows older than RETENTION_MAX_AGE_DAYS, or beyond the newest RETENTION_MAX_ROWS,
+are copied to zstd-compressed Parquet files under RETENTION_ARCHIVE_DIR/day=YYYY-MM-DD/
+and then deleted, one chunk of RETENTION_CHUNK_ROWS per short transaction,
+releasing free pages with PRAGMA incremental_vacuum after each chunk. Rollups
+are not touched by deletion (stats still count archived rows), except that
+minute buckets older than RETENTION_MINUTE_ROLLUP_DAYS are dropped.
+"""
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from config import (
+    RETENTION_MAX_AGE_DAYS,
+    RETENTION_MAX_ROWS,
+    RETENTION_ARCHIVE_ENABLED,
+    RETENTION_ARCHIVE_DIR,
+    RETENTION_CHUNK_ROWS,
+    RETENTION_VACUUM_PAGES,
+    RETENTION_PAUSE_MS,
+    RETENTION_MINUTE_ROLLUP_DAYS,
+)
+from storage.database import ensure_db, flush_results, get_engine
+from storage.rollups import MINUTE
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DAY = 86400
+_COLUMNS = ["id", "email_text_preview", "label", "probability", "created_at", "model_version"]
+
+
+def _expired_boundary(conn, max_age_days: float, max_rows: int, now: float) -> int:
+    """
+    Highest expired id. Ids grow with insertion time, so everything at or below the
+    newest row past the age limit, or below the newest max_rows rows, is expired.
+    """
+    boundary = 0
+    if max_age_days > 0:
+        cutoff = int(now - max_age_days * DAY)
+        boundary = conn.execute(
+            text("SELECT MAX(id) FROM predictions WHERE created_at < :cutoff"), {"cutoff": cutoff}
+        ).scalar() or 0
+    if max_rows > 0:
+        row_limit = conn.execute(
+            text("SELECT id FROM predictions ORDER BY id DESC LIMIT 1 OFFSET :n"), {"n": max_rows}
+        ).scalar() or 0
+        boundary = max(boundary, row_limit)
+    return boundary
+
+
+def _archive_chunk(rows: List[tuple], archive_dir: str) -> List[str]:
+    """Write one chunk as one Parquet file per day partition; returns the file paths."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    by_day: Dict[str, List[tuple]] = defaultdict(list)
+    for row in rows:
+        created = row[4]
+        day = datetime.fromtimestamp(created, timezone.utc).strftime("%Y-%m-%d") if created is not None else "unknown"
+        by_day[day].append(row)
+    paths = []
+    for day, day_rows in sorted(by_day.items()):
+        directory = os.path.join(archive_dir, f"day={day}")
+        os.makedirs(directory, exist_ok=True)
+        # Named by id range: re-running after a crash overwrites instead of duplicating
+        path = os.path.join(directory, f"predictions-{day_rows[0][0]}-{day_rows[-1][0]}.parquet")
+        table = pa.table(
+            {name: [r[i] for r in day_rows] for i, name in enumerate(_COLUMNS)},
+            schema=pa.schema([
+                ("id", pa.int64()),
+                ("email_text_preview", pa.string()),
+                ("label", pa.int8()),
+                ("probability", pa.float64()),
+                ("created_at", pa.int64()),
+                ("model_version", pa.string()),
+            ]),
+        )
+        tmp = path + ".tmp"
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
+
+
+def _incremental_vacuum_enabled(conn) -> bool:
+    return conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2
+
+
+def enable_incremental_vacuum() -> None:
+    """
+    Switch an existing database to auto_vacuum=INCREMENTAL. This needs one full VACUUM,
+    which locks the database while it rewrites it; new databases get the mode at creation.
+    """
+    flush_results()
+    ensure_db()
+    with get_engine().connect() as conn:
+        if _incremental_vacuum_enabled(conn):
+            return
+        conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+        conn.commit()
+        conn.exec_driver_sql("VACUUM")
+    logger.info("Database switched to incremental vacuum")
+
+
+def run_retention(
+    max_age_days: Optional[float] = None,
+    max_rows: Optional[int] = None,
+    archive: Optional[bool] = None,
+    archive_dir: Optional[str] = None,
+    chunk_rows: Optional[int] = None,
+    dry_run: bool = False,
+    now: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Archive and delete expired predictions in chunks; returns a summary of what was done."""
+    max_age_days = RETENTION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    max_rows = RETENTION_MAX_ROWS if max_rows is None else max_rows
+    archive = RETENTION_ARCHIVE_ENABLED if archive is None else archive
+    archive_dir = archive_dir or RETENTION_ARCHIVE_DIR
+    chunk_rows = max(1, chunk_rows or RETENTION_CHUNK_ROWS)
+    now = time.time() if now is None else now
+
+    flush_results()
+    ensure_db()
+    engine = get_engine()
+    summary: Dict[str, Any] = {"expired": 0, "archived": 0, "deleted": 0, "chunks": 0, "files": [],
+                               "vacuumed_pages": 0, "minute_rollups_deleted": 0, "dry_run": dry_run}
+    with engine.connect() as conn:
+        boundary = _expired_boundary(conn, max_age_days, max_rows, now)
+        summary["expired"] = conn.execute(
+            text("SELECT COUNT(*) FROM predictions WHERE id <= :b"), {"b": boundary}
+        ).scalar() if boundary else 0
+        incremental = _incremental_vacuum_enabled(conn)
+    if dry_run:
+        return summary
+    if summary["expired"] and not incremental:
+        logger.warning("auto_vacuum is not INCREMENTAL; deleted rows are reused but the file will not shrink "
+                       "(run python main.py --retention --compact once to enable it)")
+
+    last_id = 0
+    pause = max(0.0, RETENTION_PAUSE_MS) / 1000.0
+    while last_id < boundary:
+        with engine.connect() as conn:
+            rows = [tuple(r) for r in conn.execute(
+                text(f"SELECT {', '.join(_COLUMNS)} FROM predictions WHERE id > :last AND id <= :b "
+                     "ORDER BY id LIMIT :n"),
+                {"last": last_id, "b": boundary, "n": chunk_rows},
+            )]
+        if not rows:
+            break
+        first, last_id = rows[0][0], rows[-1][0]
+        if archive:
+            # Archive before deleting: a failure here leaves the rows in place for the next run
+            summary["files"].extend(_archive_chunk(rows, archive_dir))
+            summary["archived"] += len(rows)
+        with engine.begin() as conn:
+            summary["deleted"] += conn.execute(
+                text("DELETE FROM predictions WHERE id BETWEEN :first AND :last"), {"first": first, "last": last_id}
+            ).rowcount
+        if incremental:
+            summary["vacuumed_pages"] += _incremental_vacuum(engine, RETENTION_VACUUM_PAGES)
+        summary["chunks"] += 1
+        if pause and last_id < boundary:
+            time.sleep(pause)
+
+    if RETENTION_MINUTE_ROLLUP_DAYS > 0:
+        with engine.begin() as conn:
+            summary["minute_rollups_deleted"] = conn.execute(
+                text("DELETE FROM prediction_rollups WHERE bucket_seconds = :res AND bucket_start < :cutoff"),
+                {"res": MINUTE, "cutoff": int(now - RETENTION_MINUTE_ROLLUP_DAYS * DAY)},
+            ).rowcount
+    if incremental:
+        summary["vacuumed_pages"] += _incremental_vacuum(engine, RETENTION_VACUUM_PAGES)
+    logger.info("Retention: deleted %d rows in %d chunks, archived %d to %d files",
+                summary["deleted"], summary["chunks"], summary["archived"], len(summary["files"]))
+    return summary
+
+
+def _incremental_vacuum(engine, pages: int) -> int:
+    """Release up to pages free pages back to the filesystem; returns how many were released."""
+    with engine.connect() as conn:
+        before = remaining = conn.execute(text("PRAGMA freelist_count")).scalar() or 0
+        target = max(0, before - int(pages))
+        # SQLite frees one page per result row stepped, and the driver steps the
+        # pragma only once (it has no result columns), so repeat until done
+        while remaining > target:
+            conn.exec_driver_sql(f"PRAGMA incremental_vacuum({remaining - target})")
+            conn.commit()
+            freed_to = conn.execute(text("PRAGMA freelist_count")).scalar() or 0
+            if freed_to >= remaining:
+                break
+            remaining = freed_to
+    return max(0, before - remaining)
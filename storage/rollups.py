@@ -0,0 +1,148 @@
+"""
+Time-bucketed prediction rollups.
+
+Every stored prediction also bumps a per-minute and a per-hour bucket (total,
+phishing count, sum of probabilities and a 10-bin probability histogram) in the
+same transaction, so counts and trends are read in O(buckets) instead of
+scanning raw rows.
+"""
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import text
+
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = (MINUTE, HOUR)
+HISTOGRAM_BINS = 10
+# Windows up to this long are reported per minute, longer ones per hour
+MINUTE_RESOLUTION_MAX_WINDOW = 6 * HOUR
+
+_BIN_COLUMNS = [f"h{i}" for i in range(HISTOGRAM_BINS)]
+
+CREATE_ROLLUPS = f"""
+    CREATE TABLE IF NOT EXISTS prediction_rollups (
+        bucket_seconds INTEGER NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        phishing INTEGER NOT NULL DEFAULT 0,
+        probability_sum REAL NOT NULL DEFAULT 0,
+        {", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in _BIN_COLUMNS)},
+        PRIMARY KEY (bucket_seconds, bucket_start)
+    ) WITHOUT ROWID
+"""
+
+_UPSERT = text(
+    "INSERT INTO prediction_rollups (bucket_seconds, bucket_start, total, phishing, probability_sum, "
+    + ", ".join(_BIN_COLUMNS)
+    + ") VALUES (:res, :start, :total, :phishing, :prob_sum, "
+    + ", ".join(f":{c}" for c in _BIN_COLUMNS)
+    + ") ON CONFLICT (bucket_seconds, bucket_start) DO UPDATE SET "
+    + "total = total + excluded.total, phishing = phishing + excluded.phishing, "
+    + "probability_sum = probability_sum + excluded.probability_sum, "
+    + ", ".join(f"{c} = {c} + excluded.{c}" for c in _BIN_COLUMNS)
+)
+
+_WINDOW = re.compile(r"^\s*(\d+)\s*([smhd]?)\s*$", re.IGNORECASE)
+_UNIT_SECONDS = {"": 1, "s": 1, "m": MINUTE, "h": HOUR, "d": 24 * HOUR}
+
+
+def histogram_bin(probability: float) -> int:
+    """Bin index for a probability in [0, 1]: [0, 0.1) -> 0, ..., [0.9, 1] -> 9."""
+    return min(HISTOGRAM_BINS - 1, max(0, int(probability * HISTOGRAM_BINS)))
+
+
+def rollup_params(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aggregate prediction rows (label, prob, at) into one upsert parameter set per bucket."""
+    buckets: Dict[Tuple[int, int], Dict[str, Any]] = defaultdict(
+        lambda: dict({"total": 0, "phishing": 0, "prob_sum": 0.0}, **{c: 0 for c in _BIN_COLUMNS})
+    )
+    for row in rows:
+        at, prob = int(row["at"]), float(row["prob"])
+        column = _BIN_COLUMNS[histogram_bin(prob)]
+        for res in RESOLUTIONS:
+            b = buckets[(res, at - at % res)]
+            b["total"] += 1
+            b["phishing"] += int(row["label"] == 1)
+            b["prob_sum"] += prob
+            b[column] += 1
+    return [dict(b, res=res, start=start) for (res, start), b in buckets.items()]
+
+
+def add_to_rollups(session_or_conn, rows: List[Dict[str, Any]]) -> None:
+    """Fold freshly inserted prediction rows into the rollup buckets."""
+    params = rollup_params(rows)
+    if params:
+        session_or_conn.execute(_UPSERT, params)
+
+
+def backfill_rollups(conn) -> None:
+    """Rebuild all rollups from the predictions table (used when the rollup table is created)."""
+    bins = ", ".join(
+        f"SUM(CASE WHEN MIN({HISTOGRAM_BINS - 1}, MAX(0, CAST(probability * {HISTOGRAM_BINS} AS INTEGER))) = {i} "
+        f"THEN 1 ELSE 0 END)"
+        for i in range(HISTOGRAM_BINS)
+    )
+    conn.execute(text("DELETE FROM prediction_rollups"))
+    for res in RESOLUTIONS:
+        conn.execute(text(f"""
+            INSERT INTO prediction_rollups (bucket_seconds, bucket_start, total, phishing, probability_sum,
+                                            {", ".join(_BIN_COLUMNS)})
+            SELECT {res}, created_at - created_at % {res}, COUNT(*), SUM(label = 1), SUM(probability), {bins}
+            FROM predictions
+            WHERE created_at IS NOT NULL
+            GROUP BY created_at - created_at % {res}
+        """))
+
+
+def parse_window(window: Union[int, float, str]) -> int:
+    """Window length in seconds from seconds or strings like "90s", "15m", "24h", "7d"."""
+    if isinstance(window, (int, float)) and not isinstance(window, bool):
+        seconds = int(window)
+    else:
+        m = _WINDOW.match(str(window))
+        if not m:
+            raise ValueError(f"Invalid window {window!r}; use seconds or e.g. 15m, 24h, 7d")
+        seconds = int(m.group(1)) * _UNIT_SECONDS[m.group(2).lower()]
+    if seconds <= 0:
+        raise ValueError("window must be positive")
+    return seconds
+
+
+def _iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def query_stats(conn, window: Union[int, float, str] = "24h", now: Optional[float] = None) -> Dict[str, Any]:
+    """Totals, phishing rate, probability histogram and per-bucket trend for the last window."""
+    seconds = parse_window(window)
+    res = MINUTE if seconds <= MINUTE_RESOLUTION_MAX_WINDOW else HOUR
+    now = int(time.time() if now is None else now)
+    since = now - seconds
+    since -= since % res  # whole buckets: the window may start up to one bucket early
+    rows = conn.execute(
+        text(
+            "SELECT bucket_start, total, phishing, probability_sum, " + ", ".join(_BIN_COLUMNS)
+            + " FROM prediction_rollups WHERE bucket_seconds = :res AND bucket_start >= :since "
+            "ORDER BY bucket_start"
+        ),
+        {"res": res, "since": since},
+    ).fetchall()
+    total = sum(r[1] for r in rows)
+    phishing = sum(r[2] for r in rows)
+    prob_sum = sum(r[3] for r in rows)
+    return {
+        "window_seconds": seconds,
+        "resolution_seconds": res,
+        "since": _iso(since),
+        "total": total,
+        "phishing": phishing,
+        "legitimate": total - phishing,
+        "phishing_rate": round(phishing / total, 4) if total else 0.0,
+        "avg_probability": round(prob_sum / total, 4) if total else 0.0,
+        "histogram": [sum(r[4 + i] for r in rows) for i in range(HISTOGRAM_BINS)],
+        "buckets": [{"start": _iso(r[0]), "total": r[1], "phishing": r[2]} for r in rows],
+    }
@@ -0,0 +1,50 @@
+"""
+Per-mailbox UID watermarks for the mail monitor.
+
+A watermark is the highest UID already classified in one account's folder,
+valid only while the folder's UIDVALIDITY is unchanged. The monitor fetches
+UID last_uid+1:* each cycle, so its work and memory scale with new mail rather
+than with the size of the inbox, and a restart resumes where it stopped.
+"""
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+
+CREATE_WATERMARKS = """
+    CREATE TABLE IF NOT EXISTS mailbox_watermarks (
+        account TEXT NOT NULL,
+        folder TEXT NOT NULL,
+        uidvalidity INTEGER NOT NULL,
+        last_uid INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL,
+        PRIMARY KEY (account, folder)
+    ) WITHOUT ROWID
+"""
+
+_UPSERT = text(
+    "INSERT INTO mailbox_watermarks (account, folder, uidvalidity, last_uid, updated_at) "
+    "VALUES (:account, :folder, :uidvalidity, :last_uid, :at) "
+    "ON CONFLICT (account, folder) DO UPDATE SET uidvalidity = excluded.uidvalidity, "
+    "last_uid = excluded.last_uid, updated_at = excluded.updated_at"
+)
+
+
+def read_watermark(conn, account: str, folder: str) -> Optional[Tuple[int, int]]:
+    """(uidvalidity, last_uid) for the folder, or None if it was never checked."""
+    row = conn.execute(
+        text("SELECT uidvalidity, last_uid FROM mailbox_watermarks WHERE account = :account AND folder = :folder"),
+        {"account": account, "folder": folder},
+    ).first()
+    return (int(row[0]), int(row[1])) if row else None
+
+
+def write_watermark(conn, account: str, folder: str, uidvalidity: int, last_uid: int) -> None:
+    """Record the highest classified UID for the folder under this UIDVALIDITY."""
+    conn.execute(_UPSERT, {
+        "account": account,
+        "folder": folder,
+        "uidvalidity": int(uidvalidity),
+        "last_uid": int(last_uid),
+        "at": int(time.time()),
+    })
@@ -0,0 +1,171 @@
+"""
+Write-behind queue for prediction rows.
+
+Callers enqueue rows and return immediately; a background thread writes them in
+batches (one executemany per batch) when STORE_FLUSH_ROWS rows are waiting or
+STORE_FLUSH_MS after the first row of a batch arrived. Pending rows are flushed
+at interpreter exit. When the bounded queue is full, the backpressure policy
+decides what the caller does: write its rows synchronously, block, or drop them.
+"""
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BACKPRESSURE_POLICIES = ("sync", "block", "drop")
+
+
+class _FlushMarker:
+    """Queued behind pending rows; set once everything before it is written."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class WriteBehindWriter:
+    """Batches rows from many threads into few write_fn calls on one background thread."""
+
+    def __init__(
+        self,
+        write_fn: Callable[[List[Dict[str, Any]]], None],
+        max_queue_rows: int = 10000,
+        flush_rows: int = 500,
+        flush_ms: float = 200.0,
+        backpressure: str = "sync",
+        name: str = "write-behind",
+    ):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {BACKPRESSURE_POLICIES}")
+        self.write_fn = write_fn
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = max(0.0, flush_ms) / 1000.0
+        self.backpressure = backpressure
+        self.name = name
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue_rows))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()  # serializes background and synchronous writes
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "sync_writes": 0, "dropped": 0, "errors": 0}
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def submit(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Queue rows for writing; applies the backpressure policy to rows that do not fit."""
+        if not rows:
+            return
+        if self._closed:
+            self._write(list(rows), sync=True)
+            return
+        self._ensure_started()
+        for i, row in enumerate(rows):
+            try:
+                if self.backpressure == "block":
+                    self._queue.put(row)
+                else:
+                    self._queue.put_nowait(row)
+            except queue.Full:
+                rest = list(rows[i:])
+                if self.backpressure == "drop":
+                    self._count("dropped", len(rest))
+                    logger.warning("%s: queue full, dropped %d rows", self.name, len(rest))
+                else:
+                    self._write(rest, sync=True)
+                self._count("enqueued", i)
+                return
+        self._count("enqueued", len(rows))
+
+    def _write(self, batch: List[Dict[str, Any]], sync: bool = False) -> None:
+        try:
+            with self._write_lock:
+                self.write_fn(batch)
+        except Exception:
+            logger.exception("%s: failed to write %d rows", self.name, len(batch))
+            self._count("errors")
+            return
+        with self._stats_lock:
+            self._stats["written"] += len(batch)
+            self._stats["sync_writes" if sync else "batches"] += 1
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Dict[str, Any]] = []
+            markers: List[_FlushMarker] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, _FlushMarker):
+                    markers.append(item)
+                    break  # write what we have now
+                batch.append(item)
+                if len(batch) >= self.flush_rows:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.done.set()
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Block until every row queued before this call is written. Returns False on timeout."""
+        if self._thread is None:
+            return True
+        marker = _FlushMarker()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush pending rows; later submissions are written synchronously."""
+        self.flush(timeout)
+        self._closed = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        stats["backpressure"] = self.backpressure
+        return stats
+
+
+_writer: Optional[WriteBehindWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer(write_fn: Callable[[List[Dict[str, Any]]], None], **kwargs) -> WriteBehindWriter:
+    """Process-wide writer, created on first use and flushed at interpreter exit."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = WriteBehindWriter(write_fn, **kwargs)
+                atexit.register(_writer.close)
+    return _writer
+
+
+def flush_pending(timeout: Optional[float] = 10.0) -> bool:
+    """Write everything queued so far (no-op if nothing was ever queued)."""
+    return _writer.flush(timeout) if _writer is not None else True
+
+
+def get_writer_stats() -> Optional[Dict[str, Any]]:
+    return _writer.stats() if _writer is not None else None
@@ -0,0 +1,150 @@
+"""Minimal in-process IMAP server for mail tests (plain TCP, one mailbox, IDLE optional)."""
+import re
+import select
+import shlex
+import socketserver
+import threading
+import time
+
+
+class FakeImapServer:
+    """
+    Serves LOGIN, CAPABILITY, SELECT/EXAMINE, NOOP, UID SEARCH, UID FETCH, IDLE and
+    LOGOUT over folders of raw messages. add_message() pushes EXISTS to idling clients.
+    idle_timeout, if set, drops IDLE sessions older than that many seconds with BYE.
+    """
+
+    def __init__(self, idle: bool = True, idle_timeout: float = None, uidvalidity: int = 1):
+        self.idle = idle
+        self.idle_timeout = idle_timeout
+        self.uidvalidity = uidvalidity
+        self.folders = {"INBOX": [], "[Gmail]/Spam": []}  # folder -> [(uid, raw, seen)]
+        self.next_uid = 1
+        self.commands = []  # (command name, args) in arrival order
+        self.logins = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server._serve(self)
+
+        self._tcp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._tcp.daemon_threads = True
+        self.port = self._tcp.server_address[1]
+        self._thread = threading.Thread(target=self._tcp.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def add_message(self, raw: bytes, folder: str = "INBOX", seen: bool = False) -> int:
+        with self._lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.folders.setdefault(folder, []).append((uid, raw, seen))
+        return uid
+
+    def count(self, name: str) -> int:
+        return sum(1 for c, _ in self.commands if c == name)
+
+    def _serve(self, h):
+        write = h.wfile.write
+        caps = "IMAP4rev1 IDLE" if self.idle else "IMAP4rev1"
+        write(b"* OK [CAPABILITY " + caps.encode() + b"] fake ready\r\n")
+        selected = None
+        while True:
+            line = h.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.decode().rstrip("\r\n").partition(" ")
+            name, _, args = rest.partition(" ")
+            name = name.upper()
+            if name == "UID":
+                sub, _, args = args.partition(" ")
+                name = "UID " + sub.upper()
+            self.commands.append((name, args))
+            if name == "CAPABILITY":
+                write(f"* CAPABILITY {caps}\r\n{tag} OK done\r\n".encode())
+            elif name == "LOGIN":
+                self.logins += 1
+                write(f"{tag} OK logged in\r\n".encode())
+            elif name in ("SELECT", "EXAMINE"):
+                selected = shlex.split(args)[0]
+                messages = self.folders.get(selected, [])
+                write(f"* {len(messages)} EXISTS\r\n* OK [UIDVALIDITY {self.uidvalidity}] ok\r\n"
+                      f"* OK [UIDNEXT {self.next_uid}] ok\r\n"
+                      f"{tag} OK [READ-ONLY] selected\r\n".encode())
+            elif name == "NOOP":
+                write(f"* {len(self.folders.get(selected, []))} EXISTS\r\n{tag} OK done\r\n".encode())
+            elif name == "UID SEARCH":
+                write(f"* SEARCH {' '.join(str(u) for u in self._search(selected, args))}\r\n"
+                      f"{tag} OK done\r\n".encode())
+            elif name == "UID FETCH":
+                self._fetch(write, selected, args)
+                write(f"{tag} OK done\r\n".encode())
+            elif name == "IDLE":
+                if not self.idle:
+                    write(f"{tag} BAD unknown command\r\n".encode())
+                elif not self._idle(h, tag, selected):
+                    return
+            elif name == "LOGOUT":
+                write(f"* BYE bye\r\n{tag} OK done\r\n".encode())
+                return
+            else:
+                write(f"{tag} BAD unknown command\r\n".encode())
+
+    def _search(self, folder, args):
+        messages = self.folders.get(folder, [])
+        uids = [uid for uid, _, seen in messages if "UNSEEN" not in args.upper() or not seen]
+        m = re.search(r"UID (\d+):\*", args, re.IGNORECASE)
+        if m:
+            low = int(m.group(1))
+            # n:* always matches the highest UID, as real servers do
+            uids = [u for u in uids if u >= low] or ([max(uids)] if uids else [])
+        return uids
+
+    def _fetch(self, write, folder, args):
+        message_set, _, query = args.partition(" ")
+        wanted = set()
+        for part in message_set.split(","):
+            lo, _, hi = part.partition(":")
+            hi = self.next_uid if hi == "*" else int(hi or lo)
+            wanted.update(range(int(lo), hi + 1))
+        cap = re.search(r"<0\.(\d+)>", query)
+        for seq, (uid, raw, _) in enumerate(self.folders.get(folder, []), 1):
+            if uid not in wanted:
+                continue
+            header, _, text = raw.partition(b"\r\n\r\n")
+            header += b"\r\n\r\n"
+            if cap:
+                text = text[:int(cap.group(1))]
+            write(f"* {seq} FETCH (UID {uid} BODY[HEADER] {{{len(header)}}}\r\n".encode() + header
+                  + f" BODY[TEXT]<0> {{{len(text)}}}\r\n".encode() + text + b")\r\n")
+
+    def _idle(self, h, tag, folder) -> bool:
+        """Serve one IDLE until DONE; False if the session was dropped."""
+        h.wfile.write(b"+ idling\r\n")
+        started = time.monotonic()
+        announced = len(self.folders.get(folder, []))
+        while True:
+            if self.idle_timeout and time.monotonic() - started > self.idle_timeout:
+                self.dropped += 1
+                h.wfile.write(b"* BYE idle timeout\r\n")
+                return False
+            readable, _, _ = select.select([h.connection], [], [], 0.02)
+            if readable:
+                line = h.rfile.readline()
+                if not line:
+                    return False
+                h.wfile.write(f"{tag} OK idle done\r\n".encode())
+                return True
+            count = len(self.folders.get(folder, []))
+            if count != announced:
+                announced = count
+                h.wfile.write(f"* {count} EXISTS\r\n* 1 RECENT\r\n".encode())
@@ -0,0 +1,90 @@
+"""Minimal in-process SMTP server for alert tests (plain TCP, AUTH PLAIN, records messages)."""
+import socketserver
+import threading
+
+
+class FakeSmtpServer:
+    """
+    Accepts EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET, NOOP and QUIT and keeps every
+    message as (recipients, data). close_after, if set, drops each connection after
+    that many messages, as servers do with long-lived idle connections. The first
+    reject messages are refused with a 554 reply.
+    """
+
+    def __init__(self, close_after: int = None, reject: int = 0):
+        self.close_after = close_after
+        self.reject = reject
+        self.rejected = 0
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server._serve(self)
+
+        self._tcp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._tcp.daemon_threads = True
+        self.port = self._tcp.server_address[1]
+        self._thread = threading.Thread(target=self._tcp.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def _serve(self, h):
+        with self._lock:
+            self.connections += 1
+        write = h.wfile.write
+        write(b"220 fake smtp ready\r\n")
+        recipients, sent = [], 0
+        while True:
+            line = h.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                write(b"250-localhost\r\n250 AUTH PLAIN\r\n")
+            elif verb == "HELO":
+                write(b"250 localhost\r\n")
+            elif verb == "AUTH":
+                self.logins += 1
+                write(b"235 authenticated\r\n")
+            elif verb == "MAIL":
+                recipients = []
+                write(b"250 ok\r\n")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip().strip("<>"))
+                write(b"250 ok\r\n")
+            elif verb == "DATA":
+                write(b"354 go ahead\r\n")
+                data = []
+                while True:
+                    chunk = h.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    data.append(chunk)
+                with self._lock:
+                    if self.rejected < self.reject:
+                        self.rejected += 1
+                        write(b"554 transaction failed\r\n")
+                        continue
+                    self.messages.append((recipients, b"".join(data).decode("utf-8", "replace")))
+                write(b"250 queued\r\n")
+                sent += 1
+                if self.close_after and sent >= self.close_after:
+                    return
+            elif verb in ("RSET", "NOOP"):
+                write(b"250 ok\r\n")
+            elif verb == "QUIT":
+                write(b"221 bye\r\n")
+                return
+            else:
+                write(b"502 not implemented\r\n")
@@ -0,0 +1,106 @@
+"""Tests for the background SMTP alert dispatcher against a local SMTP stand-in."""
+import email
+import time
+
+from api.alert_dispatcher import AlertDispatcher, SmtpSession
+from api.alert_engine import build_alert_message
+from tests.smtp_server import FakeSmtpServer
+
+
+def _dispatcher(server, **kwargs) -> AlertDispatcher:
+    session = SmtpSession("127.0.0.1", server.port, "alerts@example.com", "pw", starttls=False, timeout=5)
+    kwargs.setdefault("digest_seconds", 0)
+    kwargs.setdefault("rate_limit", 0)
+    return AlertDispatcher(build_alert_message, "alerts@example.com", session=session, **kwargs)
+
+
+def _text(data: str) -> str:
+    """Subject and decoded body of a received alert email."""
+    msg = email.message_from_string(data)
+    part = msg.get_payload()[0]
+    return msg["Subject"] + "\n" + part.get_payload(decode=True).decode("utf-8")
+
+
+def test_burst_reuses_one_connection():
+    with FakeSmtpServer() as server:
+        dispatcher = _dispatcher(server)
+        started = time.perf_counter()
+        for i in range(20):
+            assert dispatcher.submit(f"Alert {i}", f"body {i}", "oncall@example.com")
+        assert time.perf_counter() - started < 0.5  # submit never waits on SMTP
+        assert dispatcher.flush(5)
+        dispatcher.close()
+        assert len(server.messages) == 20
+        assert server.connections == 1 and server.logins == 1
+        assert dispatcher.stats()["alerts_sent"] == 20
+
+
+def test_reconnects_after_server_drops_connection():
+    with FakeSmtpServer(close_after=2) as server:
+        dispatcher = _dispatcher(server)
+        for i in range(5):
+            dispatcher.submit(f"Alert {i}", "body", "oncall@example.com")
+        dispatcher.flush(5)
+        dispatcher.close()
+        assert len(server.messages) == 5
+        assert server.connections == 3
+        assert dispatcher.stats().get("failed", 0) == 0
+
+
+def test_digest_merges_alerts_per_recipient():
+    with FakeSmtpServer() as server:
+        dispatcher = _dispatcher(server, digest_seconds=0.3)
+        for i in range(3):
+            dispatcher.submit(f"Alert {i}", f"suspicious email {i}", "oncall@example.com")
+        dispatcher.submit("Alert x", "suspicious email x", "security@example.com")
+        time.sleep(0.1)
+        assert server.messages == []  # window still open
+        deadline = time.monotonic() + 3
+        while len(server.messages) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        dispatcher.close()
+        by_rcpt = {rcpt[0]: _text(data) for rcpt, data in server.messages}
+        assert len(server.messages) == 2
+        assert "3 unsafe emails detected" in by_rcpt["oncall@example.com"]
+        assert all(f"suspicious email {i}" in by_rcpt["oncall@example.com"] for i in range(3))
+        assert dispatcher.stats()["digests"] == 1
+
+
+def test_rate_limit_holds_and_merges_excess_alerts():
+    with FakeSmtpServer() as server:
+        dispatcher = _dispatcher(server, rate_limit=2, rate_window_seconds=0.5)
+        for i in range(6):
+            dispatcher.submit(f"Alert {i}", f"body {i}", "oncall@example.com")
+        dispatcher.flush(5)
+        assert len(server.messages) == 2  # limit reached; the rest wait for the window
+        deadline = time.monotonic() + 3
+        while len(server.messages) < 3 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        dispatcher.close()
+        assert len(server.messages) == 3
+        assert "4 unsafe emails detected" in _text(server.messages[2][1])
+        assert dispatcher.stats()["alerts_sent"] == 6 and dispatcher.stats()["rate_limited"] >= 1
+
+
+def test_failed_send_is_retried_with_backoff():
+    with FakeSmtpServer(reject=2) as server:
+        dispatcher = _dispatcher(server, rate_limit=1, send_attempts=3, retry_base_seconds=0.1)
+        dispatcher.submit("Alert 1", "body 1", "oncall@example.com")
+        deadline = time.monotonic() + 3
+        while not server.messages and time.monotonic() < deadline:
+            time.sleep(0.02)
+        dispatcher.close()
+        assert server.rejected == 2 and len(server.messages) == 1  # third attempt went through
+        stats = dispatcher.stats()
+        assert stats["alerts_sent"] == 1 and stats["retried"] == 2 and stats.get("failed", 0) == 0
+
+
+def test_alert_dropped_after_last_attempt():
+    with FakeSmtpServer(reject=10) as server:
+        dispatcher = _dispatcher(server, send_attempts=2, retry_base_seconds=0.05)
+        dispatcher.submit("Alert 1", "body 1", "oncall@example.com")
+        dispatcher.flush(5)
+        assert server.rejected == 1  # flush does not cut the retry back-off short
+        dispatcher.close()
+        assert server.rejected == 2 and server.messages == []
+        assert dispatcher.stats()["failed"] == 1
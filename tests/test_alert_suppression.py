@@ -0,0 +1,115 @@
+"""Tests for campaign fingerprints and the alert suppression index."""
+import time
+
+from api.alert_suppression import AlertSuppressor, alert_fingerprint, sender_domain
+
+
+def _campaign(recipient: str, ticket: int):
+    return (
+        f"RE: Your account #{ticket} will be suspended",
+        "Security Team <no-reply@Secure-Bank.example>",
+        f"Dear {recipient},\n\nVerify your account within 24 hours: "
+        f"https://secure-bank.example/verify?id={ticket}&utm_source=mail",
+    )
+
+
+def test_sender_domain():
+    assert sender_domain("Security Team <no-reply@Secure-Bank.example>") == "secure-bank.example"
+    assert sender_domain("alerts@example.com") == "example.com"
+    assert sender_domain("") == ""
+
+
+def test_fingerprint_matches_copies_of_one_campaign():
+    first = alert_fingerprint(*_campaign("customer", 1234))
+    assert first == alert_fingerprint(*_campaign("customer", 98765))
+    subject, sender, body = _campaign("customer", 1234)
+    assert first == alert_fingerprint(subject.replace("RE: ", ""), sender.upper(), body)
+    assert first != alert_fingerprint(subject, "no-reply@other.example", body)
+    assert first != alert_fingerprint("Invoice attached", sender, body)
+
+
+def test_repeats_suppressed_until_ttl_expires():
+    suppressor = AlertSuppressor(ttl_seconds=0.2, max_items=100, shared=False)
+    fp = alert_fingerprint(*_campaign("customer", 1))
+    assert suppressor.should_send(fp)
+    assert not suppressor.should_send(fp)
+    assert not suppressor.should_send(fp)
+    assert suppressor.should_send(alert_fingerprint("Other campaign", "x@y.example", "body"))
+    time.sleep(0.25)
+    assert suppressor.should_send(fp)
+    stats = suppressor.stats()
+    assert stats["checked"] == 5 and stats["sent"] == 3 and stats["suppressed"] == 2
+
+
+def test_shared_index_fails_open_without_redis():
+    # REDIS_URL points nowhere in tests: the local index still applies
+    suppressor = AlertSuppressor(ttl_seconds=60, max_items=100, shared=True)
+    fp = alert_fingerprint(*_campaign("customer", 1))
+    assert suppressor.should_send(fp)
+    assert not suppressor.should_send(fp)
+    assert suppressor.stats().get("suppressed_shared", 0) == 0
+
+
+def test_failed_send_releases_campaign(monkeypatch):
+    import api.alert_engine as engine
+    import api.alert_suppression as suppression
+
+    suppressor = AlertSuppressor(ttl_seconds=60, max_items=100, shared=False)
+    monkeypatch.setattr(suppression, "_suppressor", suppressor)
+    monkeypatch.setattr(engine, "ALERT_SUPPRESS_ENABLED", True)
+    monkeypatch.setattr(engine, "ALERT_DISPATCH_ASYNC", False)
+    monkeypatch.setattr(engine, "_alert_recipient", lambda to=None: "oncall@example.com")
+    outcomes = [False, True, True]
+    monkeypatch.setattr(engine, "send_alert_email", lambda subject, body: outcomes.pop(0))
+
+    copies = [_campaign("customer", ticket) for ticket in (1, 2, 3)]
+    assert not engine.notify_unsafe_email_detected(*copies[0], 0.99)  # SMTP failed
+    assert engine.notify_unsafe_email_detected(*copies[1], 0.99)  # so the next copy still alerts
+    assert not engine.notify_unsafe_email_detected(*copies[2], 0.99)  # then copies are suppressed
+    assert outcomes == [True]
+    stats = suppressor.stats()
+    assert stats["sent"] == 1 and stats["released"] == 1 and stats["suppressed"] == 1
+
+
+def test_alert_dropped_by_dispatcher_releases_campaign(monkeypatch):
+    import api.alert_dispatcher as dispatcher_module
+    import api.alert_engine as engine
+    import api.alert_suppression as suppression
+    from tests.smtp_server import FakeSmtpServer
+
+    suppressor = AlertSuppressor(ttl_seconds=60, max_items=100, shared=False)
+    monkeypatch.setattr(suppression, "_suppressor", suppressor)
+    monkeypatch.setattr(engine, "ALERT_SUPPRESS_ENABLED", True)
+    monkeypatch.setattr(engine, "ALERT_DISPATCH_ASYNC", True)
+    monkeypatch.setattr(engine, "_alert_recipient", lambda to=None: "oncall@example.com")
+    with FakeSmtpServer(reject=1) as server:
+        session = dispatcher_module.SmtpSession("127.0.0.1", server.port, "a@example.com", "pw", starttls=False)
+        dispatcher = dispatcher_module.AlertDispatcher(
+            engine.build_alert_message, "a@example.com", session=session,
+            digest_seconds=0, rate_limit=0, send_attempts=1,
+        )
+        monkeypatch.setattr(dispatcher_module, "_dispatcher", dispatcher)
+        assert engine.notify_unsafe_email_detected(*_campaign("customer", 1), 0.99)  # queued
+        dispatcher.flush(5)  # SMTP refused it and the dispatcher gave up
+        assert engine.notify_unsafe_email_detected(*_campaign("customer", 2), 0.99)  # not suppressed
+        dispatcher.close()
+        assert server.rejected == 1 and len(server.messages) == 1
+    assert suppressor.stats()["released"] == 1
+
+
+def test_shared_redis_errors_open_the_circuit(monkeypatch):
+    from storage import redis_cache
+    from storage.local_cache import CircuitBreaker
+
+    class DownRedis:
+        def set(self, *args, **kwargs):
+            raise ConnectionError("redis down")
+
+    monkeypatch.setattr(redis_cache, "_redis_client", DownRedis())
+    monkeypatch.setattr(redis_cache, "_breaker", CircuitBreaker(base_delay=60, max_delay=600))
+    suppressor = AlertSuppressor(ttl_seconds=60, max_items=100, shared=True)
+    assert suppressor.should_send(alert_fingerprint(*_campaign("customer", 1)))  # fails open
+    assert redis_cache._breaker.state == "open"
+    assert suppressor.should_send(alert_fingerprint("Other", "x@y.example", "body"))
+    stats = suppressor.stats()
+    assert stats["shared_errors"] == 1 and stats["shared_unavailable"] == 1  # second call skipped Redis
@@ -0,0 +1,79 @@
+"""Tests for the Flask API routes."""
+import pytest
+
+from api import routes
+from ml.classifier import PhishingClassifier
+from storage.redis_cache import clear_local_cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    clf = PhishingClassifier()
+    clf.fit(
+        ["meeting tomorrow at 10am", "project update attached",
+         "urgent verify your account password", "click here to claim your prize"],
+        [0, 0, 1, 1],
+    )
+    monkeypatch.setattr(routes, "_current_model", lambda: (clf, "test-version"))
+    monkeypatch.setattr(routes, "store_result", lambda *args, **kwargs: None)
+    monkeypatch.setattr(routes, "store_results", lambda *args, **kwargs: None)
+    clear_local_cache()
+    return routes.create_app().test_client()
+
+
+def test_classify_batch_matches_single(client):
+    emails = ["urgent verify your account", {"text": "meeting tomorrow"}, "urgent verify your account"]
+    resp = client.post("/classify/batch", json={"emails": emails})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["count"] == 3
+    single = client.post("/classify", json={"text": "meeting tomorrow"}).get_json()
+    assert body["results"][1]["label"] == single["label"]
+    assert body["results"][1]["phishing_probability"] == single["phishing_probability"]
+    assert body["results"][0] == body["results"][2]
+    assert body["results"][0]["model_version"] == "test-version"
+
+
+def test_classify_batch_rejects_bad_input(client):
+    assert client.post("/classify/batch", json={"emails": []}).status_code == 400
+    resp = client.post("/classify/batch", json=["", "click here"])
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert "error" in results[0]
+    assert results[1]["label"] in (0, 1)
+
+
+def test_classify_with_coalescer(client, monkeypatch):
+    monkeypatch.setattr(routes, "CLASSIFY_COALESCE_ENABLED", True)
+    monkeypatch.setattr(routes, "_coalescer", None)
+    direct = client.post("/classify/batch", json=["click here to claim your prize"]).get_json()["results"][0]
+    clear_local_cache()  # make /classify score instead of hitting the in-process tier
+    resp = client.post("/classify", json={"text": "click here to claim your prize"})
+    assert resp.status_code == 200
+    assert resp.get_json()["phishing_probability"] == direct["phishing_probability"]
+    assert client.get("/metrics").get_json()["coalescer"]["items"] >= 1
+
+
+def test_cache_keys_normalized_and_versioned(client, monkeypatch):
+    stored = []
+    monkeypatch.setattr(routes, "store_result", lambda *args, **kwargs: stored.append(kwargs["model_version"]))
+    first = "Urgent: verify your account https://bank.example/login?utm_source=mail&id=7"
+    variant = "<p>Urgent:   verify your\n account</p> https://bank.example/login?id=7&fbclid=XYZ"
+    assert client.post("/classify", json={"text": first}).status_code == 200
+    resp = client.post("/classify", json={"text": variant})
+    assert resp.status_code == 200 and stored == ["test-version"]  # second copy was a cache hit
+
+    clf, _ = routes._current_model()
+    monkeypatch.setattr(routes, "_current_model", lambda: (clf, "retrained"))
+    resp = client.post("/classify", json={"text": first})
+    assert resp.get_json()["model_version"] == "retrained"
+    assert stored == ["test-version", "retrained"]  # old verdict ignored after the model changed
+
+
+def test_stats_route(client, monkeypatch):
+    from storage.rollups import parse_window
+
+    monkeypatch.setattr(routes, "get_stats", lambda window: {"window_seconds": parse_window(window), "total": 0})
+    assert client.get("/stats?window=15m").get_json()["window_seconds"] == 900
+    assert client.get("/stats").get_json()["window_seconds"] == 86400
+    assert client.get("/stats?window=soon").status_code == 400
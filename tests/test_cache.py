@@ -0,0 +1,159 @@
+"""Tests for the two-tier cache (local LRU/TTL + Redis behind a circuit breaker)."""
+import time
+
+import pytest
+
+from storage import redis_cache
+from storage.local_cache import CircuitBreaker, LocalCache, TierStats
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("redis down")
+
+    def get(self, k):
+        self._call()
+        return self.data.get(k)
+
+    def mget(self, keys):
+        self._call()
+        return [self.data.get(k) for k in keys]
+
+    def setex(self, k, ttl, v):
+        self._call()
+        self.data[k] = v
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def setex(self, k, ttl, v):
+        self.ops.append((k, v))
+
+    def execute(self):
+        self.redis._call()  # the whole batch is one round trip
+        self.redis.data.update(self.ops)
+        return [True] * len(self.ops)
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_cache, "_redis_client", fake)
+    monkeypatch.setattr(redis_cache, "_breaker", CircuitBreaker(base_delay=60, max_delay=600))
+    monkeypatch.setattr(redis_cache, "_local", LocalCache(max_items=100, ttl_seconds=60))
+    monkeypatch.setattr(redis_cache, "_local_stats", TierStats())
+    monkeypatch.setattr(redis_cache, "_redis_stats", TierStats())
+    return fake
+
+
+def test_local_cache_lru_and_ttl():
+    cache = LocalCache(max_items=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a is now most recent
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    cache.set("d", 4, ttl_seconds=0)
+    assert cache.get("d") is None
+
+
+def test_circuit_breaker_backoff(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(base_delay=1, max_delay=4)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.state == "open"
+    now[0] += 1.01
+    assert breaker.allow()  # half-open trial
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_failure()
+    now[0] += 1.5
+    assert not breaker.allow()  # delay doubled to 2s
+    now[0] += 0.6
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_two_tier_reads_local_first(tiers):
+    redis_cache.cache_set("t", "hello", {"v": 1})
+    assert tiers.calls == 1
+    assert redis_cache.cache_get("t", "hello") == {"v": 1}
+    assert redis_cache.cache_get_many("t", ["hello"]) == [{"v": 1}]
+    assert tiers.calls == 1  # served by the local tier
+    redis_cache._local.clear()
+    assert redis_cache.cache_get_many("t", ["hello", "other"]) == [{"v": 1}, None]
+    assert redis_cache.cache_get("t", "hello") == {"v": 1}
+    assert tiers.calls == 2  # one MGET, then the local tier was refilled
+    stats = redis_cache.get_cache_stats()
+    assert stats["local"]["hits"] == 3 and stats["redis"]["hits"] >= 1
+
+
+def test_redis_outage_opens_circuit(tiers):
+    tiers.fail = True
+    assert redis_cache.cache_get("t", "x") is None
+    assert redis_cache._breaker.state == "open"
+    for _ in range(5):
+        assert redis_cache.cache_get("t", "x") is None
+        redis_cache.cache_set("t", "y", 1)
+    assert tiers.calls == 1  # no Redis calls while the circuit is open
+    assert redis_cache.cache_get("t", "y") == 1  # local tier still works
+    stats = redis_cache.get_cache_stats()["redis"]
+    assert stats["errors"] == 1 and stats["skipped"] == 5
+
+
+def test_corrupt_redis_value_is_a_miss(tiers):
+    redis_cache.cache_set("t", "good", {"v": 1})
+    tiers.data[redis_cache._key("t", "bad")] = b"\xff not json"
+    redis_cache._local.clear()
+    assert redis_cache.cache_get("t", "bad") is None
+    assert redis_cache.cache_get_many("t", ["bad", "good"]) == [None, {"v": 1}]
+    stats = redis_cache.get_cache_stats()["redis"]
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["errors"] == 0
+
+
+def test_get_cache_does_not_close_the_circuit(tiers):
+    tiers.fail = True
+    assert redis_cache.cache_get("t", "x") is None
+    assert redis_cache._breaker.state == "open"
+    redis_cache._breaker._open_until = 0  # back-off over: one probe allowed
+    assert redis_cache.get_cache() is tiers
+    assert redis_cache._breaker.state != "closed"  # handing out the client proves nothing
+    redis_cache.record_redis_result(False)
+    assert redis_cache._breaker.state == "open"
+    redis_cache._breaker._open_until = 0
+    redis_cache.record_redis_result(True)
+    assert redis_cache._breaker.state == "closed"
+
+
+def test_bulk_set_is_one_round_trip(tiers):
+    items = [(f"email {i}", {"label": i % 2, "phishing_probability": 0.5}) for i in range(50)]
+    redis_cache.cache_set_many("t", items)
+    assert tiers.calls == 1 and len(tiers.data) == 50
+    redis_cache._local.clear()
+    assert redis_cache.cache_get_many("t", [raw for raw, _ in items]) == [v for _, v in items]
+    assert tiers.calls == 2
+
+
+def test_serializers_round_trip(monkeypatch):
+    value = {"label": 1, "label_name": "phishing", "phishing_probability": 0.9731, "model_version": "abc"}
+    assert redis_cache._loads(redis_cache._dumps(value)) == value
+    msgpack = pytest.importorskip("msgpack")
+    monkeypatch.setattr(redis_cache, "CACHE_SERIALIZER", "msgpack")
+    packed = redis_cache._dumps(value)
+    assert packed.startswith(b"M") and redis_cache._loads(packed) == value
+    assert redis_cache._loads(b'{"label": 0}') == {"label": 0}  # JSON entries still readable
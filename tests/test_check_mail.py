@@ -60,3 +60,29 @@ def test_notify_unsafe_email_detected_no_credentials():
     """Without SMTP credentials, send returns False (no exception)."""
     sent = notify_unsafe_email_detected("Test", "from@x.com", "preview", 0.95)
     assert sent is False or sent is True  # depends on env
+
+
+@pytest.mark.parametrize("write_behind, store_stage", [(False, "store"), (True, "enqueue")])
+def test_check_batches_store_then_alerts(monkeypatch, write_behind, store_stage):
+    """One bulk insert for the batch, alerts afterwards, timings in the summary."""
+    from ml.classifier import PhishingClassifier
+
+    clf = PhishingClassifier()
+    clf.fit(["meeting tomorrow at 10am", "urgent verify your account password"], [0, 1])
+    calls = []
+    monkeypatch.setattr("mail.checker.store_results", lambda rows, model_version=None: calls.append(("store", len(rows))))
+    monkeypatch.setattr("mail.checker.should_alert", lambda prob: True)
+    monkeypatch.setattr("mail.checker.STORE_WRITE_BEHIND", write_behind)
+    monkeypatch.setattr("mail.checker.notify_unsafe_email_detected", lambda *args: calls.append(("alert", args[0])) or True)
+    emails = [
+        FetchedEmail(subject=s, body=b, sender="x@example.com", raw_text=f"{s}\n\n{b}")
+        for s, b in [("Urgent", "verify your account password"), ("Lunch", "meeting tomorrow at 10am"),
+                     ("Action needed", "urgent verify your account password")]
+    ]
+    summary = check_inbox_and_alert(emails=emails, send_alert=True, classifier=clf, model_version="v")
+    total, phishing, results = summary
+    assert (total, phishing) == (3, 2) and summary.results is results
+    assert calls == [("store", 3), ("alert", "Urgent"), ("alert", "Action needed")]
+    assert [r.get("alert_sent") for r in results] == [True, None, True]
+    assert set(summary.timings) == {"fetch", "score", store_stage, "alert", "total"}
+    assert summary.timings["total"] >= summary.timings["score"] >= 0
@@ -47,3 +47,43 @@ def test_classifier_load_and_predict():
         out = clf2.predict_single("Hello, meeting at 10am")
     assert out[0] in (0, 1)
     assert 0 <= out[1] <= 1
+
+
+def test_score_matches_pipeline_predict_proba():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "train.csv")
+        df = generate_synthetic_dataset(n_samples=60, output_path=data_path)
+        clf = PhishingClassifier(model_path=os.path.join(tmp, "model.joblib"))
+        clf.fit(df["text"].tolist(), df["label"].tolist())
+
+        texts = ["Urgent verify your account now", "Hello, meeting at 10am", "<b>Click here</b> to win"]
+        labels, probs = clf.score(texts)
+        X_clean = clf._prepare(texts)
+        assert labels == clf.pipeline.predict(X_clean).tolist()
+        expected = clf.pipeline.predict_proba(X_clean)[:, 1]
+        assert probs == pytest.approx(expected.tolist(), abs=1e-12)
+        assert clf.score([]) == ([], [])
+
+
+def test_streaming_classifier_fit_save_load():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        data_path = os.path.join(tmp, "train.csv")
+        df = generate_synthetic_dataset(n_samples=200, output_path=data_path)
+        X, y = df["text"].tolist(), df["label"].tolist()
+
+        clf = PhishingClassifier(model_path=path, streaming=True)
+        clf.fit_streaming((X[i:i + 50], y[i:i + 50]) for i in range(0, len(X), 50))
+        clf.save()
+
+        clf2 = PhishingClassifier(model_path=path)
+        clf2.load()
+        assert clf2.streaming
+        labels, probs = clf2.score(X[:20])
+        assert labels == clf.score(X[:20])[0]
+        assert all(0 <= p <= 1 for p in probs)
+        accuracy = sum(int(a == b) for a, b in zip(clf2.predict(X), y)) / len(y)
+        assert accuracy > 0.9
+
+    with pytest.raises(RuntimeError):
+        PhishingClassifier().partial_fit(["x"], [0])
@@ -0,0 +1,44 @@
+"""Tests for the micro-batching request coalescer."""
+import threading
+
+import pytest
+
+from api.coalescer import RequestCoalescer
+
+
+def test_coalescer_batches_concurrent_calls():
+    started = threading.Event()
+    release = threading.Event()
+    batches = []
+
+    def batch_fn(items):
+        if not started.is_set():
+            # Hold the first batch so the remaining submissions queue up behind it
+            started.set()
+            release.wait(2)
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    co = RequestCoalescer(batch_fn, max_batch_size=8, max_wait_ms=50)
+    first = co.submit(0)
+    assert started.wait(2)
+    futures = [co.submit(i) for i in range(1, 11)]
+    release.set()
+
+    assert first.result(2) == 0
+    assert [f.result(2) for f in futures] == [i * 2 for i in range(1, 11)]
+    assert max(len(b) for b in batches) == 8
+    stats = co.stats()
+    assert stats["items"] == 11
+    assert stats["batches"] == len(batches)
+    assert stats["batch_size_max"] == 8
+
+
+def test_coalescer_propagates_errors():
+    def batch_fn(items):
+        raise ValueError("boom")
+
+    co = RequestCoalescer(batch_fn, max_batch_size=4, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        co("x", timeout=2)
+    assert co.stats()["errors"] == 1
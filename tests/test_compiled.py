@@ -0,0 +1,52 @@
+"""Tests for the sklearn-free compiled scorer."""
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+from capture.data_generator import generate_synthetic_dataset
+from ml.classifier import PhishingClassifier
+from ml.compiled import CompiledScorer, export_compiled, load_scorer
+
+
+def _trained(tmp, streaming=False):
+    df = generate_synthetic_dataset(n_samples=120, output_path=os.path.join(tmp, "train.csv"))
+    clf = PhishingClassifier(model_path=os.path.join(tmp, "model.joblib"), streaming=streaming)
+    clf.fit(df["text"].tolist(), df["label"].tolist())
+    clf.save()
+    return clf, df["text"].tolist()
+
+
+def test_compiled_scorer_matches_classifier():
+    with tempfile.TemporaryDirectory() as tmp:
+        clf, texts = _trained(tmp)
+        path = export_compiled(clf, os.path.join(tmp, "model.npz"))
+        scorer = CompiledScorer(path).load()
+        # Shared read-only pages across forked workers, vocabulary included
+        for array in (scorer.terms, scorer.term_index, scorer.idf, scorer.coef):
+            assert isinstance(array, np.memmap) and not array.flags.writeable
+
+        texts = texts[:20] + ["", "Café <b>URGENT</b> verify!!", "unknown words only zzz"]
+        labels, probs = scorer.score(texts)
+        expected_labels, expected_probs = clf.score(texts)
+        assert labels == expected_labels
+        assert probs == pytest.approx(expected_probs, abs=1e-12)
+
+        # load_scorer prefers the compiled artifact when it is not older than the model
+        assert isinstance(load_scorer(clf.model_path, path), CompiledScorer)
+
+
+def test_export_rejects_streaming_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        clf, _ = _trained(tmp, streaming=True)
+        with pytest.raises(ValueError):
+            export_compiled(clf, os.path.join(tmp, "model.npz"))
+
+
+def test_compiled_import_does_not_load_sklearn():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import sys, ml.compiled; sys.exit('sklearn' in sys.modules)"
+    assert subprocess.call([sys.executable, "-c", code], cwd=root) == 0
@@ -0,0 +1,98 @@
+"""Tests for the predictions schema (storage)."""
+import sqlite3
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from storage import database
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    path = tmp_path / "emails.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE predictions (id INTEGER PRIMARY KEY AUTOINCREMENT, email_text_preview TEXT, "
+        "label INTEGER, probability REAL, created_at TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO predictions (email_text_preview, label, probability, created_at) VALUES (?, ?, ?, ?)",
+        [("old one", 0, 0.1, "2026-02-21T05:12:01.681846"), ("old two", 1, 0.9, "2026-02-21T16:52:01")],
+    )
+    conn.commit()
+    conn.close()
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(database, "_engine", engine)
+    monkeypatch.setattr(database, "_Session", None)
+    monkeypatch.setattr(database, "_db_ready", False)
+    monkeypatch.setattr(database, "STORE_WRITE_BEHIND", False)
+    return path
+
+
+def test_migrates_text_timestamps_to_epoch(legacy_db):
+    database.init_db()
+    conn = sqlite3.connect(legacy_db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+    assert conn.execute("SELECT DISTINCT typeof(created_at) FROM predictions").fetchall() == [("integer",)]
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(predictions)")}
+    assert {"idx_predictions_created_at", "idx_predictions_label"} <= indexes
+    conn.close()
+
+    database.store_result("new one", 1, 0.8, model_version="v2")
+    rows = database.get_recent_results(limit=10)
+    assert [r["email_text_preview"] for r in rows] == ["new one", "old two", "old one"]
+    assert rows[1]["created_at"] == "2026-02-21T16:52:01"
+    assert rows[2]["created_at"] == "2026-02-21T05:12:01"
+    assert rows[0]["model_version"] == "v2" and rows[1]["model_version"] is None
+
+    database.init_db()  # idempotent once migrated
+    assert len(database.get_recent_results(limit=10)) == 3
+
+
+def test_rollups_backfilled_and_updated_on_insert(legacy_db):
+    from storage.rollups import query_stats
+
+    database.init_db()  # backfills the two legacy rows
+    database.store_results(
+        [("a", 1, 0.95), ("b", 0, 0.05), ("c", 1, 0.72)], model_version="v2"
+    )
+    with database.get_engine().connect() as conn:
+        raw = conn.execute(database.text("SELECT COUNT(*), SUM(label = 1) FROM predictions")).fetchone()
+        everything = query_stats(conn, "3650d")
+        recent = query_stats(conn, "15m")
+        # Incremental updates agree with a rebuild from raw rows
+        before = conn.execute(database.text("SELECT * FROM prediction_rollups ORDER BY 1, 2")).fetchall()
+        database.backfill_rollups(conn)
+        after = conn.execute(database.text("SELECT * FROM prediction_rollups ORDER BY 1, 2")).fetchall()
+    assert (everything["total"], everything["phishing"]) == tuple(raw) == (5, 3)
+    assert everything["resolution_seconds"] == 3600
+    assert (recent["total"], recent["phishing"], recent["resolution_seconds"]) == (3, 2, 60)
+    assert recent["histogram"][9] == 1 and recent["histogram"][7] == 1 and recent["histogram"][0] == 1
+    assert sum(b["total"] for b in recent["buckets"]) == 3
+    assert [tuple(r) for r in before] == [tuple(r) for r in after]
+    with pytest.raises(ValueError):
+        database.get_stats("yesterday")
+
+
+def test_reads_do_not_wait_for_queued_writes(legacy_db, monkeypatch):
+    from storage import write_behind
+
+    database.init_db()
+    release = threading.Event()
+
+    def slow_write(rows):
+        release.wait(timeout=10)
+        database._insert_predictions(rows)
+
+    monkeypatch.setattr(database, "STORE_WRITE_BEHIND", True)
+    monkeypatch.setattr(write_behind, "_writer", write_behind.WriteBehindWriter(slow_write, flush_ms=0))
+    database.store_result("queued", 1, 0.9)
+    start = time.monotonic()
+    assert [r["email_text_preview"] for r in database.get_recent_results(limit=10)] == ["old two", "old one"]
+    assert database.get_stats("3650d")["total"] == 2
+    assert time.monotonic() - start < 2
+    release.set()
+    assert database.flush_results(timeout=5)
+    assert database.get_recent_results(limit=1)[0]["email_text_preview"] == "queued"
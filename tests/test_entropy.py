@@ -0,0 +1,84 @@
+"""Tests for entropy (detection)."""
+import base64
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from detection.entropy import (
+    SlidingWindowEntropy,
+    byte_entropy,
+    byte_entropy_batch,
+    high_entropy_segments,
+    shannon_entropy,
+    word_entropy,
+)
+
+NORMAL = (
+    "Dear customer, we noticed unusual activity on your account. Please review the recent "
+    "transactions and contact our support team if you have any questions about this message. "
+)
+
+
+def _counter_entropy(symbols):
+    counts = Counter(symbols)
+    n = len(symbols)
+    return -sum((c / n) * math.log2(c / n) for c in counts.values()) if n else 0.0
+
+
+def test_entropy_matches_counter_version():
+    rng = random.Random(3)
+    alphabet = "abcXYZ019 .,é中\U0001f600"
+    for _ in range(50):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 300)))
+        assert shannon_entropy(text) == pytest.approx(_counter_entropy(text.strip()))
+        assert byte_entropy(text) == pytest.approx(_counter_entropy(text.encode("utf-8")))
+        assert word_entropy(text) == pytest.approx(_counter_entropy(text.split()))
+    assert shannon_entropy("") == 0.0 and shannon_entropy(None) == 0.0
+    assert byte_entropy(b"\x00\x01" * 8) == pytest.approx(1.0)
+
+
+def test_lone_surrogates_do_not_raise():
+    text = "hello \ud800 world \udcff"  # e.g. JSON "\ud800" or surrogateescape-decoded bytes
+    assert shannon_entropy(text) == pytest.approx(_counter_entropy(text))
+    assert byte_entropy(text) > 0 and byte_entropy_batch([text]) == pytest.approx([byte_entropy(text)])
+    assert high_entropy_segments(text * 10, window=16, threshold=8.0) == []
+
+
+def test_byte_entropy_batch():
+    docs = [NORMAL, "", "aaaa", b"\x00\xff", "café"]
+    assert byte_entropy_batch(docs) == pytest.approx([byte_entropy(d) for d in docs])
+    assert byte_entropy_batch([]) == []
+
+
+def test_sliding_window_finds_embedded_blob():
+    blob = base64.b64encode(random.Random(1).randbytes(300)).decode()
+    text = NORMAL * 12 + blob + NORMAL * 12
+    start = len(NORMAL) * 12
+    segments = high_entropy_segments(text)
+    assert len(segments) == 1
+    seg_start, seg_end, peak = segments[0]
+    assert seg_start < start + 64 and seg_end > start + len(blob) - 64
+    assert seg_start > start - 64 and seg_end < start + len(blob) + 64
+    assert peak > 5.0
+    assert high_entropy_segments(NORMAL * 20) == []
+
+
+def test_sliding_window_streaming_and_exact():
+    rng = random.Random(5)
+    data = bytes(rng.choice(b"abcdefgh") for _ in range(500)) + rng.randbytes(200) + b"x" * 300
+    window = 32
+    one_shot = high_entropy_segments(data, window=window, threshold=4.5)
+    scanner = SlidingWindowEntropy(window=window, threshold=4.5)
+    streamed = []
+    for i in range(0, len(data), 7):
+        streamed += scanner.feed(data[i:i + 7])
+    streamed += scanner.close()
+    assert streamed == one_shot
+    # Running entropy equals a fresh histogram of the last window
+    assert scanner.max_entropy == pytest.approx(
+        max(byte_entropy(data[i:i + window]) for i in range(len(data) - window + 1))
+    )
+    with pytest.raises(ValueError):
+        SlidingWindowEntropy(window=1)
@@ -0,0 +1,56 @@
+"""Tests for header indexing, header analysis and email parsing."""
+from capture.email_parser import parse_email
+from detection.header_analysis import analyze_headers
+from detection.header_index import parse_headers
+
+RAW = (
+    "Received: from mx1.example.net by mx.example.com\r\n"
+    "\tfor <user@example.com>; Mon, 1 Jan 2024 10:00:00 +0000\r\n"
+    "Received: from relay.bad.tk by mx1.example.net\r\n"
+    "Return-Path: <bounce@bad.tk>\r\n"
+    "Authentication-Results: mx.example.com; spf=fail smtp.mailfrom=bad.tk\r\n"
+    "Message-ID: <abc123@bad.tk>\r\n"
+    "from: \"Bank\" <Support@Bank.com>\r\n"
+    "Reply-To: collect@bad.tk\r\n"
+    "Subject: Urgent:\r\n"
+    "  verify your account\r\n"
+    "\r\n"
+    "Hello,\r\nFrom: someone-in-body@example.org\r\nSubject: not a header\r\n"
+)
+
+
+def test_parse_headers_index():
+    headers = parse_headers(RAW)
+    assert headers.get("FROM") == '"Bank" <Support@Bank.com>'
+    assert headers.get("subject") == "Urgent: verify your account"
+    assert headers.received == [
+        "from mx1.example.net by mx.example.com for <user@example.com>; Mon, 1 Jan 2024 10:00:00 +0000",
+        "from relay.bad.tk by mx1.example.net",
+    ]
+    assert headers.return_path == "<bounce@bad.tk>"
+    assert headers.message_id == "<abc123@bad.tk>"
+    assert headers.authentication_results == ["mx.example.com; spf=fail smtp.mailfrom=bad.tk"]
+    # The body is not part of the index
+    assert headers.get_all("From") == ['"Bank" <Support@Bank.com>']
+    assert RAW[headers.body_offset:].startswith("Hello,")
+
+
+def test_analyze_headers_and_parse_email_share_index():
+    parsed = parse_email(RAW)
+    assert parsed.subject == "Urgent: verify your account"
+    assert parsed.sender == '"Bank" <Support@Bank.com>'
+    assert parsed.body.startswith("Hello,")
+    out = analyze_headers(parsed.raw, parsed.headers)
+    assert out == analyze_headers(RAW)
+    assert out["from_email"] == "support@bank.com"
+    assert out["from_reply_mismatch"] is True
+    assert out["received_hops"] == 2
+
+
+def test_parse_email_plain_text():
+    parsed = parse_email("Just a note without headers\n\nSecond paragraph")
+    assert parsed.subject == ""
+    assert parsed.sender == ""
+    assert parsed.body == "Second paragraph"
+    parsed = parse_email("Subject: Hi\nFrom: a@b.com")
+    assert (parsed.subject, parsed.sender, parsed.body) == ("Hi", "a@b.com", "Subject: Hi\nFrom: a@b.com")
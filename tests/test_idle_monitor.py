@@ -0,0 +1,95 @@
+"""Tests for the IDLE session and folder watcher against a local fake IMAP server."""
+import threading
+import time
+
+import pytest
+
+from mail import auto_monitor
+from mail.session import ImapSession, has_new_mail
+from tests.imap_server import FakeImapServer
+
+
+def _raw(subject: str) -> bytes:
+    return f"From: a@example.com\r\nSubject: {subject}\r\n\r\nbody of {subject}\r\n".encode()
+
+
+def _session(server) -> ImapSession:
+    return ImapSession("127.0.0.1", server.port, "user", "pw", use_ssl=False, timeout=5).connect()
+
+
+def _watch(session, checks, **kwargs):
+    stop = threading.Event()
+
+    def on_change(s, folder):
+        checks.append(len(auto_monitor.search_uids(s.conn, "UNSEEN")))
+
+    t = threading.Thread(target=auto_monitor.watch_folder, args=(session, "INBOX", on_change, stop),
+                         kwargs=kwargs, daemon=True)
+    t.start()
+    return stop, t
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_idle_returns_on_new_mail():
+    with FakeImapServer() as server:
+        session = _session(server)
+        assert session.supports_idle
+        session.select("INBOX")
+        threading.Timer(0.2, server.add_message, args=(_raw("hello"),)).start()
+        started = time.monotonic()
+        events = session.idle(timeout=10)
+        assert has_new_mail(events) and time.monotonic() - started < 2
+        assert session.idle(timeout=0.1) == []  # times out cleanly with nothing new
+        session.close()
+
+
+def test_watch_folder_reacts_within_seconds_and_renews_idle():
+    with FakeImapServer(idle_timeout=0.6) as server:
+        server.add_message(_raw("old"))
+        session = _session(server)
+        checks = []
+        stop, t = _watch(session, checks, idle=True, renew_seconds=0.25)
+        assert _wait_for(lambda: checks == [1])
+        time.sleep(1.0)  # several renewals; the server would drop an IDLE older than 0.6s
+        server.add_message(_raw("new"))
+        assert _wait_for(lambda: checks == [1, 2], timeout=2)
+        stop.set()
+        t.join(timeout=3)
+        assert not t.is_alive()
+        assert server.dropped == 0 and server.count("IDLE") >= 4
+        assert server.logins == 1 and server.count("EXAMINE") == 1
+        session.close()
+
+
+def test_watch_folder_polls_without_idle():
+    with FakeImapServer(idle=False) as server:
+        session = _session(server)
+        assert not session.supports_idle
+        checks = []
+        stop, t = _watch(session, checks, poll_interval=0.1)
+        assert _wait_for(lambda: len(checks) >= 2)
+        server.add_message(_raw("new"))
+        assert _wait_for(lambda: checks[-1] == 1)
+        stop.set()
+        t.join(timeout=3)
+        assert server.count("IDLE") == 0 and server.count("NOOP") >= 1
+        assert server.logins == 1
+        session.close()
+
+
+def test_idle_raises_when_server_drops_session():
+    import imaplib
+
+    with FakeImapServer(idle_timeout=0.1) as server:
+        session = _session(server)
+        session.select("INBOX")
+        with pytest.raises(imaplib.IMAP4.abort):
+            session.idle(timeout=2)
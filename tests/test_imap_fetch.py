@@ -0,0 +1,98 @@
+"""Tests for batched UID fetching with partial bodies."""
+import base64
+
+from mail.imap_client import build_email, fetch_uids, parse_fetch_response, uid_ranges
+
+
+def _message(uid: int) -> bytes:
+    attachment = base64.encodebytes(b"\x00" * 30000)
+    return (
+        f"From: sender{uid}@example.com\r\n"
+        f"Subject: =?utf-8?q?Invoice_=E2=84=96{uid}?=\r\n"
+        "MIME-Version: 1.0\r\n"
+        'Content-Type: multipart/mixed; boundary="XYZ"\r\n'
+        "\r\n"
+        "--XYZ\r\n"
+        "Content-Type: text/plain; charset=utf-8\r\n"
+        "\r\n"
+        f"Please verify your account {uid}.\r\n"
+        "--XYZ\r\n"
+        "Content-Type: application/octet-stream\r\n"
+        "Content-Transfer-Encoding: base64\r\n"
+        "\r\n"
+    ).encode() + attachment + b"--XYZ--\r\n"
+
+
+class FakeImap:
+    """Answers UID FETCH the way imaplib returns it: literal tuples and trailing bytes."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.commands = []
+        self.bytes_sent = 0
+
+    def uid(self, command, *args):
+        self.commands.append((command,) + args)
+        message_set, query = args
+        cap = int(query.rsplit(".", 1)[1].rstrip(">)"))
+        uids = []
+        for part in message_set.split(","):
+            lo, _, hi = part.partition(":")
+            uids.extend(range(int(lo), int(hi or lo) + 1))
+        data = []
+        for seq, uid in enumerate(uids, 1):
+            if uid not in self.messages:
+                continue
+            raw = self.messages[uid]
+            header, _, text = raw.partition(b"\r\n\r\n")
+            header += b"\r\n\r\n"
+            text = text[:cap]
+            self.bytes_sent += len(header) + len(text)
+            data.append((f"{seq} (BODY[HEADER] {{{len(header)}}}".encode(), header))
+            data.append((f" BODY[TEXT]<0> {{{len(text)}}}".encode(), text))
+            data.append(f" UID {uid})".encode())
+        data.append(b"7 (FLAGS (\\Seen))")  # unsolicited update, no bodies
+        return "OK", data
+
+
+def test_uid_ranges():
+    assert uid_ranges([8, 1, 2, 3, 5, 7, 3]) == "1:3,5,7:8"
+    assert uid_ranges([42]) == "42"
+    assert uid_ranges([]) == ""
+
+
+def test_fetch_uids_batches_and_caps_body():
+    messages = {uid: _message(uid) for uid in range(100, 120)}
+    conn = FakeImap(messages)
+    uids = list(range(119, 99, -1))
+    emails = fetch_uids(conn, uids, folder="INBOX", body_bytes=2048, batch_size=50)
+    assert len(conn.commands) == 1
+    assert conn.commands[0][1] == "100:119"
+    assert "BODY.PEEK[TEXT]<0.2048>" in conn.commands[0][2]
+    assert [e.uid for e in emails] == uids
+    assert conn.bytes_sent < 20 * 2600 < sum(len(m) for m in messages.values())
+    first = emails[0]
+    assert first.subject == "Invoice №119"
+    assert first.sender == "sender119@example.com"
+    assert first.body == "Please verify your account 119."
+    assert first.folder == "INBOX"
+    assert first.raw_text.startswith("Invoice №119\n\nPlease verify")
+
+    conn = FakeImap(messages)
+    assert len(fetch_uids(conn, uids, body_bytes=2048, batch_size=8)) == 20
+    assert len(conn.commands) == 3
+
+
+def test_parse_fetch_response_uid_first_and_missing_text():
+    data = [
+        (b"3 (UID 9 BODY[HEADER] {22}", b"Subject: hi\r\nFrom: a\r\n"),
+        (b" BODY[TEXT]<0> {5}", b"hello"),
+        b")",
+        b"4 (UID 10 BODY[HEADER] NIL BODY[TEXT]<0> NIL)",
+        (b"5 (UID 11 BODY[HEADER] {12}", b"Subject: x\r\n"),
+        b" BODY[TEXT]<0> \"\")",
+    ]
+    parsed = list(parse_fetch_response(data))
+    assert [(uid, text) for uid, _, text in parsed] == [(9, b"hello"), (11, b"")]
+    mail = build_email(parsed[0][1], parsed[0][2], uid=9)
+    assert (mail.subject, mail.body) == ("hi", "hello")
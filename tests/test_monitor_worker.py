@@ -0,0 +1,102 @@
+"""Tests for the long-lived monitor worker (session reuse, reconnects, injected model)."""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from mail import auto_monitor
+from mail.session import ImapSession
+from ml.classifier import PhishingClassifier
+from storage import database
+from tests.imap_server import FakeImapServer
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'emails.db'}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(database, "_engine", engine)
+    monkeypatch.setattr(database, "_Session", None)
+    monkeypatch.setattr(database, "_db_ready", False)
+    monkeypatch.setattr(database, "STORE_WRITE_BEHIND", False)
+    monkeypatch.setattr(auto_monitor, "EMAIL_ALERTS_ENABLED", False)
+
+    def no_registry():
+        raise AssertionError("the worker should use the injected classifier")
+
+    monkeypatch.setattr(auto_monitor, "get_registry", no_registry)
+    monkeypatch.setattr("mail.checker.MODEL_PATH", str(tmp_path / "missing.joblib"))
+    return tmp_path
+
+
+@pytest.fixture
+def classifier():
+    clf = PhishingClassifier()
+    clf.fit(["meeting tomorrow at 10am", "urgent verify your account password"], [0, 1])
+    return clf
+
+
+def _raw(subject: str) -> bytes:
+    return f"From: a@example.com\r\nSubject: {subject}\r\n\r\nplease {subject}\r\n".encode()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _start(server, classifier, **kwargs):
+    worker = auto_monitor.MonitorWorker(
+        "INBOX",
+        classifier=classifier,
+        model_version="pinned",
+        session_factory=lambda: ImapSession("127.0.0.1", server.port, "u@example.com", "pw", use_ssl=False, timeout=2),
+        reconnect_base_delay=0.05,
+        **kwargs,
+    )
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    return worker, thread
+
+
+def test_worker_reuses_session_and_model(db, classifier):
+    with FakeImapServer() as server:
+        worker, thread = _start(server, classifier, idle=True, renew_seconds=5)
+        assert _wait_for(lambda: worker.stats()["checks"] == 1)
+        for i in range(3):
+            server.add_message(_raw(f"verify your account {i}"))
+            assert _wait_for(lambda: worker.stats()["new_emails"] == i + 1)
+        worker.stop.set()
+        thread.join(timeout=3)
+        assert worker.stats()["checks"] == 4 and worker.stats()["connects"] == 1
+        assert server.logins == 1 and server.count("EXAMINE") == 1
+        versions = {r["model_version"] for r in database.get_recent_results()}
+        assert versions == {"pinned"}
+
+
+def test_worker_reconnects_after_drop(db, classifier):
+    with FakeImapServer(idle_timeout=0.3) as server:
+        worker, thread = _start(server, classifier, idle=True, renew_seconds=10)
+        assert _wait_for(lambda: server.dropped >= 1 and worker.stats()["connects"] >= 2)
+        server.idle_timeout = None
+        server.add_message(_raw("verify your account"))
+        assert _wait_for(lambda: worker.stats()["new_emails"] == 1)
+        worker.stop.set()
+        thread.join(timeout=3)
+        assert not thread.is_alive()
+        assert worker.stats()["errors"] >= 1 and server.logins == worker.stats()["connects"]
+
+
+def test_checker_accepts_injected_classifier(db, classifier):
+    from mail.checker import check_inbox_and_alert
+    from mail.imap_client import FetchedEmail
+
+    em = FetchedEmail("Urgent", "verify your account password", "x@example.com", "Urgent verify your account password")
+    total, _, results = check_inbox_and_alert(emails=[em], send_alert=False, classifier=classifier, model_version="v")
+    assert total == 1 and results[0]["label"] in (0, 1)
+    # Without injection the missing model file still short-circuits
+    assert check_inbox_and_alert(emails=[em], send_alert=False) == (0, 0, [])
@@ -0,0 +1,95 @@
+"""Tests for the concurrent multi-account mail monitor."""
+import asyncio
+import json
+import time
+from contextlib import ExitStack
+
+import pytest
+from sqlalchemy import create_engine
+
+from mail import multi_monitor
+from mail.multi_monitor import MailAccount, MultiAccountMonitor, load_accounts
+from ml.classifier import PhishingClassifier
+from storage import database
+from tests.imap_server import FakeImapServer
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'emails.db'}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(database, "_engine", engine)
+    monkeypatch.setattr(database, "_Session", None)
+    monkeypatch.setattr(database, "_db_ready", False)
+    monkeypatch.setattr(database, "STORE_WRITE_BEHIND", False)
+    return tmp_path
+
+
+def test_load_accounts(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHARED_BOX_PASSWORD", "from-env")
+    path = tmp_path / "accounts.json"
+    path.write_text(json.dumps({
+        "defaults": {"host": "imap.example.com", "interval": 30, "folders": ["INBOX"]},
+        "accounts": [
+            {"user": "support@example.com", "password_env": "SHARED_BOX_PASSWORD"},
+            {"name": "billing", "user": "billing@example.com", "password": "pw",
+             "folders": {"INBOX": 10, "Junk": 300}},
+        ],
+    }))
+    support, billing = load_accounts(str(path))
+    assert (support.name, support.password, support.host, support.folders) == (
+        "support@example.com", "from-env", "imap.example.com", {"INBOX": 30.0})
+    assert billing.folders == {"INBOX": 10.0, "Junk": 300.0}
+
+    path.write_text(json.dumps({"accounts": [{"password": "pw"}]}))
+    with pytest.raises(ValueError):
+        load_accounts(str(path))
+
+
+def test_monitors_accounts_concurrently_with_shared_scoring(db):
+    clf = PhishingClassifier()
+    clf.fit(["meeting tomorrow at 10am", "urgent verify your account password"], [0, 1])
+    with ExitStack() as stack:
+        servers = [stack.enter_context(FakeImapServer()) for _ in range(4)]
+        for i, server in enumerate(servers):
+            for j in range(2):
+                server.add_message(f"Subject: mail {j} for box {i}\r\n\r\nverify your account\r\n".encode())
+        accounts = [
+            MailAccount(f"box{i}", f"box{i}@example.com", "pw", "127.0.0.1", s.port, use_ssl=False,
+                        folders={"INBOX": 0.1})
+            for i, s in enumerate(servers)
+        ]
+        monitor = MultiAccountMonitor(accounts, max_concurrency=2, classifier=clf, model_version="v",
+                                      send_alert=False, batch_wait_ms=100, jitter=False)
+
+        async def scenario():
+            stop = asyncio.Event()
+            task = asyncio.create_task(monitor.run(stop))
+            deadline = time.monotonic() + 5
+            while monitor.stats().get("new_emails", 0) < 8 and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+            servers[0].add_message(b"Subject: late\r\n\r\nhello\r\n")
+            while monitor.stats().get("new_emails", 0) < 9 and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+            stop.set()
+            await asyncio.wait_for(task, timeout=3)
+
+        asyncio.run(scenario())
+
+    stats = monitor.stats()
+    assert stats["new_emails"] == 9
+    assert stats["max_active"] <= 2
+    assert stats["scorer"]["batches"] < 5  # first 8 emails from 4 mailboxes in shared batches
+    assert [s.logins for s in servers] == [1, 1, 1, 1]
+    assert database.get_watermark("box0@example.com", "INBOX") == (1, 3)
+    assert len(database.get_recent_results(limit=20)) == 9
+
+
+def test_watermark_moves_only_after_results_flush(db, monkeypatch):
+    account = MailAccount("box", "box@example.com", "pw", "127.0.0.1", 1, use_ssl=False)
+    monitor = MultiAccountMonitor([account], classifier=PhishingClassifier(), model_version="v", send_alert=False)
+    monkeypatch.setattr(multi_monitor, "flush_results", lambda: False)
+    assert monitor._commit(account, "INBOX", (1, 5)) is False
+    assert database.get_watermark("box@example.com", "INBOX") is None
+    monkeypatch.setattr(multi_monitor, "flush_results", lambda: True)
+    assert monitor._commit(account, "INBOX", (1, 5)) is True
+    assert database.get_watermark("box@example.com", "INBOX") == (1, 5)
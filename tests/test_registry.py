@@ -0,0 +1,46 @@
+"""Tests for the process-wide model registry."""
+import os
+import tempfile
+
+import pytest
+
+from ml.classifier import PhishingClassifier
+from ml.registry import ModelRegistry
+
+
+def _save_model(path, texts, labels):
+    clf = PhishingClassifier(model_path=path)
+    clf.fit(texts, labels)
+    clf.save()
+    return clf
+
+
+def test_registry_hot_reloads_changed_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.joblib")
+        _save_model(path, ["hello meeting", "urgent verify account"], [0, 1])
+        registry = ModelRegistry(model_path=path, compiled_path=os.path.join(tmp, "none.npz"), check_interval=0)
+
+        model, version = registry.current()
+        assert registry.get() is model
+        assert registry.version == version
+
+        _save_model(path, ["lunch plans today", "claim your free prize now", "project notes"], [0, 1, 0])
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+        new_model, new_version = registry.current()
+        assert new_model is not model
+        assert new_version != version
+
+        # Unchanged files: no reload
+        assert registry.reload() is False
+        assert registry.get() is new_model
+
+
+def test_registry_missing_model_raises():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(
+            model_path=os.path.join(tmp, "missing.joblib"),
+            compiled_path=os.path.join(tmp, "missing.npz"),
+        )
+        with pytest.raises(FileNotFoundError):
+            registry.get()
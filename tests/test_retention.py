@@ -0,0 +1,74 @@
+"""Tests for predictions retention (storage)."""
+import sqlite3
+
+import pytest
+
+from storage import database, retention
+
+DAY = 86400
+NOW = 1_800_000_000
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Through get_engine() with the tuned pragmas (WAL), as in production
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{tmp_path / 'emails.db'}")
+    monkeypatch.setattr(database, "SQLITE_PROFILE", "tuned")
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setattr(database, "_Session", None)
+    monkeypatch.setattr(database, "_db_ready", False)
+    monkeypatch.setattr(retention, "RETENTION_PAUSE_MS", 0)
+    database.init_db()
+    rows = [
+        {"preview": f"email {i} " + "x" * 400, "label": i % 2, "prob": 0.9 if i % 2 else 0.1,
+         "at": NOW - (100 - i) * DAY // 10, "version": "v1"}
+        for i in range(100)
+    ]  # one row every 2.4 hours over the last 10 days
+    database._insert_predictions(rows)
+    return tmp_path
+
+
+def test_archives_and_deletes_expired_rows(db):
+    pq = pytest.importorskip("pyarrow.parquet")
+    archive_dir = db / "archive"
+    dry = retention.run_retention(max_age_days=5, max_rows=0, archive_dir=str(archive_dir), dry_run=True, now=NOW)
+    assert dry["expired"] == 50 and dry["deleted"] == 0
+
+    summary = retention.run_retention(
+        max_age_days=5, max_rows=0, archive_dir=str(archive_dir), chunk_rows=7, now=NOW
+    )
+    assert summary["archived"] == summary["deleted"] == 50
+    assert summary["chunks"] == 8  # 7 rows per chunk
+    assert summary["vacuumed_pages"] > 0  # new databases use incremental vacuum
+
+    table = pq.read_table(str(archive_dir))  # hive-style day=YYYY-MM-DD partitions
+    assert sorted(table.column("id").to_pylist()) == list(range(1, 51))
+    assert all(p.split("/")[-2].startswith("day=") for p in summary["files"])
+    conn = sqlite3.connect(db / "emails.db")
+    assert conn.execute("SELECT MIN(created_at) FROM predictions").fetchone()[0] >= NOW - 5 * DAY
+    assert conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == 50
+    # Rollups keep counting archived rows
+    assert conn.execute("SELECT SUM(total) FROM prediction_rollups WHERE bucket_seconds = 3600").fetchone()[0] == 100
+
+
+def test_row_limit_without_archive(db):
+    summary = retention.run_retention(max_age_days=0, max_rows=30, archive=False, now=NOW)
+    assert summary["deleted"] == 70 and summary["files"] == []
+    ids = [r["id"] for r in database.get_recent_results(limit=100)]
+    assert ids == list(range(100, 70, -1))
+
+
+def test_incremental_vacuum_releases_requested_pages(db):
+    retention.run_retention(max_age_days=0, max_rows=0, archive=False, now=NOW)  # nothing expired
+    conn = sqlite3.connect(db / "emails.db")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # set before WAL on the fresh file
+    conn.execute("CREATE TABLE filler (x BLOB)")
+    conn.executemany("INSERT INTO filler VALUES (zeroblob(4000))", [()] * 200)
+    conn.commit()
+    conn.execute("DROP TABLE filler")
+    conn.commit()
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    assert before >= 100
+    assert retention._incremental_vacuum(database.get_engine(), 50) == 50
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == before - 50
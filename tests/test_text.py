@@ -20,3 +20,92 @@ def test_keyword_frequencies():
     freqs = get_keyword_frequencies("urgent message urgent account")
     assert freqs.get("urgent", 0) >= 2
     assert freqs.get("account", 0) >= 1
+
+
+def test_keyword_matcher_matches_str_count():
+    import random
+    from detection.keyword_matcher import KeywordMatcher
+
+    rng = random.Random(7)
+    keywords = ["a", "aa", "ab", "bab", "abab", "b a", "ba b", "account", "count"]
+    matcher = KeywordMatcher(keywords)
+    for _ in range(200):
+        text = "".join(rng.choice("ab ") for _ in range(rng.randint(0, 40)))
+        assert matcher.count_automaton(text) == {kw: text.count(kw) for kw in keywords}
+    assert matcher.count_automaton("accounts count") == {**{kw: 0 for kw in keywords}, "a": 1, "account": 1, "count": 2}
+
+
+def test_keyword_frequencies_word_boundary():
+    freqs = get_keyword_frequencies("Your accounts: verify account now", ["account", "verify account"])
+    assert freqs == {"account": 2, "verify account": 1}
+    freqs = get_keyword_frequencies(
+        "Your accounts: verify account now", ["account", "verify account"], word_boundary=True
+    )
+    assert freqs == {"account": 1, "verify account": 1}
+
+
+def _clean_text_reference(text):
+    """The original three-pass clean_text."""
+    import re
+    from utils.helpers import safe_str
+    text = re.sub(r"<[^>]+>", " ", safe_str(text))
+    text = re.sub(r"[^a-zA-Z0-9\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def test_normalize_text_matches_three_pass_clean():
+    import random
+    from detection.text_analysis import normalize_text
+
+    rng = random.Random(3)
+    alphabet = ["a", "Z", "9", " ", "\n", "\t", "<", ">", "<b>", "</p>", "!", "é", " ", "_", "-"]
+    samples = ["", "   ", "<p>hello <b>world</b></p>", "a<b", "x < y > z", "<<a>>b", None]
+    samples += ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 60))) for _ in range(500)]
+    for text in samples:
+        expected = _clean_text_reference(text)
+        assert clean_text(text) == expected
+        for limit in (0, 1, 5, 17):
+            assert normalize_text(text, limit) == expected[:limit]
+
+
+def test_normalize_text_chunked_early_stop(monkeypatch):
+    import random
+    from detection import text_analysis
+
+    monkeypatch.setattr(text_analysis, "_NORMALIZE_CHUNK", 7)
+    rng = random.Random(11)
+    alphabet = ["ab", "Z9", " ", "\n", "<", ">", "<p>", "<a href='x y'>", "&amp;", "!"]
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 80)))
+        expected = _clean_text_reference(text)
+        for limit in (1, 3, 8, 20, 50):
+            assert text_analysis.normalize_text(text, limit) == expected[:limit]
+
+
+def test_cache_key_input_drops_tracking_params_but_model_input_keeps_them():
+    from ml.preprocessing import cache_key_input, prepare_input
+
+    text = "<p>Verify</p> https://bank.example/login?utm_source=abc-123_x&id=7&mc_eid=ab12-cd34#top"
+    prepared = prepare_input(text)
+    assert prepared == clean_text(text)  # model features unchanged
+    assert cache_key_input(text) == "Verify https bank example login id 7 top"
+    assert cache_key_input(text, prepared) == cache_key_input(text)
+    other = "<p>Verify</p> https://bank.example/login?utm_source=zz_9-q&id=7&mc_eid=x-y_z#top"
+    assert cache_key_input(other) == cache_key_input(text)
+    assert cache_key_input("plain text", prepare_input("plain text")) == "plain text"
+
+
+def test_cache_key_input_chunked_matches_full_pass(monkeypatch):
+    import random
+    from detection import text_analysis
+    from ml import preprocessing
+
+    monkeypatch.setattr(text_analysis, "_NORMALIZE_CHUNK", 7)
+    rng = random.Random(5)
+    alphabet = ["ab", " ", "<p>", "x?utm_source=a-b_c", "&fbclid=Q-1", "&id=3", "\n", "<a href='y?gclid=z-9'>"]
+    for _ in range(300):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 60)))
+        expected = clean_text(preprocessing._TRACKING_PARAM.sub("", text))
+        for limit in (5, 20, 60):
+            monkeypatch.setattr(preprocessing, "MAX_EMAIL_LENGTH", limit)
+            assert preprocessing.cache_key_input(text) == expected[:limit]
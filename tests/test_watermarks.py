@@ -0,0 +1,80 @@
+"""Tests for the mail monitor's persistent UID watermarks."""
+import pytest
+from sqlalchemy import create_engine
+
+from mail import auto_monitor
+from mail.session import ImapSession
+from storage import database
+from tests.imap_server import FakeImapServer
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'emails.db'}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(database, "_engine", engine)
+    monkeypatch.setattr(database, "_Session", None)
+    monkeypatch.setattr(database, "_db_ready", False)
+    return tmp_path
+
+
+@pytest.fixture
+def checked(monkeypatch):
+    batches = []
+
+    def fake_check(emails=None, **kwargs):
+        batches.append([(em.uid, em.subject) for em in emails])
+        return len(emails), 0, []
+
+    monkeypatch.setattr(auto_monitor, "check_inbox_and_alert", fake_check)
+    return batches
+
+
+def _raw(subject: str) -> bytes:
+    return f"From: a@example.com\r\nSubject: {subject}\r\n\r\nbody\r\n".encode()
+
+
+def _check(server) -> int:
+    with ImapSession("127.0.0.1", server.port, "user@example.com", "pw", use_ssl=False, timeout=5) as session:
+        session.select("INBOX")
+        return auto_monitor.check_folder(session, "INBOX")
+
+
+def test_watermark_round_trip(db):
+    assert database.get_watermark("a@example.com", "INBOX") is None
+    database.set_watermark("a@example.com", "INBOX", 7, 41)
+    database.set_watermark("a@example.com", "INBOX", 7, 42)
+    database.set_watermark("a@example.com", "[Gmail]/Spam", 3, 5)
+    assert database.get_watermark("a@example.com", "INBOX") == (7, 42)
+    assert database.get_watermark("b@example.com", "INBOX") is None
+
+
+def test_check_folder_fetches_only_past_watermark(db, checked):
+    with FakeImapServer(uidvalidity=100) as server:
+        server.add_message(_raw("read long ago"), seen=True)
+        server.add_message(_raw("Invoice"))
+        server.add_message(_raw("Invoice"))
+        assert _check(server) == 2  # first run: unseen mail only
+        assert database.get_watermark("user@example.com", "INBOX") == (100, 3)
+
+        assert _check(server) == 0  # a restart re-classifies nothing
+        server.add_message(_raw("Invoice"))
+        server.add_message(_raw("Invoice"), seen=True)
+        assert _check(server) == 2  # same subject as earlier mail, still new
+        assert checked == [[(3, "Invoice"), (2, "Invoice")], [(5, "Invoice"), (4, "Invoice")]]
+        assert ("UID SEARCH", "UID 4:*") in server.commands
+        assert database.get_watermark("user@example.com", "INBOX") == (100, 5)
+
+        server.uidvalidity = 200  # folder recreated: old UIDs mean nothing
+        assert _check(server) == 3
+        assert database.get_watermark("user@example.com", "INBOX") == (200, 5)
+
+
+def test_watermark_kept_when_results_not_flushed(db, checked, monkeypatch):
+    monkeypatch.setattr(auto_monitor, "flush_results", lambda: False)
+    with FakeImapServer(uidvalidity=100) as server:
+        server.add_message(_raw("Invoice"))
+        assert _check(server) == 1
+        assert database.get_watermark("user@example.com", "INBOX") is None
+        monkeypatch.setattr(auto_monitor, "flush_results", lambda: True)
+        assert _check(server) == 1  # checked again once results can be written
+        assert database.get_watermark("user@example.com", "INBOX") == (100, 1)
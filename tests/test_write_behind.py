@@ -0,0 +1,71 @@
+"""Tests for the write-behind prediction writer."""
+import threading
+import time
+
+import pytest
+
+from storage.write_behind import WriteBehindWriter
+
+
+def _rows(n, start=0):
+    return [{"id": i} for i in range(start, start + n)]
+
+
+def test_batches_by_size_and_flush():
+    batches = []
+    writer = WriteBehindWriter(batches.append, flush_rows=10, flush_ms=10_000)
+    writer.submit(_rows(25))
+    assert writer.flush(timeout=5)
+    assert [len(b) for b in batches] == [10, 10, 5]
+    assert [r["id"] for b in batches for r in b] == list(range(25))
+    assert writer.stats()["written"] == 25 and writer.stats()["pending"] == 0
+
+
+def test_flushes_after_interval():
+    written = threading.Event()
+    writer = WriteBehindWriter(lambda batch: written.set(), flush_rows=1000, flush_ms=20)
+    start = time.monotonic()
+    writer.submit(_rows(3))
+    assert written.wait(timeout=5)
+    assert time.monotonic() - start < 2
+
+
+def test_backpressure_policies():
+    release = threading.Event()
+    writes = []
+
+    def slow_write(batch):
+        release.wait(5)
+        writes.append(list(batch))
+
+    dropper = WriteBehindWriter(slow_write, max_queue_rows=5, flush_rows=1, backpressure="drop")
+    dropper.submit(_rows(1))  # taken by the background thread, which then blocks
+    time.sleep(0.05)
+    dropper.submit(_rows(8, start=1))
+    assert dropper.stats()["dropped"] == 3
+    release.set()
+    assert dropper.flush(timeout=5)
+    assert sum(len(w) for w in writes) == 6
+
+    writes.clear()
+    release.clear()
+    syncer = WriteBehindWriter(slow_write, max_queue_rows=5, flush_rows=1, backpressure="sync")
+    syncer.submit(_rows(1))
+    time.sleep(0.05)
+    threading.Timer(0.1, release.set).start()
+    syncer.submit(_rows(8, start=1))  # 5 fit; the caller writes the other 3 itself
+    assert syncer.flush(timeout=5)
+    assert syncer.stats()["sync_writes"] == 1
+    assert sorted(r["id"] for w in writes for r in w) == list(range(9))
+
+    with pytest.raises(ValueError):
+        WriteBehindWriter(slow_write, backpressure="spill")
+
+
+def test_close_writes_pending_and_later_rows():
+    batches = []
+    writer = WriteBehindWriter(batches.append, flush_rows=100, flush_ms=10_000)
+    writer.submit(_rows(4))
+    writer.close(timeout=5)
+    writer.submit(_rows(2, start=4))
+    assert [len(b) for b in batches] == [4, 2]